@@ -0,0 +1,69 @@
+"""Annotation renderer for detection results.
+
+Boxes, class ids and confidences are converted to NumPy once per image and
+drawn in place on the BGR buffer the detector ran on. Label glyph metrics are
+measured once per class name and reused, and every class gets a stable colour
+from a fixed palette.
+"""
+from functools import lru_cache
+
+import numpy as np
+import cv2
+
+from inference import as_numpy
+
+FONT = cv2.FONT_HERSHEY_SIMPLEX
+FONT_SCALE = 0.7
+BOX_THICKNESS = 2
+TEXT_THICKNESS = 2
+LABEL_PADDING = 4
+
+# BGR
+PALETTE = [
+    (56, 56, 255), (151, 157, 255), (31, 112, 255), (29, 178, 255), (49, 210, 207),
+    (10, 249, 72), (23, 204, 146), (134, 219, 61), (52, 147, 26), (187, 212, 0),
+    (168, 153, 44), (255, 194, 0), (147, 69, 52), (255, 115, 100), (236, 24, 0),
+    (255, 56, 132), (133, 0, 82), (255, 56, 203), (200, 149, 255), (199, 55, 255),
+]
+_TEXT_COLORS = [(0, 0, 0) if 0.114 * b + 0.587 * g + 0.299 * r > 140 else (255, 255, 255)
+                for b, g, r in PALETTE]
+
+
+@lru_cache(maxsize=1024)
+def label_metrics(text):
+    (width, height), baseline = cv2.getTextSize(text, FONT, FONT_SCALE, TEXT_THICKNESS)
+    return width, height, baseline
+
+
+def draw_detections(image, xyxy, class_ids, names, confidences=None):
+    boxes = np.rint(as_numpy(xyxy)).astype(np.int32).tolist()
+    class_ids = as_numpy(class_ids).astype(np.intp).tolist()
+    if confidences is not None:
+        confidences = as_numpy(confidences).tolist()
+
+    for i, ((x1, y1, x2, y2), class_id) in enumerate(zip(boxes, class_ids)):
+        color = PALETTE[class_id % len(PALETTE)]
+        name = names[class_id]
+        cv2.rectangle(image, (x1, y1), (x2, y2), color, BOX_THICKNESS)
+
+        # Confidences always render as "0.00", so the width measured for the
+        # template is exact for every value.
+        if confidences is None:
+            label = name
+            width, height, baseline = label_metrics(name)
+        else:
+            label = f'{name} {confidences[i]:.2f}'
+            width, height, baseline = label_metrics(f'{name} 0.00')
+
+        label_height = height + baseline + LABEL_PADDING
+        top = y1 - label_height if y1 >= label_height else y1
+        cv2.rectangle(image, (x1, top), (x1 + width + 2 * LABEL_PADDING, top + label_height), color, -1)
+        cv2.putText(image, label, (x1 + LABEL_PADDING, top + height + LABEL_PADDING // 2),
+                    FONT, FONT_SCALE, _TEXT_COLORS[class_id % len(PALETTE)], TEXT_THICKNESS, cv2.LINE_AA)
+    return image
+
+
+def annotate(image, result, show_confidence=True):
+    boxes = result.boxes
+    return draw_detections(image, boxes.xyxy, boxes.cls, result.names,
+                           boxes.conf if show_confidence else None)
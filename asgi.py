@@ -0,0 +1,214 @@
+"""ASGI entry point for serving the app under an asyncio server.
+
+    uvicorn asgi:application --host 0.0.0.0 --port 5000 --workers 2
+
+The Flask app itself stays synchronous and keeps every route and template.
+This adapter receives each request body on the event loop, spooling large
+uploads to a temporary file, and only hands the finished request to Flask on
+a bounded thread pool. A slow mobile upload therefore costs an idle coroutine
+instead of a thread pinned for the whole transfer; threads are only taken
+for the validation, database and job queueing work once the photos have
+arrived, and inference runs on the job workers as before. Response bodies
+(reports, artifacts) are read on the same pool and sent in chunks.
+"""
+import asyncio
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+from app import create_app
+
+RESPONSE_CHUNK_BYTES = 64 * 1024
+
+
+class RequestTooLarge(Exception):
+    pass
+
+
+class WSGIBridge:
+    def __init__(self, wsgi_app, max_threads, spool_bytes, max_body_bytes=None):
+        self.wsgi_app = wsgi_app
+        self.spool_bytes = spool_bytes
+        self.max_body_bytes = max_body_bytes
+        self.executor = ThreadPoolExecutor(max_workers=max_threads, thread_name_prefix='asgi')
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+        elif scope['type'] == 'http':
+            await self._http(scope, receive, send)
+        else:
+            raise RuntimeError(f"Unsupported ASGI scope type {scope['type']!r}")
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.executor.shutdown(wait=False)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def _http(self, scope, receive, send):
+        try:
+            body = await self._receive_body(scope, receive)
+        except RequestTooLarge:
+            await _send_plain(send, 413, b'Request Entity Too Large')
+            return
+        if body is None:
+            return  # The client went away before finishing the upload.
+
+        loop = asyncio.get_running_loop()
+        try:
+            status, headers, chunks = await loop.run_in_executor(
+                self.executor, self._call_app, _environ(scope, body))
+        except Exception:
+            self.wsgi_app.logger.exception('Unhandled error in %s %s', scope['method'], scope['path'])
+            body.close()
+            await _send_plain(send, 500, b'Internal Server Error')
+            return
+
+        try:
+            await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+            if scope['method'] != 'HEAD':
+                while True:
+                    data = await loop.run_in_executor(self.executor, _next_block, chunks)
+                    if not data:
+                        break
+                    await send({'type': 'http.response.body', 'body': data, 'more_body': True})
+            await send({'type': 'http.response.body', 'body': b''})
+        finally:
+            await loop.run_in_executor(self.executor, _close, chunks, body)
+
+    async def _receive_body(self, scope, receive):
+        length = next((value for name, value in scope['headers'] if name == b'content-length'), None)
+        if self.max_body_bytes is not None and length is not None and int(length) > self.max_body_bytes:
+            raise RequestTooLarge()
+        # Small bodies stay in memory; uploads past spool_bytes go to a temp file.
+        body = tempfile.SpooledTemporaryFile(max_size=self.spool_bytes)
+        size = 0
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                body.close()
+                return None
+            chunk = message.get('body', b'')
+            size += len(chunk)
+            if self.max_body_bytes is not None and size > self.max_body_bytes:
+                body.close()
+                raise RequestTooLarge()
+            body.write(chunk)
+            if not message.get('more_body', False):
+                break
+        body.seek(0)
+        return body
+
+    def _call_app(self, environ):
+        response = {}
+
+        def start_response(status, headers, exc_info=None):
+            if exc_info and response:
+                raise exc_info[1].with_traceback(exc_info[2])
+            response['status'] = int(status.split(' ', 1)[0])
+            response['headers'] = [(name.lower().encode('latin-1'), value.encode('latin-1'))
+                                   for name, value in headers]
+            return lambda data: response.setdefault('written', []).append(data)
+
+        iterable = self.wsgi_app(environ, start_response)
+        chunks = iter(iterable)
+        # Flask calls start_response before returning, but a WSGI app may
+        # defer it until the first chunk is produced.
+        first = next(chunks, b'') if 'status' not in response else b''
+        prefix = b''.join(response.pop('written', [])) + first
+        return response['status'], response['headers'], _Chunks(iterable, chunks, prefix)
+
+
+class _Chunks:
+    def __init__(self, iterable, iterator, prefix):
+        self.iterable = iterable
+        self.iterator = iterator
+        self.prefix = prefix
+
+
+def _next_block(chunks):
+    # Join small WSGI chunks so each thread hop moves a sizeable block.
+    parts = [chunks.prefix] if chunks.prefix else []
+    chunks.prefix = b''
+    size = sum(len(part) for part in parts)
+    while size < RESPONSE_CHUNK_BYTES:
+        part = next(chunks.iterator, None)
+        if part is None:
+            break
+        parts.append(part)
+        size += len(part)
+    return b''.join(parts)
+
+
+def _close(chunks, body):
+    try:
+        if hasattr(chunks.iterable, 'close'):
+            chunks.iterable.close()
+    finally:
+        body.close()
+
+
+def _environ(scope, body):
+    root_path = scope.get('root_path', '')
+    path = scope['path']
+    if root_path and path.startswith(root_path):
+        path = path[len(root_path):]
+    server_name, server_port = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('', 0)
+    body.seek(0, 2)
+    length = body.tell()
+    body.seek(0)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': root_path.encode('utf-8').decode('latin-1'),
+        'PATH_INFO': path.encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': server_name,
+        'SERVER_PORT': str(server_port),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'REMOTE_ADDR': client[0],
+        'REMOTE_PORT': str(client[1]),
+        'CONTENT_LENGTH': str(length),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': body,
+        # The whole body has been received, so chunked uploads can be read to the end.
+        'wsgi.input_terminated': True,
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    for name, value in scope['headers']:
+        name = name.decode('latin-1')
+        value = value.decode('latin-1')
+        if name in ('content-length', 'transfer-encoding'):
+            continue
+        if name == 'content-type':
+            key = 'CONTENT_TYPE'
+        else:
+            key = 'HTTP_' + name.upper().replace('-', '_')
+        if key in environ:
+            separator = '; ' if key == 'HTTP_COOKIE' else ','
+            value = environ[key] + separator + value
+        environ[key] = value
+    return environ
+
+
+async def _send_plain(send, status, text):
+    await send({'type': 'http.response.start', 'status': status,
+                'headers': [(b'content-type', b'text/plain; charset=utf-8'),
+                            (b'content-length', str(len(text)).encode())]})
+    await send({'type': 'http.response.body', 'body': text})
+
+
+app = create_app()
+application = WSGIBridge(app,
+                         max_threads=app.config['ASGI_THREADS'],
+                         spool_bytes=app.config['ASGI_SPOOL_BYTES'],
+                         max_body_bytes=app.config['MAX_CONTENT_LENGTH'])
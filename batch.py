@@ -0,0 +1,63 @@
+"""Offline bulk assessment of claim photos.
+
+Backs the ``flask assess-batch`` command. Work items come from walking a
+directory (every photo gets the same vehicle type, brand and user) or from a
+manifest CSV with path, vehicle_type, brand and user columns. They are read
+lazily, grouped into chunks and handed to a spawn-based process pool running
+pipeline.assess_files, with a bounded number of chunks in flight so memory
+stays flat however long the backlog is. Results come back in chunks for the
+caller to write to the database.
+"""
+import csv
+import multiprocessing
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import pipeline
+
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.bmp', '.webp'}
+
+
+def iter_directory(directory, vehicle_type, brand, user):
+    for root, dirs, files in os.walk(directory):
+        dirs.sort()
+        for name in sorted(files):
+            if os.path.splitext(name)[1].lower() in IMAGE_EXTENSIONS:
+                yield os.path.join(root, name), vehicle_type, brand, user
+
+
+def iter_manifest(manifest_path):
+    base = os.path.dirname(os.path.abspath(manifest_path))
+    with open(manifest_path, newline='') as f:
+        for row in csv.DictReader(f):
+            yield os.path.join(base, row['path']), row['vehicle_type'], row['brand'], row['user']
+
+
+def _chunks(items, size):
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def run_batch(items, settings, workers=2, chunk_size=16, save_images=False):
+    """Yield (items, outputs) pairs as chunks finish; order is not preserved."""
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                             initializer=pipeline.init_worker, initargs=(settings,)) as executor:
+        pending = {}
+        for chunk in _chunks(items, chunk_size):
+            if len(pending) >= workers * 2:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield pending.pop(future), future.result()
+            tasks = [(vehicle_type, brand, path) for path, vehicle_type, brand, _ in chunk]
+            pending[executor.submit(pipeline.assess_files, tasks, save_images)] = chunk
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield pending.pop(future), future.result()
@@ -0,0 +1,290 @@
+"""Benchmarks for the assessment pipeline.
+
+Times each stage on its own (model load, decode, inference at several batch
+sizes, annotation, costing, database insert and PDF rendering) and the whole
+run_assessment path end to end. The startup stage times a fresh interpreter
+importing the app and calling create_app, and lists any heavy libraries that
+got imported on the way; with --startup-budget-ms it fails when the median
+goes over budget or one of those libraries shows up. Images are synthetic, and by default the
+detector is a small stub, so this runs on any box without GPU or weights.
+Pass --model to time a real .pt or .onnx file instead.
+
+Results are written as JSON (stdout, or --output) so runs can be compared
+across releases:
+
+    python bench.py --repeat 20 --output bench.json
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+import cv2
+from PIL import Image
+
+from annotation import annotate
+from app import HEAVY_MODULES
+from inference import LoadedModel, ModelRegistry, load_model
+from ingest import decode_image
+from pricing import PARTS_COST, PriceBook
+
+VEHICLE_TYPE = '4wheeler'
+BRAND = next(iter(PARTS_COST[VEHICLE_TYPE]))
+PART_NAMES = list(PARTS_COST[VEHICLE_TYPE][BRAND]) + ['unlisted-part']
+
+
+class StubBoxes:
+    def __init__(self, xyxy, conf, cls):
+        self.xyxy = xyxy
+        self.conf = conf
+        self.cls = cls
+
+
+class StubResult:
+    def __init__(self, names, boxes):
+        self.names = names
+        self.boxes = boxes
+
+
+class StubModel:
+    """Returns a fixed number of seeded random boxes per image."""
+
+    def __init__(self, detections=6):
+        self.names = dict(enumerate(PART_NAMES))
+        self.detections = detections
+
+    def __call__(self, source, **kwargs):
+        images = source if isinstance(source, list) else [source]
+        results = []
+        for i, image in enumerate(images):
+            rng = np.random.default_rng(i)
+            h, w = image.shape[:2]
+            corners = rng.uniform(0, 1, (self.detections, 2)) * [w * 0.7, h * 0.7]
+            sizes = rng.uniform(0.1, 0.3, (self.detections, 2)) * [w, h]
+            xyxy = np.hstack([corners, corners + sizes]).astype(np.float32)
+            conf = rng.uniform(0.3, 1.0, self.detections).astype(np.float32)
+            cls = rng.integers(0, len(self.names), self.detections).astype(np.float32)
+            results.append(StubResult(self.names, StubBoxes(xyxy, conf, cls)))
+        return results
+
+
+def synthetic_jpeg(width, height, seed=0):
+    rng = np.random.default_rng(seed)
+    # Smooth gradients plus noise compress like a photo rather than pure noise.
+    x = np.linspace(0, 255, width, dtype=np.float32)
+    y = np.linspace(0, 255, height, dtype=np.float32)[:, None]
+    pixels = np.stack([x + 0 * y, y + 0 * x, (x + y) / 2], axis=2)
+    pixels += rng.normal(0, 12, pixels.shape)
+    buffer = io.BytesIO()
+    Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8)).save(buffer, 'JPEG', quality=90)
+    return buffer.getvalue()
+
+
+def measure(fn, repeat, warmup=1):
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return {
+        'repeat': repeat,
+        'min_ms': round(samples[0], 3),
+        'median_ms': round(statistics.median(samples), 3),
+        'mean_ms': round(statistics.fmean(samples), 3),
+        'p95_ms': round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 3),
+        'max_ms': round(samples[-1], 3),
+    }
+
+
+def bench_startup(args):
+    script = ('import json, sys; from app import create_app; create_app(); '
+              f'print(json.dumps([name for name in {HEAVY_MODULES!r} if name in sys.modules]))')
+    loaded = set()
+
+    def start():
+        output = subprocess.run([sys.executable, '-c', script], capture_output=True, text=True, check=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout
+        loaded.update(json.loads(output.strip().splitlines()[-1]))
+    stats = measure(start, max(1, args.repeat // 2))
+    stats['heavy_modules'] = sorted(loaded)
+    return {'startup': stats}
+
+
+def bench_model_load(args, loader, weights_path):
+    def load():
+        ModelRegistry({VEHICLE_TYPE: weights_path}, loader=loader).get(VEHICLE_TYPE)
+    return {'model_load': measure(load, max(1, args.repeat // 4), warmup=0)}
+
+
+def bench_decode(args, photos):
+    return {f'decode[{name}]': measure(lambda data=data: decode_image(data, args.max_side), args.repeat)
+            for name, data in photos.items()}
+
+
+def bench_inference(args, model, image):
+    results = {}
+    for batch_size in args.batch_sizes:
+        batch = [image] * batch_size
+        stats = measure(lambda: model(batch), args.repeat)
+        stats['per_image_ms'] = round(stats['median_ms'] / batch_size, 3)
+        results[f'inference[batch={batch_size}]'] = stats
+    return results
+
+
+def bench_annotate(args, model, image):
+    result = model([image])[0]
+    return {'annotate': measure(lambda: annotate(image.copy(), result), args.repeat)}
+
+
+def bench_costing(args, model, image):
+    import pipeline
+    price_book = PriceBook()
+    results = model([image] * 4)
+
+    def price():
+        class_ids = pipeline.consolidate_detections([result.boxes.cls for result in results])
+        table = price_book.table(VEHICLE_TYPE, BRAND, results[0].names)
+        table.damage_details(class_ids)
+        float(table.costs[class_ids].sum())
+    return {'costing': measure(price, args.repeat)}
+
+
+def bench_db_insert(args):
+    from extensions import db
+    from models import Assessment, AssessmentJob, DamageItem, ImageHash, User
+    from repository import AssessmentRepository
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import Session
+
+    engine = create_engine('sqlite://')
+    db.metadata.create_all(engine)
+    details = [{'damage_type': name, 'cost': 1000.0, 'description': 'Repair required.'} for name in PART_NAMES[:6]]
+    record = {'user_id': 1, 'vehicle_type': VEHICLE_TYPE, 'vehicle_brand': BRAND, 'total_cost': 6000.0,
+              'image_path': 'bench.jpg', 'damage_details': details, 'phashes': [0x0123456789abcdef] * 4}
+
+    def insert(count):
+        with Session(engine) as session:
+            AssessmentRepository(session, User, Assessment, DamageItem, AssessmentJob, ImageHash).create_many(
+                [record] * count)
+            session.commit()
+    return {f'db_insert[assessments={count}]': measure(lambda count=count: insert(count), args.repeat)
+            for count in (1, 16)}
+
+
+def bench_pdf(args, image, workdir):
+    from pdf import generate_pdf
+    image_path = os.path.join(workdir, 'evidence.jpg')
+    cv2.imwrite(image_path, image)
+    details = [{'damage_type': name, 'cost': 1000.0, 'description': 'Repair required.'} for name in PART_NAMES[:6]]
+    pdf_path = os.path.join(workdir, 'report.pdf')
+    return {'generate_pdf': measure(lambda: generate_pdf(pdf_path, 1, datetime.utcnow(), VEHICLE_TYPE, BRAND,
+                                                         details, 6000.0, image_path, 'Benchmark'),
+                                    max(1, args.repeat // 2))}
+
+
+def bench_end_to_end(args, loader, weights_path, photo, workdir):
+    import pipeline
+    registry = ModelRegistry({VEHICLE_TYPE: weights_path}, loader=loader)
+    pipeline.init_worker({
+        'model_paths': registry.model_paths,
+        'reload_interval': 60,
+        'cache_size': 0,
+        'parts_cost_file': None,
+        'max_side': args.max_side,
+        'annotate_confidence': True,
+        'artifact_dir': os.path.join(workdir, 'artifacts'),
+    }, registry=registry)
+    return {
+        f'end_to_end[images={count}]': measure(
+            lambda count=count: pipeline.run_assessment('bench', VEHICLE_TYPE, BRAND, [photo] * count),
+            max(1, args.repeat // 2))
+        for count in (1, 4)
+    }
+
+
+def environment():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        'timestamp': datetime.utcnow().isoformat(),
+        'commit': commit,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'numpy': np.__version__,
+        'opencv': cv2.__version__,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--model', help='Weight file (.pt or .onnx) to time instead of the stub model.')
+    parser.add_argument('--repeat', type=int, default=10)
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 4, 8, 16])
+    parser.add_argument('--max-side', type=int, default=1280)
+    parser.add_argument('--startup-budget-ms', type=float,
+                        help='Exit with an error if app startup is slower than this or imports a heavy library.')
+    parser.add_argument('--stages', nargs='+',
+                        default=['startup', 'load', 'decode', 'inference', 'annotate', 'costing', 'db', 'pdf', 'end_to_end'])
+    parser.add_argument('--output', help='Write the JSON results here instead of stdout.')
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        if args.model:
+            weights_path, loader = args.model, load_model
+        else:
+            weights_path, loader = os.path.join(workdir, 'stub.pt'), lambda path: StubModel()
+            open(weights_path, 'wb').close()
+        model = LoadedModel(loader(weights_path), weights_path, 0, None)
+
+        photos = {'12mp': synthetic_jpeg(4000, 3000), '2mp': synthetic_jpeg(1920, 1080), 'vga': synthetic_jpeg(640, 480)}
+        image = decode_image(photos['12mp'], args.max_side)
+
+        stages = {
+            'startup': lambda: bench_startup(args),
+            'load': lambda: bench_model_load(args, loader, weights_path),
+            'decode': lambda: bench_decode(args, photos),
+            'inference': lambda: bench_inference(args, model, image),
+            'annotate': lambda: bench_annotate(args, model, image),
+            'costing': lambda: bench_costing(args, model, image),
+            'db': lambda: bench_db_insert(args),
+            'pdf': lambda: bench_pdf(args, image, workdir),
+            'end_to_end': lambda: bench_end_to_end(args, loader, weights_path, photos['12mp'], workdir),
+        }
+        results = {}
+        for stage in args.stages:
+            print(f'Running {stage}...', file=sys.stderr)
+            results.update(stages[stage]())
+
+    report = {'environment': environment(), 'model': args.model or 'stub', 'results': results}
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+
+    startup = results.get('startup')
+    if startup and args.startup_budget_ms is not None:
+        if startup['median_ms'] > args.startup_budget_ms or startup['heavy_modules']:
+            print(f"Startup over budget: {startup['median_ms']} ms (budget {args.startup_budget_ms} ms), "
+                  f"heavy modules: {', '.join(startup['heavy_modules']) or 'none'}", file=sys.stderr)
+            raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
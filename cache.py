@@ -0,0 +1,103 @@
+"""Content-addressed cache of detection results.
+
+Entries are keyed on the decoded pixels of the submitted photos together with
+the vehicle type, brand and the checksum of the weight file that produced
+them, so a resubmitted photo skips inference and annotation entirely. The
+cache is a bounded LRU; entries for a vehicle type are dropped as soon as its
+weight file is reloaded.
+
+TTLCache is a smaller bounded LRU whose entries also expire after a fixed
+number of seconds; the web process uses it for logged-in users.
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+
+def image_digest(pixels):
+    digest = hashlib.blake2b(digest_size=20)
+    digest.update(f'{pixels.shape}:{pixels.dtype}:'.encode())
+    digest.update(pixels.data)
+    return digest.hexdigest()
+
+
+def make_key(image_digests, vehicle_type, brand, model_checksum):
+    digest = hashlib.blake2b(digest_size=20)
+    for part in (vehicle_type, brand, model_checksum, *image_digests):
+        digest.update(part.encode())
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+class ResultCache:
+    def __init__(self, max_entries=512):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return entry[1]
+        return None
+
+    def put(self, key, vehicle_type, value):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (vehicle_type, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def discard(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def invalidate(self, vehicle_type):
+        with self._lock:
+            stale = [key for key, (entry_type, _) in self._entries.items() if entry_type == vehicle_type]
+            for key in stale:
+                del self._entries[key]
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class TTLCache:
+    def __init__(self, max_entries=1024, ttl=60.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        if self.max_entries <= 0 or self.ttl <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def discard(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def __len__(self):
+        return len(self._entries)
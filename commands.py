@@ -0,0 +1,175 @@
+"""Maintenance and bulk-processing CLI commands (flask <command>).
+
+Registered on a blueprint without a CLI group, so they run as top-level flask
+commands inside an app context. The pipeline, model and ONNX modules are only
+imported by the commands that need them.
+"""
+import os
+import time
+
+import click
+from flask import Blueprint, current_app
+
+from database import copy_database
+from extensions import db
+from models import Assessment, User
+from reports import ensure_report
+from services import MODEL_PATHS, WEIGHT_PATHS, artifact_file, services
+
+bp = Blueprint('commands', __name__, cli_group=None)
+
+
+# --- Artifacts ---
+@bp.cli.command('artifacts-gc')
+@click.option('--days', type=float, default=None, help='Retention period; defaults to ARTIFACT_RETENTION_DAYS.')
+def artifacts_gc(days):
+    """Delete stored images no assessment refers to, stale PDF reports and leftover videos."""
+    max_age = (days if days is not None else current_app.config['ARTIFACT_RETENTION_DAYS']) * 24 * 3600
+    keep = {image_path for (image_path,) in db.session.query(Assessment.image_path)}
+    images = services.artifact_store.sweep(max_age, keep)
+    # Reports are rebuilt on the next download, so none of them need keeping.
+    reports = services.report_store.sweep(max_age)
+    # Workers delete videos once read; anything a day old was left by a crash.
+    videos = services.upload_store.sweep(min(max_age, 24 * 3600))
+    click.echo(f'Removed {images} images, {reports} reports and {videos} uploaded videos.')
+
+
+# --- Bulk Assessment ---
+@bp.cli.command('assess-batch')
+@click.argument('source', type=click.Path(exists=True))
+@click.option('--vehicle-type', type=click.Choice(list(MODEL_PATHS)), help='Vehicle type for every photo in a directory.')
+@click.option('--brand', help='Brand for every photo in a directory.')
+@click.option('--user', help='Username or email the assessments belong to, for a directory.')
+@click.option('--workers', type=int, help='Worker processes; defaults to ASSESSMENT_WORKERS.')
+@click.option('--chunk-size', type=int, default=16, show_default=True, help='Photos per model call.')
+@click.option('--commit-every', type=int, default=500, show_default=True, help='Assessments per transaction.')
+@click.option('--images/--no-images', default=False, help='Store annotated images.')
+@click.option('--pdf', is_flag=True, help='Render PDF reports as assessments are saved.')
+def assess_batch(source, vehicle_type, brand, user, workers, chunk_size, commit_every, images, pdf):
+    """Assess a directory of photos or a CSV manifest (path, vehicle_type, brand, user)."""
+    import batch
+    if os.path.isdir(source):
+        if not (vehicle_type and brand and user):
+            raise click.UsageError('--vehicle-type, --brand and --user are required for a directory.')
+        items = batch.iter_directory(source, vehicle_type, brand, user)
+    else:
+        items = batch.iter_manifest(source)
+
+    users = {}
+    def resolve_user(name):
+        if name not in users:
+            users[name] = (db.session.query(User.id, User.username)
+                           .filter(db.or_(User.username == name, User.email == name))
+                           .first())
+        return users[name]
+
+    pending = []
+    counts = {'photos': 0, 'saved': 0, 'clean': 0, 'failed': 0}
+    started = time.monotonic()
+
+    def flush():
+        ids = services.repository.create_many([record for record, _ in pending])
+        db.session.commit()
+        if pdf:
+            for assessment_id, (_, owner_name) in zip(ids, pending):
+                assessment = db.session.get(Assessment, assessment_id)
+                assessment.pdf_path = ensure_report(services.report_store, assessment, owner_name,
+                                                    artifact_file(assessment.image_path))
+            db.session.commit()
+        counts['saved'] += len(pending)
+        pending.clear()
+        db.session.expunge_all()
+        elapsed = time.monotonic() - started
+        click.echo(f"{counts['photos']} photos, {counts['saved']} assessments, {counts['clean']} without damage, "
+                   f"{counts['failed']} failed ({counts['photos'] / elapsed:.1f} photos/s)")
+
+    workers = workers or current_app.config['ASSESSMENT_WORKERS']
+    for chunk, outputs in batch.run_batch(items, services.worker_settings, workers=workers, chunk_size=chunk_size,
+                                          save_images=images):
+        for (path, item_vehicle_type, item_brand, item_user), output in zip(chunk, outputs):
+            counts['photos'] += 1
+            owner = resolve_user(item_user)
+            if 'error' in output or owner is None:
+                counts['failed'] += 1
+                click.echo(f"{path}: {output.get('error') or f'unknown user {item_user}'}", err=True)
+                continue
+            if not output['damage_details']:
+                counts['clean'] += 1
+                continue
+            pending.append(({
+                'user_id': owner.id,
+                'vehicle_type': item_vehicle_type,
+                'vehicle_brand': item_brand,
+                'total_cost': output['total_cost'],
+                'image_path': output['image_filename'] or '',
+                'damage_details': output['damage_details'],
+                'phashes': output['phashes'],
+            }, owner.username))
+        if len(pending) >= commit_every:
+            flush()
+    flush()
+
+
+# --- Database ---
+@bp.cli.command('copy-db')
+@click.argument('source_uri')
+@click.option('--batch-size', type=int, default=1000, show_default=True)
+def copy_db(source_uri, batch_size):
+    """Copy every row from SOURCE_URI into DATABASE_URL.
+
+    Run 'flask db upgrade' against both databases first so they share a schema.
+    """
+    copy_database(source_uri, db.engine, db.metadata, batch_size=batch_size, echo=click.echo)
+
+
+# --- ONNX Backend ---
+@bp.cli.command('export-onnx')
+@click.option('--vehicle-type', 'vehicle_types', multiple=True, type=click.Choice(list(MODEL_PATHS)),
+              help='Defaults to every vehicle type.')
+@click.option('--imgsz', type=int, default=640, show_default=True)
+@click.option('--int8', is_flag=True, help='Also write a dynamically quantized int8 model.')
+def export_onnx_command(vehicle_types, imgsz, int8):
+    """Export the PyTorch weights to ONNX next to the .pt files."""
+    from onnx_backend import export_onnx
+    for vehicle_type in vehicle_types or MODEL_PATHS:
+        click.echo(f'{vehicle_type}: {export_onnx(WEIGHT_PATHS[vehicle_type], imgsz=imgsz, int8=int8)}')
+
+
+@bp.cli.command('onnx-parity')
+@click.argument('vehicle_type', type=click.Choice(list(MODEL_PATHS)))
+@click.argument('photos', type=click.Path(exists=True, file_okay=False))
+@click.option('--candidate', help='ONNX model to check; defaults to the served model if it is ONNX, '
+                                  'otherwise the .onnx next to the .pt weights.')
+@click.option('--iou', type=float, default=0.5, show_default=True, help='IoU needed for two boxes to match.')
+@click.option('--min-recall', type=float, default=0.98, show_default=True)
+def onnx_parity(vehicle_type, photos, candidate, iou, min_recall):
+    """Compare an ONNX model's detections with the PyTorch model on a folder of photos."""
+    import batch
+    from inference import load_model
+    from ingest import decode_image
+    from onnx_backend import compare_detections
+    reference_path = WEIGHT_PATHS[vehicle_type]
+    candidate_path = candidate or MODEL_PATHS[vehicle_type]
+    if not candidate_path.endswith('.onnx'):
+        candidate_path = os.path.splitext(reference_path)[0] + '.onnx'
+    reference, candidate = load_model(reference_path), load_model(candidate_path)
+
+    totals = {'images': 0, 'reference': 0, 'candidate': 0, 'matched': 0, 'class_mismatch_images': 0, 'conf_delta': 0.0}
+    paths = [path for path, _, _, _ in batch.iter_directory(photos, vehicle_type, None, None)]
+    for start in range(0, len(paths), 16):
+        images = []
+        for path in paths[start:start + 16]:
+            with open(path, 'rb') as f:
+                images.append(decode_image(f.read(), current_app.config['INGEST_MAX_SIDE']))
+        stats = compare_detections(reference(images, verbose=False), candidate(images, verbose=False), iou)
+        for key in totals:
+            totals[key] = max(totals[key], stats[key]) if key == 'conf_delta' else totals[key] + stats[key]
+
+    recall = totals['matched'] / totals['reference'] if totals['reference'] else 1.0
+    precision = totals['matched'] / totals['candidate'] if totals['candidate'] else 1.0
+    click.echo(f"{totals['images']} photos: {totals['reference']} reference and {totals['candidate']} candidate "
+               f"detections, recall {recall:.3f}, precision {precision:.3f}, "
+               f"max confidence delta {totals['conf_delta']:.3f}, "
+               f"{totals['class_mismatch_images']} photos with different parts")
+    if recall < min_recall or precision < min_recall:
+        raise SystemExit(1)
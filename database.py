@@ -0,0 +1,79 @@
+"""Database engine configuration.
+
+The URI comes from DATABASE_URL, so the same code runs on the bundled SQLite
+file and on PostgreSQL. SQLite connections switch to WAL journaling, so
+readers no longer block the writer. They also use synchronous=NORMAL and
+wait up to a busy timeout instead of failing with "database is locked" when
+several workers commit at once. PostgreSQL gets a sized connection pool with
+pre-ping and recycling. copy_database moves existing data from one database
+to another that has already been migrated to the same revision.
+"""
+import os
+
+import sqlalchemy as sa
+
+
+def database_uri(default):
+    uri = os.environ.get('DATABASE_URL', default)
+    # Some hosts still hand out the pre-SQLAlchemy-1.4 scheme.
+    if uri.startswith('postgres://'):
+        uri = 'postgresql://' + uri[len('postgres://'):]
+    return uri
+
+
+def engine_options(uri):
+    if uri.startswith('sqlite'):
+        return {'connect_args': {'timeout': int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', '5000')) / 1000}}
+    return {
+        'pool_size': int(os.environ.get('DB_POOL_SIZE', '5')),
+        'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', '10')),
+        'pool_timeout': int(os.environ.get('DB_POOL_TIMEOUT', '30')),
+        'pool_recycle': int(os.environ.get('DB_POOL_RECYCLE', '1800')),
+        'pool_pre_ping': True,
+    }
+
+
+def configure_engine(engine):
+    if engine.dialect.name != 'sqlite':
+        return
+    busy_timeout = int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', '5000'))
+
+    @sa.event.listens_for(engine, 'connect')
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute('PRAGMA journal_mode=WAL')
+        cursor.execute('PRAGMA synchronous=NORMAL')
+        cursor.execute(f'PRAGMA busy_timeout={busy_timeout}')
+        cursor.close()
+
+
+def copy_database(source_uri, target_engine, metadata, batch_size=1000, echo=print):
+    source_engine = sa.create_engine(source_uri)
+    with source_engine.connect() as source, target_engine.begin() as target:
+        for table in metadata.sorted_tables:
+            if target.execute(sa.select(sa.func.count()).select_from(table)).scalar():
+                raise RuntimeError(f'Table {table.name} in the target database is not empty')
+        for table in metadata.sorted_tables:
+            copied = 0
+            rows = source.execute(sa.select(table)).mappings()
+            while True:
+                batch = rows.fetchmany(batch_size)
+                if not batch:
+                    break
+                target.execute(table.insert(), [dict(row) for row in batch])
+                copied += len(batch)
+            echo(f'{table.name}: {copied} rows')
+            if target.dialect.name == 'postgresql':
+                _reset_sequence(target, table)
+    source_engine.dispose()
+
+
+def _reset_sequence(connection, table):
+    # Rows were copied with their ids, so move serial sequences past them.
+    for column in table.primary_key.columns:
+        if isinstance(column.type, sa.Integer) and column.autoincrement in (True, 'auto'):
+            connection.execute(sa.text(
+                f"SELECT setval(pg_get_serial_sequence(:table, :column), "
+                f"COALESCE((SELECT MAX({connection.dialect.identifier_preparer.quote(column.name)}) "
+                f"FROM {connection.dialect.identifier_preparer.format_table(table)}), 0) + 1, false)"
+            ), {'table': connection.dialect.identifier_preparer.format_table(table), 'column': column.name})
@@ -0,0 +1,120 @@
+"""Perceptual hashes and near-duplicate lookup across stored assessments.
+
+Every photo of a stored assessment keeps a 64-bit DCT hash of its working
+image in the image_hash table. Recompressing, resizing or screenshotting a
+photo flips only a few of those bits, so two photos are near-duplicates
+when the Hamming distance between their hashes is small.
+
+Lookups use multi-index hashing. Each hash is also stored as four 16-bit
+bands, each with its own index, and two hashes at most three bits apart must
+agree exactly on at least one band. A lookup is therefore four indexed
+equality probes followed by an exact distance check on the few rows they
+return, however many photos are stored. Distances above BANDS - 1 are still
+checked, but matches that differ in every band are not found.
+
+The queries use a lightweight table clause rather than the models, so the job
+workers can run them without the Flask app.
+"""
+import sqlalchemy as sa
+
+BANDS = 4
+BAND_BITS = 16
+
+image_hash = sa.table('image_hash', sa.column('assessment_id'), sa.column('position'), sa.column('hash'),
+                      *(sa.column(f'band{i}') for i in range(BANDS)))
+assessment = sa.table('assessment', sa.column('id'), sa.column('vehicle_type'), sa.column('vehicle_brand'),
+                      sa.column('total_cost'), sa.column('image_path'))
+damage_item = sa.table('damage_item', sa.column('id'), sa.column('assessment_id'), sa.column('detected_damage'),
+                       sa.column('cost'), sa.column('description'))
+
+# One statement with bound band values, so every lookup reuses the compiled SQL.
+_candidates = sa.select(image_hash.c.assessment_id, image_hash.c.position, image_hash.c.hash).where(
+    sa.or_(*(image_hash.c[f'band{i}'] == sa.bindparam(f'band{i}') for i in range(BANDS))))
+
+
+def phash(image):
+    import cv2
+    import numpy as np
+
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
+    small = cv2.resize(gray, (32, 32), interpolation=cv2.INTER_AREA).astype(np.float32)
+    low = cv2.dct(small)[:8, :8].reshape(-1)
+    # The DC term only carries overall brightness, so it is left out of the median.
+    bits = low > np.median(low[1:])
+    return int(np.packbits(bits).view('>u8')[0])
+
+
+def hamming(a, b):
+    return (a ^ b).bit_count()
+
+
+def bands(value):
+    mask = (1 << BAND_BITS) - 1
+    return [(value >> (BAND_BITS * i)) & mask for i in range(BANDS)]
+
+
+def to_signed(value):
+    # BIGINT columns are signed, so the top bit is stored as the sign.
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+def to_unsigned(value):
+    return value + (1 << 64) if value < 0 else value
+
+
+def hash_rows(hashes):
+    """image_hash rows for one assessment's photos, without the assessment id."""
+    return [dict({'position': position, 'hash': to_signed(value)},
+                 **{f'band{i}': band for i, band in enumerate(bands(value))})
+            for position, value in enumerate(hashes)]
+
+
+class DuplicateIndex:
+    def __init__(self, engine, max_distance=BANDS - 1):
+        self.engine = engine
+        self.max_distance = max_distance
+
+    def find(self, connection, value):
+        """(assessment_id, position, distance) of every stored photo near the hash."""
+        params = {f'band{i}': band for i, band in enumerate(bands(value))}
+        matches = []
+        for assessment_id, position, stored in connection.execute(_candidates, params):
+            distance = hamming(value, to_unsigned(stored))
+            if distance <= self.max_distance:
+                matches.append((assessment_id, position, distance))
+        return matches
+
+    def best_match(self, hashes):
+        """The stored assessment sharing the most photos with these hashes, or None.
+
+        Ties go to the closer match and then to the older assessment, which is
+        normally the original submission.
+        """
+        found = {}
+        with self.engine.connect() as connection:
+            for value in hashes:
+                nearest = {}
+                for assessment_id, _, distance in self.find(connection, value):
+                    nearest[assessment_id] = min(distance, nearest.get(assessment_id, distance))
+                for assessment_id, distance in nearest.items():
+                    found.setdefault(assessment_id, []).append(distance)
+        if not found:
+            return None
+        assessment_id, distances = min(found.items(), key=lambda item: (-len(item[1]), sum(item[1]), item[0]))
+        return {'assessment_id': assessment_id, 'matched': len(distances), 'distance': max(distances)}
+
+    def load(self, assessment_id):
+        """A stored assessment with its damage items and photo count, for reuse."""
+        with self.engine.connect() as connection:
+            row = connection.execute(sa.select(assessment).where(assessment.c.id == assessment_id)).mappings().first()
+            if row is None:
+                return None
+            items = connection.execute(sa.select(damage_item.c.detected_damage, damage_item.c.cost,
+                                                 damage_item.c.description)
+                                       .where(damage_item.c.assessment_id == assessment_id)
+                                       .order_by(damage_item.c.id)).all()
+            photos = connection.execute(sa.select(sa.func.count()).select_from(image_hash)
+                                        .where(image_hash.c.assessment_id == assessment_id)).scalar()
+        return dict(row, photos=photos, damage_details=[
+            {'damage_type': damage_type, 'cost': cost, 'description': description}
+            for damage_type, cost, description in items])
@@ -0,0 +1,11 @@
+"""Flask extensions, created unbound and attached to each app in create_app."""
+from flask_bcrypt import Bcrypt
+from flask_login import LoginManager
+from flask_migrate import Migrate
+from flask_sqlalchemy import SQLAlchemy
+
+db = SQLAlchemy()
+bcrypt = Bcrypt()
+login_manager = LoginManager()
+login_manager.login_view = 'main.login'
+migrate = Migrate(render_as_batch=True)
@@ -0,0 +1,318 @@
+"""Process-wide YOLO model registry and micro-batching scheduler.
+
+Each worker process loads a weight file once and shares the instance between
+requests. Inference on a shared instance is serialized by a per-model lock,
+and a weight file whose mtime changes on disk is reloaded on the next lookup;
+reload listeners are told about it so derived state can be invalidated.
+
+InferenceBatcher sits in front of the registry: images submitted for the same
+vehicle type are grouped into one batched model call, bounded by a maximum
+batch size and a maximum wait after the first image arrives.
+
+When jobs run in a process pool, one inference process owns the registry and
+the batcher (serve), and every job worker talks to it through an
+InferenceClient. That way photos from concurrent uploads are still batched,
+and the models are loaded once instead of once per worker.
+"""
+import hashlib
+import itertools
+import os
+import pickle
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from multiprocessing.connection import Client, Listener
+
+import numpy as np
+
+
+def _load_yolo(model_path):
+    from ultralytics import YOLO
+    return YOLO(model_path)
+
+
+def load_model(model_path):
+    # Exported .onnx weights run on ONNX Runtime; anything else goes to ultralytics.
+    if model_path.endswith('.onnx'):
+        from onnx_backend import OnnxDetector
+        return OnnxDetector(model_path)
+    return _load_yolo(model_path)
+
+
+def as_numpy(values):
+    if hasattr(values, 'cpu'):
+        values = values.cpu().numpy()
+    return np.asarray(values)
+
+
+def file_checksum(path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class LoadedModel:
+    def __init__(self, model, path, mtime, checksum):
+        self.model = model
+        self.path = path
+        self.mtime = mtime
+        self.checksum = checksum
+        self.checked_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    @property
+    def names(self):
+        return self.model.names
+
+    def __call__(self, source, **kwargs):
+        kwargs.setdefault('verbose', False)
+        with self._lock:
+            return self.model(source, **kwargs)
+
+    def warmup(self, imgsz=640):
+        self(np.zeros((imgsz, imgsz, 3), dtype=np.uint8))
+
+
+class ModelRegistry:
+    def __init__(self, model_paths, loader=load_model, reload_interval=5.0):
+        self.model_paths = model_paths
+        self.loader = loader
+        self.reload_interval = reload_interval
+        self._entries = {}
+        self._load_locks = {vehicle_type: threading.Lock() for vehicle_type in model_paths}
+        self._reload_listeners = []
+
+    def add_reload_listener(self, listener):
+        self._reload_listeners.append(listener)
+
+    def get(self, vehicle_type):
+        model_path = self.model_paths.get(vehicle_type)
+        if not model_path:
+            return None
+
+        entry = self._entries.get(vehicle_type)
+        now = time.monotonic()
+        if entry is not None and now - entry.checked_at < self.reload_interval:
+            return entry
+
+        try:
+            mtime = os.path.getmtime(model_path)
+        except OSError:
+            # Weight file went away: keep serving what is already in memory.
+            return entry
+
+        if entry is not None and entry.mtime == mtime:
+            entry.checked_at = now
+            return entry
+
+        with self._load_locks[vehicle_type]:
+            previous = entry = self._entries.get(vehicle_type)
+            if entry is None or entry.mtime != mtime:
+                entry = LoadedModel(self.loader(model_path), model_path, mtime, file_checksum(model_path))
+                self._entries[vehicle_type] = entry
+                if previous is not None:
+                    for listener in self._reload_listeners:
+                        listener(vehicle_type)
+        return entry
+
+    def preload(self, warmup=True):
+        for vehicle_type in self.model_paths:
+            entry = self.get(vehicle_type)
+            if entry is not None and warmup:
+                entry.warmup()
+
+
+class InferenceBatcher:
+    def __init__(self, registry, max_batch_size=8, max_wait_ms=20):
+        self.registry = registry
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max_wait_ms / 1000.0
+        self._queues = {}
+        self._lock = threading.Lock()
+
+    def submit(self, vehicle_type, image):
+        future = Future()
+        self._queue_for(vehicle_type).put((image, future))
+        return future
+
+    def _queue_for(self, vehicle_type):
+        pending = self._queues.get(vehicle_type)
+        if pending is None:
+            with self._lock:
+                pending = self._queues.get(vehicle_type)
+                if pending is None:
+                    pending = queue.Queue()
+                    worker = threading.Thread(target=self._run, args=(vehicle_type, pending),
+                                              name=f'inference-{vehicle_type}', daemon=True)
+                    worker.start()
+                    self._queues[vehicle_type] = pending
+        return pending
+
+    def _collect(self, pending):
+        batch = [pending.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(pending.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return [(image, future) for image, future in batch if future.set_running_or_notify_cancel()]
+
+    def _run(self, vehicle_type, pending):
+        while True:
+            batch = self._collect(pending)
+            if not batch:
+                continue
+            try:
+                model = self.registry.get(vehicle_type)
+                if model is None:
+                    raise RuntimeError(f'No model available for {vehicle_type}')
+                results = model([image for image, _ in batch])
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            for (_, future), result in zip(batch, results):
+                future.set_result(result)
+
+
+def compact(result):
+    """The boxes and names of a model result, in a form that pickles cheaply."""
+    from onnx_backend import Boxes, Result
+
+    boxes = result.boxes
+    return Result(dict(result.names), Boxes(as_numpy(boxes.xyxy), as_numpy(boxes.conf), as_numpy(boxes.cls)),
+                  tuple(result.orig_shape))
+
+
+def serve(settings, authkey, ready, loader=load_model):
+    """Run the inference process: accept job workers and batch their images."""
+    registry = ModelRegistry(settings['model_paths'], loader=loader, reload_interval=settings['reload_interval'])
+    batcher = InferenceBatcher(registry, max_batch_size=settings['inference_batch_size'],
+                               max_wait_ms=settings['inference_batch_wait_ms'])
+    with Listener(authkey=authkey) as listener:
+        ready.send(listener.address)
+        ready.close()
+        if settings.get('preload'):
+            registry.preload(warmup=True)
+        while True:
+            connection = listener.accept()
+            threading.Thread(target=_serve_connection, args=(registry, batcher, connection),
+                             name='inference-connection', daemon=True).start()
+
+
+def _serve_connection(registry, batcher, connection):
+    send_lock = threading.Lock()
+
+    def reply(request_id, value=None, error=None):
+        with send_lock:
+            try:
+                connection.send((request_id, value, error))
+            except (pickle.PicklingError, TypeError, AttributeError):
+                # Not every library exception pickles; the message is what matters.
+                connection.send((request_id, None, RuntimeError(f'{type(error).__name__}: {error}')))
+
+    def resolve(request_id, future):
+        try:
+            reply(request_id, compact(future.result()))
+        except Exception as e:
+            reply(request_id, error=e)
+
+    with connection:
+        while True:
+            try:
+                request_id, kind, vehicle_type, image = connection.recv()
+            except (EOFError, OSError):
+                return
+            if kind == 'detect':
+                batcher.submit(vehicle_type, image).add_done_callback(
+                    lambda future, request_id=request_id: resolve(request_id, future))
+                continue
+            try:
+                model = registry.get(vehicle_type)
+                reply(request_id, None if model is None else (model.checksum, dict(model.names)))
+            except Exception as e:
+                reply(request_id, error=e)
+
+
+class RemoteModel:
+    def __init__(self, client, vehicle_type, checksum, names):
+        self.client = client
+        self.vehicle_type = vehicle_type
+        self.checksum = checksum
+        self.names = names
+        self.checked_at = time.monotonic()
+
+    def __call__(self, source, **kwargs):
+        images = source if isinstance(source, list) else [source]
+        futures = [self.client.submit(self.vehicle_type, image) for image in images]
+        return [future.result() for future in futures]
+
+
+class InferenceClient:
+    """Registry and batcher for a job worker whose models live in the inference process."""
+
+    def __init__(self, address, authkey, reload_interval=5.0):
+        self.reload_interval = reload_interval
+        self._connection = Client(address, authkey=authkey)
+        self._send_lock = threading.Lock()
+        self._request_ids = itertools.count()
+        self._pending = {}
+        self._models = {}
+        self._reload_listeners = []
+        threading.Thread(target=self._receive, name='inference-client', daemon=True).start()
+
+    def add_reload_listener(self, listener):
+        self._reload_listeners.append(listener)
+
+    def _request(self, kind, vehicle_type, image=None):
+        future = Future()
+        with self._send_lock:
+            request_id = next(self._request_ids)
+            self._pending[request_id] = future
+            try:
+                self._connection.send((request_id, kind, vehicle_type, image))
+            except Exception:
+                del self._pending[request_id]
+                raise
+        return future
+
+    def _receive(self):
+        while True:
+            try:
+                request_id, value, error = self._connection.recv()
+            except (EOFError, OSError):
+                break
+            future = self._pending.pop(request_id)
+            if error is None:
+                future.set_result(value)
+            else:
+                future.set_exception(error)
+        for request_id in list(self._pending):
+            self._pending.pop(request_id).set_exception(RuntimeError('The inference process has stopped'))
+
+    def submit(self, vehicle_type, image):
+        return self._request('detect', vehicle_type, image)
+
+    def get(self, vehicle_type):
+        model = self._models.get(vehicle_type)
+        if model is not None and time.monotonic() - model.checked_at < self.reload_interval:
+            return model
+        description = self._request('describe', vehicle_type).result()
+        if description is None:
+            return model
+        checksum, names = description
+        if model is not None and model.checksum == checksum:
+            model.checked_at = time.monotonic()
+            return model
+        self._models[vehicle_type] = RemoteModel(self, vehicle_type, checksum, names)
+        if model is not None:
+            for listener in self._reload_listeners:
+                listener(vehicle_type)
+        return self._models[vehicle_type]
@@ -0,0 +1,78 @@
+"""Upload ingest: bounded reads and decode-time downscaling.
+
+Phone photos are often 12-50 MP while the detector works at a few hundred
+pixels per side. JPEGs are decoded with Pillow's draft mode, which lets
+libjpeg scale by 1/2, 1/4 or 1/8 during decoding, and the result is shrunk to
+at most max_side pixels. EXIF orientation is applied once and the pixels end
+up in a single contiguous BGR array that is used both for inference and for
+drawing the annotations.
+
+Walkaround videos are not read into memory: save_upload streams them into the
+upload store for a job worker to read frame by frame (see video.py).
+"""
+import io
+
+VIDEO_EXTENSIONS = {'.mp4', '.mov', '.m4v', '.avi', '.mkv', '.webm', '.3gp'}
+
+
+class ImageTooLarge(ValueError):
+    pass
+
+
+class VideoTooLarge(ValueError):
+    pass
+
+
+def read_upload(stream, max_bytes, chunk_size=1 << 16):
+    chunks = []
+    total = 0
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+        total += len(chunk)
+        if total > max_bytes:
+            raise ImageTooLarge(f'Image exceeds {max_bytes // (1024 * 1024)} MB.')
+        chunks.append(chunk)
+    return b''.join(chunks)
+
+
+def save_upload(stream, store, suffix, max_bytes, chunk_size=1 << 20):
+    """Copy an uploaded video into store under a new key; returns the key."""
+    key = store.new_key(suffix)
+    total = 0
+    with store.staging(key) as staging:
+        with open(staging, 'wb') as f:
+            while True:
+                chunk = stream.read(chunk_size)
+                if not chunk:
+                    break
+                total += len(chunk)
+                if total > max_bytes:
+                    raise VideoTooLarge(f'Video exceeds {max_bytes // (1024 * 1024)} MB.')
+                f.write(chunk)
+    return key
+
+
+def image_size(image_bytes):
+    # Only the header is parsed; the pixels are not decoded.
+    from PIL import Image
+    with Image.open(io.BytesIO(image_bytes)) as image:
+        return image.size
+
+
+def decode_image(image_bytes, max_side=1280):
+    # Imported here so the web process can use read_upload without loading them.
+    from PIL import Image, ImageOps
+    import numpy as np
+    import cv2
+
+    with Image.open(io.BytesIO(image_bytes)) as image:
+        image.draft('RGB', (max_side, max_side))
+        image = ImageOps.exif_transpose(image)
+        if max(image.size) > max_side:
+            image.thumbnail((max_side, max_side), Image.BILINEAR)
+        if image.mode != 'RGB':
+            image = image.convert('RGB')
+        pixels = np.array(image)
+    return cv2.cvtColor(pixels, cv2.COLOR_RGB2BGR, dst=pixels)
@@ -0,0 +1,116 @@
+"""Local worker pool for assessment jobs.
+
+Jobs run pipeline.run_assessment either in a process pool (the default, which
+keeps CPU-bound inference off the web workers) or in a thread pool sharing the
+web process's model registry and batcher. Progress reported by the workers is
+drained on a listener thread and handed to the app's callbacks together with
+the final result, so no external broker is needed.
+
+In process mode the models live in one more process, which runs the
+registry and batcher (see inference.serve). The job workers send it their
+images, so photos from different uploads are batched in either mode.
+"""
+import multiprocessing
+import os
+import queue
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+
+class JobManager:
+    def __init__(self, app, on_progress, on_complete, on_failure, settings,
+                 max_workers=2, mode='process', registry=None, batcher=None):
+        self.app = app
+        self.on_progress = on_progress
+        self.on_complete = on_complete
+        self.on_failure = on_failure
+        self.settings = settings
+        self.max_workers = max_workers
+        self.mode = mode
+        self.registry = registry
+        self.batcher = batcher
+        self._executor = None
+        self._inference = None
+        self._progress = None
+        self._lock = threading.Lock()
+
+    def _start(self):
+        # Started lazily so forking servers create the pool after the fork, and
+        # the pipeline (NumPy, OpenCV, the model code) is only imported here.
+        import pipeline
+        if self.mode == 'process':
+            context = multiprocessing.get_context('spawn')
+            self._progress = context.Queue()
+            settings = dict(self.settings, inference=self._start_inference(context))
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=context,
+                initializer=pipeline.init_worker,
+                initargs=(settings, self._progress),
+            )
+        else:
+            self._progress = queue.Queue()
+            pipeline.init_worker(self.settings, progress=self._progress,
+                                 registry=self.registry, batcher=self.batcher)
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                thread_name_prefix='assessment')
+        threading.Thread(target=self._drain_progress, name='assessment-progress', daemon=True).start()
+
+    def _start_inference(self, context, timeout=60):
+        import inference
+        authkey = os.urandom(32)
+        receiver, sender = context.Pipe(duplex=False)
+        self._inference = context.Process(target=inference.serve, args=(self.settings, authkey, sender),
+                                          name='inference', daemon=True)
+        self._inference.start()
+        sender.close()
+        if not receiver.poll(timeout):
+            raise RuntimeError('The inference process did not start')
+        return {'address': receiver.recv(), 'authkey': authkey}
+
+    def start(self):
+        """Start the pool now instead of on the first submit.
+
+        In process mode the inference process starts loading the models, and
+        one no-op task per worker makes the pool spawn every worker.
+        """
+        with self._lock:
+            if self._executor is not None:
+                return
+            self._start()
+        if self.mode == 'process':
+            import pipeline
+            for _ in range(self.max_workers):
+                self._executor.submit(pipeline.worker_ready)
+
+    def _drain_progress(self):
+        while True:
+            job_id, status, progress = self._progress.get()
+            with self.app.app_context():
+                try:
+                    self.on_progress(job_id, status, progress)
+                except Exception:
+                    self.app.logger.exception('Failed to record progress for job %s', job_id)
+
+    def submit(self, job_id, *args, task='run_assessment'):
+        with self._lock:
+            if self._executor is None:
+                self._start()
+        import pipeline
+        future = self._executor.submit(getattr(pipeline, task), job_id, *args)
+        future.add_done_callback(lambda f: self._finish(job_id, f))
+        return future
+
+    def _finish(self, job_id, future):
+        with self.app.app_context():
+            try:
+                output = future.result()
+            except Exception as e:
+                self.app.logger.exception('Assessment job %s failed', job_id)
+                self.on_failure(job_id, e)
+                return
+            try:
+                self.on_complete(job_id, output)
+            except Exception as e:
+                self.app.logger.exception('Assessment job %s failed', job_id)
+                self.on_failure(job_id, e)
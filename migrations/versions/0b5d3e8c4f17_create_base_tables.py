@@ -0,0 +1,55 @@
+"""Create user and vehicle_damage tables
+
+Revision ID: 0b5d3e8c4f17
+Revises: 
+Create Date: 2026-10-17 18:42:06.504371
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0b5d3e8c4f17'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # These tables used to come from db.create_all(); existing SQLite files
+    # already have them, so only an empty database (e.g. a new PostgreSQL
+    # server) gets them created here. Offline --sql output assumes empty.
+    existing = [] if op.get_context().as_sql else sa.inspect(op.get_bind()).get_table_names()
+    if 'user' not in existing:
+        op.create_table('user',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('username', sa.String(length=150), nullable=False),
+            sa.Column('email', sa.String(length=150), nullable=False),
+            sa.Column('password', sa.String(length=150), nullable=False),
+            sa.Column('age', sa.Integer(), nullable=False),
+            sa.Column('gender', sa.String(length=1), nullable=False),
+            sa.Column('mobile', sa.String(length=15), nullable=False),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('email'),
+            sa.UniqueConstraint('username')
+        )
+    if 'vehicle_damage' not in existing:
+        op.create_table('vehicle_damage',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('vehicle_type', sa.String(length=100), nullable=False),
+            sa.Column('vehicle_brand', sa.String(length=100), nullable=False),
+            sa.Column('detected_damage', sa.String(length=100), nullable=False),
+            sa.Column('cost', sa.Float(), nullable=False),
+            sa.Column('total_cost', sa.Float(), nullable=False),
+            sa.Column('image_path', sa.String(length=200), nullable=False),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.Column('user_id', sa.Integer(), nullable=False),
+            sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+            sa.PrimaryKeyConstraint('id')
+        )
+
+
+def downgrade():
+    op.drop_table('vehicle_damage')
+    op.drop_table('user')
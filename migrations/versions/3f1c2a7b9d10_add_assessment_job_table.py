@@ -0,0 +1,42 @@
+"""Add assessment_job table
+
+Revision ID: 3f1c2a7b9d10
+Revises: 99275a4c2a9c
+Create Date: 2026-10-17 10:12:41.284113
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f1c2a7b9d10'
+down_revision = '99275a4c2a9c'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('assessment_job',
+        sa.Column('id', sa.String(length=32), nullable=False),
+        sa.Column('vehicle_type', sa.String(length=100), nullable=False),
+        sa.Column('vehicle_brand', sa.String(length=100), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('progress', sa.Integer(), nullable=False),
+        sa.Column('error', sa.String(length=255), nullable=True),
+        sa.Column('result', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+        sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('assessment_job', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_assessment_job_user_id'), ['user_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('assessment_job', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_assessment_job_user_id'))
+
+    op.drop_table('assessment_job')
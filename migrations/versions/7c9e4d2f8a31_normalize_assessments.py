@@ -0,0 +1,121 @@
+"""Replace vehicle_damage rows with assessment and damage_item tables
+
+Revision ID: 7c9e4d2f8a31
+Revises: 3f1c2a7b9d10
+Create Date: 2026-10-17 14:03:27.918442
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7c9e4d2f8a31'
+down_revision = '3f1c2a7b9d10'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('assessment',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('vehicle_type', sa.String(length=100), nullable=False),
+        sa.Column('vehicle_brand', sa.String(length=100), nullable=False),
+        sa.Column('total_cost', sa.Float(), nullable=False),
+        sa.Column('image_path', sa.String(length=200), nullable=False),
+        sa.Column('pdf_path', sa.String(length=200), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+        sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('assessment', schema=None) as batch_op:
+        batch_op.create_index('ix_assessment_user_id_created_at', ['user_id', 'created_at'], unique=False)
+
+    op.create_table('damage_item',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('detected_damage', sa.String(length=100), nullable=False),
+        sa.Column('cost', sa.Float(), nullable=False),
+        sa.Column('description', sa.String(length=255), nullable=True),
+        sa.Column('assessment_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['assessment_id'], ['assessment.id'], ),
+        sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('damage_item', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_damage_item_assessment_id'), ['assessment_id'], unique=False)
+
+    with op.batch_alter_table('assessment_job', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('assessment_id', sa.Integer(), nullable=True))
+        batch_op.create_foreign_key('fk_assessment_job_assessment_id', 'assessment', ['assessment_id'], ['id'])
+
+    if not op.get_context().as_sql and 'vehicle_damage' not in sa.inspect(op.get_bind()).get_table_names():
+        return
+
+    # Every upload wrote one vehicle_damage row per detection sharing the
+    # same image_path, so each (user_id, image_path) group is one assessment.
+    op.execute("""
+        INSERT INTO assessment (vehicle_type, vehicle_brand, total_cost, image_path, created_at, user_id)
+        SELECT MIN(vehicle_type), MIN(vehicle_brand), MAX(total_cost), image_path, MIN(created_at), user_id
+        FROM vehicle_damage
+        GROUP BY user_id, image_path
+    """)
+    op.execute("""
+        INSERT INTO damage_item (detected_damage, cost, assessment_id)
+        SELECT vd.detected_damage, vd.cost, a.id
+        FROM vehicle_damage vd
+        JOIN assessment a ON a.user_id = vd.user_id AND a.image_path = vd.image_path
+        ORDER BY vd.id
+    """)
+    # vehicle_damage kept no description; derive it from the damage name as
+    # get_damage_description does for new assessments.
+    from pricing import DAMAGE_DESCRIPTIONS_MAP
+    damage_item = sa.table('damage_item', sa.column('detected_damage', sa.String()),
+                           sa.column('description', sa.String()))
+    damage_name = sa.func.lower(damage_item.c.detected_damage)
+    op.execute(damage_item.update().values(description=sa.case(
+        *[(damage_name.contains(key), description)
+          for key, description in DAMAGE_DESCRIPTIONS_MAP.items() if key != 'default'],
+        else_=DAMAGE_DESCRIPTIONS_MAP['default'])))
+    # Some rows name the file as 'static/<name>'; artifacts are looked up by
+    # bare name in the static folder.
+    op.execute("""
+        UPDATE assessment SET image_path = substr(image_path, 8)
+        WHERE image_path LIKE 'static/%'
+    """)
+    op.drop_table('vehicle_damage')
+
+
+def downgrade():
+    op.create_table('vehicle_damage',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('vehicle_type', sa.String(length=100), nullable=False),
+        sa.Column('vehicle_brand', sa.String(length=100), nullable=False),
+        sa.Column('detected_damage', sa.String(length=100), nullable=False),
+        sa.Column('cost', sa.Float(), nullable=False),
+        sa.Column('total_cost', sa.Float(), nullable=False),
+        sa.Column('image_path', sa.String(length=200), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.execute("""
+        INSERT INTO vehicle_damage (vehicle_type, vehicle_brand, detected_damage, cost, total_cost, image_path, created_at, user_id)
+        SELECT a.vehicle_type, a.vehicle_brand, di.detected_damage, di.cost, a.total_cost, a.image_path, a.created_at, a.user_id
+        FROM damage_item di
+        JOIN assessment a ON a.id = di.assessment_id
+        ORDER BY di.id
+    """)
+
+    with op.batch_alter_table('assessment_job', schema=None) as batch_op:
+        batch_op.drop_constraint('fk_assessment_job_assessment_id', type_='foreignkey')
+        batch_op.drop_column('assessment_id')
+
+    with op.batch_alter_table('damage_item', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_damage_item_assessment_id'))
+
+    op.drop_table('damage_item')
+    with op.batch_alter_table('assessment', schema=None) as batch_op:
+        batch_op.drop_index('ix_assessment_user_id_created_at')
+
+    op.drop_table('assessment')
@@ -1,7 +1,7 @@
 """Added user_status column
 
 Revision ID: 99275a4c2a9c
-Revises: 
+Revises: 0b5d3e8c4f17
 Create Date: 2025-08-20 16:53:16.617830
 
 """
@@ -11,7 +11,7 @@ import sqlalchemy as sa
 
 # revision identifiers, used by Alembic.
 revision = '99275a4c2a9c'
-down_revision = None
+down_revision = '0b5d3e8c4f17'
 branch_labels = None
 depends_on = None
 
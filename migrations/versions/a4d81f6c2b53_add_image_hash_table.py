@@ -0,0 +1,58 @@
+"""Add image_hash table and assessment.duplicate_of
+
+Revision ID: a4d81f6c2b53
+Revises: 7c9e4d2f8a31
+Create Date: 2026-10-17 18:42:05.316270
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a4d81f6c2b53'
+down_revision = '7c9e4d2f8a31'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('image_hash',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('assessment_id', sa.Integer(), nullable=False),
+        sa.Column('position', sa.Integer(), nullable=False),
+        sa.Column('hash', sa.BigInteger(), nullable=False),
+        sa.Column('band0', sa.Integer(), nullable=False),
+        sa.Column('band1', sa.Integer(), nullable=False),
+        sa.Column('band2', sa.Integer(), nullable=False),
+        sa.Column('band3', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['assessment_id'], ['assessment.id'], ),
+        sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('image_hash', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_image_hash_assessment_id'), ['assessment_id'], unique=False)
+        batch_op.create_index(batch_op.f('ix_image_hash_band0'), ['band0'], unique=False)
+        batch_op.create_index(batch_op.f('ix_image_hash_band1'), ['band1'], unique=False)
+        batch_op.create_index(batch_op.f('ix_image_hash_band2'), ['band2'], unique=False)
+        batch_op.create_index(batch_op.f('ix_image_hash_band3'), ['band3'], unique=False)
+
+    with op.batch_alter_table('assessment', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('duplicate_of', sa.Integer(), nullable=True))
+        batch_op.create_index(batch_op.f('ix_assessment_duplicate_of'), ['duplicate_of'], unique=False)
+        batch_op.create_foreign_key('fk_assessment_duplicate_of', 'assessment', ['duplicate_of'], ['id'])
+
+
+def downgrade():
+    with op.batch_alter_table('assessment', schema=None) as batch_op:
+        batch_op.drop_constraint('fk_assessment_duplicate_of', type_='foreignkey')
+        batch_op.drop_index(batch_op.f('ix_assessment_duplicate_of'))
+        batch_op.drop_column('duplicate_of')
+
+    with op.batch_alter_table('image_hash', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_image_hash_band3'))
+        batch_op.drop_index(batch_op.f('ix_image_hash_band2'))
+        batch_op.drop_index(batch_op.f('ix_image_hash_band1'))
+        batch_op.drop_index(batch_op.f('ix_image_hash_band0'))
+        batch_op.drop_index(batch_op.f('ix_image_hash_assessment_id'))
+
+    op.drop_table('image_hash')
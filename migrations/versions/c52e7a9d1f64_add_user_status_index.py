@@ -0,0 +1,31 @@
+"""Index user.user_status for the admin user listings
+
+Revision ID: c52e7a9d1f64
+Revises: a4d81f6c2b53
+Create Date: 2026-10-17 21:15:48.602913
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c52e7a9d1f64'
+down_revision = 'a4d81f6c2b53'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Rows from before user_status existed are pending; giving them the value
+    # lets the listing filter on one status and read it in index order.
+    user = sa.table('user', sa.column('user_status'))
+    op.execute(user.update().where(user.c.user_status.is_(None)).values(user_status='Pending'))
+
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.create_index('ix_user_user_status_id', ['user_status', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.drop_index('ix_user_user_status_id')
@@ -0,0 +1,26 @@
+"""Index lower(username) and lower(email) for the admin user search
+
+Revision ID: e3b8f05a7c42
+Revises: c52e7a9d1f64
+Create Date: 2026-10-18 09:12:31.418205
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e3b8f05a7c42'
+down_revision = 'c52e7a9d1f64'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_user_username_lower', 'user', [sa.text('lower(username)')], unique=False)
+    op.create_index('ix_user_email_lower', 'user', [sa.text('lower(email)')], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_user_email_lower', table_name='user')
+    op.drop_index('ix_user_username_lower', table_name='user')
@@ -0,0 +1,104 @@
+"""Database models."""
+from datetime import datetime
+import json
+
+from flask_login import UserMixin
+
+from extensions import db
+
+
+class User(db.Model, UserMixin):
+    __table_args__ = (db.Index('ix_user_user_status_id', 'user_status', 'id'),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    username = db.Column(db.String(150), unique=True, nullable=False)
+    email = db.Column(db.String(150), unique=True, nullable=False)
+    password = db.Column(db.String(150), nullable=False)
+    age = db.Column(db.Integer, nullable=False)
+    gender = db.Column(db.String(1), nullable=False)
+    mobile = db.Column(db.String(15), nullable=False)
+    user_status = db.Column(db.String(10), default='Pending')
+    assessments = db.relationship('Assessment', backref='user', lazy=True)
+
+
+# For the admin search, which matches usernames and emails case-insensitively.
+db.Index('ix_user_username_lower', db.func.lower(User.username))
+db.Index('ix_user_email_lower', db.func.lower(User.email))
+
+
+class Assessment(db.Model):
+    __table_args__ = (db.Index('ix_assessment_user_id_created_at', 'user_id', 'created_at'),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    vehicle_type = db.Column(db.String(100), nullable=False)
+    vehicle_brand = db.Column(db.String(100), nullable=False)
+    total_cost = db.Column(db.Float, nullable=False)
+    image_path = db.Column(db.String(200), nullable=False)
+    pdf_path = db.Column(db.String(200))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    duplicate_of = db.Column(db.Integer, db.ForeignKey('assessment.id'), index=True)
+    items = db.relationship('DamageItem', backref='assessment', lazy=True,
+                            cascade='all, delete-orphan', order_by='DamageItem.id')
+    image_hashes = db.relationship('ImageHash', lazy=True, cascade='all, delete-orphan',
+                                   order_by='ImageHash.position')
+    original = db.relationship('Assessment', remote_side=[id])
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'vehicle_type': self.vehicle_type,
+            'vehicle_brand': self.vehicle_brand,
+            'total_cost': self.total_cost,
+            'image_path': self.image_path,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'damages': [{'detected_damage': item.detected_damage, 'cost': item.cost} for item in self.items],
+        }
+
+
+class DamageItem(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    detected_damage = db.Column(db.String(100), nullable=False)
+    cost = db.Column(db.Float, nullable=False)
+    description = db.Column(db.String(255))
+    assessment_id = db.Column(db.Integer, db.ForeignKey('assessment.id'), nullable=False, index=True)
+
+
+class ImageHash(db.Model):
+    # Perceptual hash of one photo, split into bands for dedup.DuplicateIndex.
+    id = db.Column(db.Integer, primary_key=True)
+    assessment_id = db.Column(db.Integer, db.ForeignKey('assessment.id'), nullable=False, index=True)
+    position = db.Column(db.Integer, nullable=False)
+    hash = db.Column(db.BigInteger, nullable=False)
+    band0 = db.Column(db.Integer, nullable=False, index=True)
+    band1 = db.Column(db.Integer, nullable=False, index=True)
+    band2 = db.Column(db.Integer, nullable=False, index=True)
+    band3 = db.Column(db.Integer, nullable=False, index=True)
+
+
+class AssessmentJob(db.Model):
+    id = db.Column(db.String(32), primary_key=True)
+    vehicle_type = db.Column(db.String(100), nullable=False)
+    vehicle_brand = db.Column(db.String(100), nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='queued')
+    progress = db.Column(db.Integer, nullable=False, default=0)
+    error = db.Column(db.String(255))
+    result = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
+    assessment_id = db.Column(db.Integer, db.ForeignKey('assessment.id'))
+    user = db.relationship('User')
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'vehicle_type': self.vehicle_type,
+            'vehicle_brand': self.vehicle_brand,
+            'status': self.status,
+            'progress': self.progress,
+            'error': self.error,
+            'assessment_id': self.assessment_id,
+            'result': json.loads(self.result) if self.result else None,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+        }
@@ -0,0 +1,176 @@
+"""ONNX Runtime backend for the damage detection models.
+
+An entry in MODEL_PATHS that ends in ``.onnx`` is loaded here instead of
+through ultralytics, so CPU-only workers do not have to import torch. Images
+are letterboxed and batched with NumPy, and the raw YOLO head output goes
+through confidence filtering and class-aware NMS in NumPy. The results have
+the same boxes.xyxy / boxes.conf / boxes.cls / names layout as ultralytics
+results, so the pipeline and the annotation code work with either backend.
+The OpenVINO execution provider is used when onnxruntime was built with it.
+
+Models are exported from the .pt weights with export_onnx (optionally
+followed by dynamic int8 quantization), and compare_detections measures how
+closely an exported model matches the PyTorch one before switching over.
+"""
+import ast
+import os
+
+import numpy as np
+import cv2
+
+from inference import as_numpy
+
+PREFERRED_PROVIDERS = ['OpenVINOExecutionProvider', 'CPUExecutionProvider']
+
+
+class Boxes:
+    def __init__(self, xyxy, conf, cls):
+        self.xyxy = xyxy
+        self.conf = conf
+        self.cls = cls
+
+    def __len__(self):
+        return len(self.cls)
+
+
+class Result:
+    def __init__(self, names, boxes, orig_shape):
+        self.names = names
+        self.boxes = boxes
+        self.orig_shape = orig_shape
+
+
+def letterbox(image, size, pad_value=114):
+    h, w = image.shape[:2]
+    scale = min(size / h, size / w)
+    new_w, new_h = round(w * scale), round(h * scale)
+    left, top = (size - new_w) // 2, (size - new_h) // 2
+    canvas = np.full((size, size, 3), pad_value, dtype=np.uint8)
+    canvas[top:top + new_h, left:left + new_w] = cv2.resize(image, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+    return canvas, scale, (left, top)
+
+
+def box_iou(box, boxes):
+    x1 = np.maximum(box[0], boxes[:, 0])
+    y1 = np.maximum(box[1], boxes[:, 1])
+    x2 = np.minimum(box[2], boxes[:, 2])
+    y2 = np.minimum(box[3], boxes[:, 3])
+    intersection = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area = (box[2] - box[0]) * (box[3] - box[1])
+    areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+    return intersection / np.maximum(area + areas - intersection, 1e-9)
+
+
+def nms(boxes, scores, iou_threshold):
+    order = scores.argsort()[::-1]
+    keep = []
+    while order.size:
+        best = order[0]
+        keep.append(best)
+        order = order[1:][box_iou(boxes[best], boxes[order[1:]]) <= iou_threshold]
+    return np.asarray(keep, dtype=np.intp)
+
+
+def postprocess(prediction, num_classes=None, conf_threshold=0.25, iou_threshold=0.45, max_det=300):
+    # YOLOv8-style head: (4 + num_classes, anchors) with centre-size boxes.
+    channels = 4 + num_classes if num_classes else min(prediction.shape)
+    if prediction.shape[0] != channels:
+        prediction = prediction.T
+    scores = prediction[4:]
+    class_ids = scores.argmax(axis=0)
+    conf = scores[class_ids, np.arange(scores.shape[1])]
+    mask = conf > conf_threshold
+    cx, cy, w, h = prediction[:4, mask]
+    xyxy = np.stack([cx - w / 2, cy - h / 2, cx + w / 2, cy + h / 2], axis=1)
+    conf, class_ids = conf[mask], class_ids[mask]
+    # Offsetting boxes by class keeps NMS from suppressing across classes.
+    keep = nms(xyxy + class_ids[:, None] * 7680.0, conf, iou_threshold)[:max_det]
+    return xyxy[keep], conf[keep], class_ids[keep]
+
+
+class OnnxDetector:
+    def __init__(self, path, conf=0.25, iou=0.45, providers=None):
+        import onnxruntime as ort
+        available = ort.get_available_providers()
+        providers = providers or [p for p in PREFERRED_PROVIDERS if p in available]
+        self.session = ort.InferenceSession(path, providers=providers)
+        self.input = self.session.get_inputs()[0]
+        metadata = self.session.get_modelmeta().custom_metadata_map
+        self.names = ast.literal_eval(metadata['names']) if 'names' in metadata else {}
+        size = self.input.shape[2]
+        self.imgsz = size if isinstance(size, int) else ast.literal_eval(metadata.get('imgsz', '[640, 640]'))[0]
+        # A static batch dimension means the model was exported without dynamic=True.
+        self.max_batch = self.input.shape[0] if isinstance(self.input.shape[0], int) else None
+        self.conf = conf
+        self.iou = iou
+
+    def __call__(self, source, conf=None, iou=None, **kwargs):
+        images = source if isinstance(source, (list, tuple)) else [source]
+        conf = self.conf if conf is None else conf
+        iou = self.iou if iou is None else iou
+        results = []
+        step = self.max_batch or len(images) or 1
+        for start in range(0, len(images), step):
+            results.extend(self._predict(images[start:start + step], conf, iou))
+        return results
+
+    def _predict(self, images, conf, iou):
+        boxed = [letterbox(np.asarray(image), self.imgsz) for image in images]
+        batch = np.stack([canvas for canvas, _, _ in boxed])[..., ::-1].transpose(0, 3, 1, 2)
+        batch = np.ascontiguousarray(batch, dtype=np.float32) / 255.0
+        predictions = self.session.run(None, {self.input.name: batch})[0]
+
+        results = []
+        for image, (_, scale, (left, top)), prediction in zip(images, boxed, predictions):
+            xyxy, scores, class_ids = postprocess(prediction, len(self.names), conf, iou)
+            h, w = image.shape[:2]
+            xyxy = (xyxy - [left, top, left, top]) / scale
+            xyxy = np.clip(xyxy, 0, [w, h, w, h]).astype(np.float32)
+            results.append(Result(self.names, Boxes(xyxy, scores.astype(np.float32), class_ids.astype(np.float32)),
+                                  (h, w)))
+        return results
+
+
+def export_onnx(pt_path, imgsz=640, int8=False):
+    from ultralytics import YOLO
+    onnx_path = YOLO(pt_path).export(format='onnx', imgsz=imgsz, dynamic=True, simplify=True)
+    if not int8:
+        return onnx_path
+
+    import onnx
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    int8_path = os.path.splitext(onnx_path)[0] + '.int8.onnx'
+    quantize_dynamic(onnx_path, int8_path, weight_type=QuantType.QUInt8)
+    # Keep the class names and image size the exporter stored in the metadata.
+    source, quantized = onnx.load(onnx_path), onnx.load(int8_path)
+    onnx.helper.set_model_props(quantized, {prop.key: prop.value for prop in source.metadata_props})
+    onnx.save(quantized, int8_path)
+    return int8_path
+
+
+def compare_detections(reference, candidate, iou_threshold=0.5):
+    """Greedy per-class IoU matching of two backends' results for the same images."""
+    stats = {'images': 0, 'reference': 0, 'candidate': 0, 'matched': 0,
+             'class_mismatch_images': 0, 'conf_delta': 0.0}
+    for ref, cand in zip(reference, candidate):
+        ref_xyxy, ref_conf, ref_cls = (as_numpy(v) for v in (ref.boxes.xyxy, ref.boxes.conf, ref.boxes.cls))
+        cand_xyxy, cand_conf, cand_cls = (as_numpy(v) for v in (cand.boxes.xyxy, cand.boxes.conf, cand.boxes.cls))
+        stats['images'] += 1
+        stats['reference'] += len(ref_cls)
+        stats['candidate'] += len(cand_cls)
+        if sorted(ref_cls.tolist()) != sorted(cand_cls.tolist()):
+            stats['class_mismatch_images'] += 1
+        unmatched = np.ones(len(cand_cls), dtype=bool)
+        for i in np.argsort(-ref_conf):
+            candidates = np.flatnonzero(unmatched & (cand_cls == ref_cls[i]))
+            if candidates.size == 0:
+                continue
+            ious = box_iou(ref_xyxy[i], cand_xyxy[candidates])
+            best = ious.argmax()
+            if ious[best] >= iou_threshold:
+                unmatched[candidates[best]] = False
+                stats['matched'] += 1
+                stats['conf_delta'] = max(stats['conf_delta'], abs(float(ref_conf[i] - cand_conf[candidates[best]])))
+    stats['recall'] = stats['matched'] / stats['reference'] if stats['reference'] else 1.0
+    stats['precision'] = stats['matched'] / stats['candidate'] if stats['candidate'] else 1.0
+    return stats
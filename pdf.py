@@ -0,0 +1,193 @@
+"""PDF rendering for damage assessment reports.
+
+Paragraph styles and the company header are built once at import; each
+report gets shallow copies of the header paragraphs so concurrent builds
+never share layout state. Importing this module loads ReportLab, so the web
+app only imports it, through reports.ensure_report, when a report is built.
+"""
+import copy
+import os
+
+from PIL import Image
+
+# --- ReportLab Imports ---
+from reportlab.lib.pagesizes import letter
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Image as RLImage, Table, TableStyle
+from reportlab.lib import colors
+from reportlab.lib.enums import TA_RIGHT
+
+COMPANY_INFO = {
+    "name": "AUTOASSESS AI SOLUTIONS",
+    "address": "123 Tech Park, Innovation Way",
+    "city": "Bangalore, KA 560001",
+    "phone": "+91 98765 43210",
+    "email": "support@autoassess.ai"
+}
+
+# --- Styles ---
+_styles = getSampleStyleSheet()
+
+# IMPORTANT: leading (22) must be > fontSize (18) to prevent overlap
+S_COMPANY_NAME = ParagraphStyle('CompanyName', parent=_styles['Normal'], fontName='Helvetica-Bold', fontSize=18,
+                                leading=22, textColor=colors.HexColor('#003366'), spaceAfter=6)
+S_COMPANY_DETAILS = ParagraphStyle('CompanyDetails', parent=_styles['Normal'], fontSize=9, leading=12,
+                                   textColor=colors.HexColor('#555555'))
+S_REPORT_TITLE = ParagraphStyle('ReportTitle', parent=_styles['Heading1'], fontSize=16, alignment=TA_RIGHT,
+                                textColor=colors.HexColor('#2980b9'), spaceAfter=2)
+S_REPORT_META = ParagraphStyle('ReportMeta', parent=_styles['Normal'], fontSize=9, leading=12, alignment=TA_RIGHT)
+S_NORMAL = ParagraphStyle('MyBody', parent=_styles['Normal'], fontSize=9, leading=11)
+S_TABLE_HEADER = ParagraphStyle('TH', parent=S_NORMAL, textColor=colors.white)
+S_TABLE_HEADER_RIGHT = ParagraphStyle('TH_R', parent=S_NORMAL, textColor=colors.white, alignment=TA_RIGHT)
+S_CELL_RIGHT = ParagraphStyle('TC_R', parent=S_NORMAL, alignment=TA_RIGHT)
+S_TOTAL_LABEL = ParagraphStyle('TotalLabel', parent=S_NORMAL, fontSize=10, alignment=TA_RIGHT)
+S_TOTAL_VALUE = ParagraphStyle('TotalVal', parent=S_NORMAL, fontSize=10, alignment=TA_RIGHT,
+                               textColor=colors.HexColor('#c0392b'))
+S_DISCLAIMER = ParagraphStyle('Disc', parent=S_NORMAL, fontSize=7, textColor=colors.grey)
+
+HEADER_TABLE_STYLE = TableStyle([
+    ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+    ('LEFTPADDING', (0, 0), (-1, -1), 0),
+    ('RIGHTPADDING', (0, 0), (-1, -1), 0),
+])
+VEHICLE_TABLE_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, -1), colors.HexColor('#f0f2f5')),
+    ('BOX', (0, 0), (-1, -1), 0.5, colors.grey),
+    ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+    ('TOPPADDING', (0, 0), (-1, -1), 8),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
+])
+COST_TABLE_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#2c3e50')),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+    ('GRID', (0, 0), (-1, -2), 0.5, colors.HexColor('#bdc3c7')),
+    ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+    ('TOPPADDING', (0, 0), (-1, -1), 6),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
+    ('LINEBELOW', (0, -2), (-1, -2), 1, colors.black),
+])
+
+# --- Static flowables ---
+_COMPANY_INFO_CONTENT = [
+    Paragraph(COMPANY_INFO['name'], S_COMPANY_NAME),
+    Paragraph(COMPANY_INFO['address'], S_COMPANY_DETAILS),
+    Paragraph(f"{COMPANY_INFO['city']} | {COMPANY_INFO['phone']}", S_COMPANY_DETAILS),
+    Paragraph(COMPANY_INFO['email'], S_COMPANY_DETAILS),
+]
+_REPORT_TITLE = Paragraph("DAMAGE ASSESSMENT REPORT", S_REPORT_TITLE)
+_GENERATED_BY = Paragraph("<b>Generated by:</b> AI AutoAssess System", S_REPORT_META)
+_TABLE_HEADER = [
+    Paragraph("<b>COMPONENT</b>", S_TABLE_HEADER),
+    Paragraph("<b>ASSESSMENT NOTES</b>", S_TABLE_HEADER),
+    Paragraph("<b>COST (INR)</b>", S_TABLE_HEADER_RIGHT),
+]
+_TOTAL_LABEL = Paragraph("<b>TOTAL ESTIMATE</b>", S_TOTAL_LABEL)
+_DISCLAIMER = Paragraph("<b>DISCLAIMER:</b> This is an AI-generated estimate. Actual repair costs may vary. "
+                        "Please consult a certified service center.", S_DISCLAIMER)
+_SIGNATURE_ROWS = [
+    [Paragraph("__________________________", S_NORMAL), Paragraph("", S_NORMAL)],
+    [Paragraph("Authorized Signature", S_NORMAL), Paragraph("", S_NORMAL)],
+]
+
+
+def _fresh(flowables):
+    return [copy.copy(flowable) for flowable in flowables]
+
+
+def get_image_dims(image_path, max_width, max_height):
+    try:
+        with Image.open(image_path) as img:
+            width, height = img.size
+            aspect = width / float(height)
+            if width > max_width:
+                width = max_width
+                height = width / aspect
+            if height > max_height:
+                height = max_height
+                width = height * aspect
+            return width, height
+    except:
+        return max_width, max_height
+
+
+def generate_pdf(pdf_save_path, report_id, report_date, vehicle_type, brand, damage_details, total_cost,
+                 image_path, customer_name):
+    doc = SimpleDocTemplate(
+        pdf_save_path,
+        pagesize=letter,
+        rightMargin=40, leftMargin=40,
+        topMargin=30, bottomMargin=30
+    )
+    elements = []
+
+    # 1. Header Section (Two Columns)
+    report_meta_content = [
+        copy.copy(_REPORT_TITLE),
+        Paragraph(f"<b>Date:</b> {report_date.strftime('%d-%b-%Y')}", S_REPORT_META),
+        Paragraph(f"<b>Report ID:</b> {report_id}", S_REPORT_META),
+        copy.copy(_GENERATED_BY),
+    ]
+    header_table = Table([[_fresh(_COMPANY_INFO_CONTENT), report_meta_content]], colWidths=[300, 230])
+    header_table.setStyle(HEADER_TABLE_STYLE)
+    elements.append(header_table)
+    elements.append(Spacer(1, 15))
+
+    # Horizontal Divider
+    elements.append(Table([['']], colWidths=[530], style=[('LINEBELOW', (0, 0), (-1, -1), 1, colors.HexColor('#bdc3c7'))]))
+    elements.append(Spacer(1, 15))
+
+    # 2. Vehicle & User Info Strip
+    v_data = [[
+        Paragraph(f"<b>VEHICLE:</b><br/>{vehicle_type.upper()}", S_NORMAL),
+        Paragraph(f"<b>BRAND/MODEL:</b><br/>{brand.upper()}", S_NORMAL),
+        Paragraph(f"<b>CUSTOMER:</b><br/>{customer_name.upper()}", S_NORMAL)
+    ]]
+    t_vehicle = Table(v_data, colWidths=[175, 175, 180])
+    t_vehicle.setStyle(VEHICLE_TABLE_STYLE)
+    elements.append(t_vehicle)
+    elements.append(Spacer(1, 20))
+
+    # 3. Damage Cost Table
+    table_data = [_fresh(_TABLE_HEADER)]
+    for damage in damage_details:
+        part = damage['damage_type'].replace('-', ' ').title()
+        desc = damage.get('description') or 'Repair required.'
+        cost = f"Rs. {damage['cost']:,.2f}"
+        table_data.append([
+            Paragraph(part, S_NORMAL),
+            Paragraph(desc, S_NORMAL),
+            Paragraph(cost, S_CELL_RIGHT)
+        ])
+    table_data.append([
+        '',
+        copy.copy(_TOTAL_LABEL),
+        Paragraph(f"<b>Rs. {total_cost:,.2f}</b>", S_TOTAL_VALUE)
+    ])
+
+    t_cost = Table(table_data, colWidths=[130, 290, 110])
+    t_cost.setStyle(COST_TABLE_STYLE)
+    elements.append(t_cost)
+    elements.append(Spacer(1, 20))
+
+    # 4. Visual Evidence (Dynamically Sized)
+    if image_path and os.path.exists(image_path):
+        elements.append(Paragraph("<b>VISUAL EVIDENCE</b>", S_NORMAL))
+        elements.append(Spacer(1, 5))
+
+        # Calculate fit within 500x220 points to ensure it fits on page
+        w, h = get_image_dims(image_path, max_width=500, max_height=220)
+        try:
+            img = RLImage(image_path, width=w, height=h)
+            img.hAlign = 'LEFT'
+            elements.append(img)
+        except:
+            elements.append(Paragraph("[Image load error]", S_NORMAL))
+
+    # 5. Footer (Bottom of the content flow)
+    elements.append(Spacer(1, 20))
+    elements.append(Table([_fresh(row) for row in _SIGNATURE_ROWS], colWidths=[200, 330]))
+    elements.append(Spacer(1, 10))
+    elements.append(copy.copy(_DISCLAIMER))
+
+    doc.build(elements)
+    return pdf_save_path
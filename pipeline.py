@@ -0,0 +1,364 @@
+"""Detection pipeline executed by the assessment job workers.
+
+This module must stay importable without the Flask app: in process mode it is
+loaded fresh in every worker process, which reaches the models through the
+shared inference process.
+"""
+import itertools
+import os
+import time
+
+import numpy as np
+import cv2
+import sqlalchemy as sa
+
+from annotation import annotate
+from cache import ResultCache, image_digest, make_key
+from database import configure_engine, engine_options
+from dedup import DuplicateIndex, phash
+from inference import InferenceClient, ModelRegistry, as_numpy
+from ingest import decode_image
+from pricing import PriceBook
+from storage import ArtifactStore
+from telemetry import stage
+from onnx_backend import Boxes, Result
+from tiling import refine
+from video import Tracker, VideoReader, keyframes
+
+_state = {
+    'registry': None,
+    'batcher': None,
+    'progress': None,
+    'cache': None,
+    'price_book': None,
+    'store': None,
+    'duplicates': None,
+    'settings': {},
+}
+
+
+def init_worker(settings, progress=None, registry=None, batcher=None):
+    if registry is None and settings.get('inference'):
+        registry = batcher = InferenceClient(settings['inference']['address'], settings['inference']['authkey'],
+                                             reload_interval=settings['reload_interval'])
+    elif registry is None:
+        registry = ModelRegistry(settings['model_paths'], reload_interval=settings['reload_interval'])
+        if settings.get('preload'):
+            registry.preload(warmup=True)
+    cache = ResultCache(settings['cache_size'])
+    price_book = PriceBook(path=settings['parts_cost_file'], reload_interval=settings['reload_interval'])
+    registry.add_reload_listener(cache.invalidate)
+    registry.add_reload_listener(price_book.invalidate)
+    _state['registry'] = registry
+    _state['batcher'] = batcher
+    _state['progress'] = progress
+    _state['cache'] = cache
+    _state['price_book'] = price_book
+    _state['store'] = ArtifactStore(settings['artifact_dir'])
+    _state['duplicates'] = None
+    if settings.get('database_uri') and settings.get('dedup'):
+        uri = settings['database_uri']
+        engine = sa.create_engine(uri, **engine_options(uri))
+        configure_engine(engine)
+        _state['duplicates'] = DuplicateIndex(engine, settings['dedup']['max_distance'])
+    _state['settings'] = settings
+
+
+def worker_ready():
+    """No-op task that makes the pool start a worker, which runs init_worker first."""
+    return True
+
+
+def report_progress(job_id, status, progress):
+    if _state['progress'] is not None:
+        _state['progress'].put((job_id, status, progress))
+
+
+def tile_settings(vehicle_type):
+    tiling = _state['settings'].get('tiling')
+    if tiling and vehicle_type in tiling['vehicle_types']:
+        return tiling
+    return None
+
+
+def tile(vehicle_type, images_bytes, images, results, timings):
+    tiling = tile_settings(vehicle_type)
+    if tiling is None:
+        return results, 0
+    with stage(timings, 'tiling'):
+        return refine(detect, vehicle_type, images_bytes, images, results, tiling)
+
+
+def find_duplicate(vehicle_type, brand, hashes, timings):
+    """The closest stored assessment, and that assessment again if its result can be reused."""
+    index = _state['duplicates']
+    if index is None:
+        return None, None
+    with stage(timings, 'dedup'):
+        match = index.best_match(hashes)
+        if match is None or not _state['settings']['dedup']['reuse'] or match['matched'] < len(hashes):
+            return match, None
+        # Only a claim made of the same photos of the same vehicle can take the
+        # earlier result as it is; anything else is flagged and assessed anew.
+        prior = index.load(match['assessment_id'])
+        if (prior is None or prior['photos'] != len(hashes)
+                or (prior['vehicle_type'], prior['vehicle_brand']) != (vehicle_type, brand)
+                or not _state['store'].exists(prior['image_path'])):
+            return match, None
+        return match, prior
+
+
+def reprice(vehicle_type, brand, names, damage_details):
+    """Cost a stored assessment's items through the current table, as a fresh run would.
+
+    Returns None when the model no longer has a class for one of the items.
+    """
+    table = _state['price_book'].table(vehicle_type, brand, names)
+    class_index = {name: class_id for class_id, name in enumerate(table.names)}
+    try:
+        class_ids = np.array([class_index[detail['damage_type']] for detail in damage_details], dtype=np.intp)
+    except KeyError:
+        return None
+    return {'damage_details': table.damage_details(class_ids),
+            'total_cost': float(table.costs[class_ids].sum()),
+            'unpriced': table.unpriced(class_ids)}
+
+
+def detect(vehicle_type, images):
+    if _state['batcher'] is not None:
+        futures = [_state['batcher'].submit(vehicle_type, image) for image in images]
+        return [future.result() for future in futures]
+    model = _state['registry'].get(vehicle_type)
+    if model is None:
+        raise RuntimeError(f'No model available for {vehicle_type}')
+    return list(model(images))
+
+
+def consolidate_detections(per_image):
+    # A part photographed from several angles is only counted once: each class
+    # keeps the largest number of instances seen in any single photo.
+    per_image = [as_numpy(class_ids).astype(np.intp) for class_ids in per_image]
+    all_ids = np.concatenate(per_image) if per_image else np.empty(0, dtype=np.intp)
+    if all_ids.size == 0:
+        return all_ids
+    size = int(all_ids.max()) + 1
+    counts = np.max([np.bincount(class_ids, minlength=size) for class_ids in per_image], axis=0)
+    _, first_seen = np.unique(all_ids, return_index=True)
+    ordered = all_ids[np.sort(first_seen)]
+    return np.repeat(ordered, counts[ordered])
+
+
+def compose_contact_sheet(images, columns=3, cell_size=(640, 480)):
+    cell_w, cell_h = cell_size
+    rows = (len(images) + columns - 1) // columns
+    sheet = np.zeros((rows * cell_h, min(columns, len(images)) * cell_w, 3), dtype=np.uint8)
+    for i, image in enumerate(images):
+        h, w = image.shape[:2]
+        scale = min(cell_w / w, cell_h / h)
+        resized = cv2.resize(image, (int(w * scale), int(h * scale)), interpolation=cv2.INTER_AREA)
+        top = (i // columns) * cell_h + (cell_h - resized.shape[0]) // 2
+        left = (i % columns) * cell_w + (cell_w - resized.shape[1]) // 2
+        sheet[top:top + resized.shape[0], left:left + resized.shape[1]] = resized
+    return sheet
+
+
+def run_assessment(job_id, vehicle_type, brand, images_bytes):
+    # Stage timings go back with the result; the web process records them.
+    timings = {}
+    started = time.perf_counter()
+    report_progress(job_id, 'running', 10)
+    max_side = _state['settings']['max_side']
+    with stage(timings, 'decode'):
+        images = [decode_image(image_bytes, max_side) for image_bytes in images_bytes]
+    with stage(timings, 'phash'):
+        hashes = [phash(image) for image in images]
+    match, prior = find_duplicate(vehicle_type, brand, hashes, timings)
+    duplicate = {'phashes': hashes, 'duplicate_of': match['assessment_id'] if match else None}
+
+    cache = _state['cache']
+    price_book = _state['price_book']
+    store = _state['store']
+    with stage(timings, 'model_load'):
+        model = _state['registry'].get(vehicle_type)
+    cache_key = None
+    if model is not None:
+        with stage(timings, 'cache'):
+            version = f'{model.checksum}:{price_book.version}'
+            tiling = tile_settings(vehicle_type)
+            if tiling is not None:
+                version += ':tiles=' + ','.join(str(tiling[name]) for name in sorted(tiling) if name != 'vehicle_types')
+            cache_key = make_key([image_digest(image) for image in images], vehicle_type, brand, version)
+            cached = cache.get(cache_key)
+        if cached is not None:
+            # Stored images are never rewritten, so a hit can share the key.
+            if cached['image_filename'] is None or store.exists(cached['image_filename']):
+                timings['total'] = time.perf_counter() - started
+                return dict(cached, cached=True, reused=False, timings=timings, **duplicate)
+            cache.discard(cache_key)
+
+    if prior is not None and model is not None:
+        with stage(timings, 'costing'):
+            repriced = reprice(vehicle_type, brand, model.names, prior['damage_details'])
+        if repriced is not None:
+            timings['total'] = time.perf_counter() - started
+            return dict(repriced, detections=0, image_filename=prior['image_path'], image_count=len(images),
+                        tiled_images=0, cached=False, reused=True, timings=timings, **duplicate)
+
+    report_progress(job_id, 'running', 30)
+    with stage(timings, 'inference'):
+        results = detect(vehicle_type, images)
+    results, tiled = tile(vehicle_type, images_bytes, images, results, timings)
+    report_progress(job_id, 'running', 70)
+    output = summarize(vehicle_type, brand, images, results, timings=timings)
+    output['tiled_images'] = tiled
+
+    if cache_key is not None:
+        cache.put(cache_key, vehicle_type, output)
+    timings['total'] = time.perf_counter() - started
+    return dict(output, cached=False, reused=False, timings=timings, **duplicate)
+
+
+def run_video_assessment(job_id, vehicle_type, brand, video_path):
+    # Keyframes are decoded, detected and tracked a batch at a time; the
+    # uploaded file is removed once the video has been read, even on failure.
+    timings = {}
+    started = time.perf_counter()
+    report_progress(job_id, 'running', 5)
+    settings = _state['settings']['video']
+    tracker = Tracker(settings['track_iou'], settings['max_gap'])
+    best_views = {}
+    names = None
+    detections = 0
+    try:
+        with VideoReader(video_path, settings['sample_fps'], _state['settings']['max_side'],
+                         settings['max_seconds']) as reader:
+            selected = keyframes(reader, settings)
+            while True:
+                with stage(timings, 'decode'):
+                    batch = list(itertools.islice(selected, settings['batch_size']))
+                if not batch:
+                    break
+                with stage(timings, 'inference'):
+                    results = detect(vehicle_type, [keyframe.image for keyframe in batch])
+                with stage(timings, 'tracking'):
+                    names = results[0].names
+                    for keyframe, result in zip(batch, results):
+                        boxes = result.boxes
+                        detections += len(boxes.cls)
+                        frame = tracker.update(keyframe,
+                                               as_numpy(boxes.xyxy).reshape(-1, 4),
+                                               as_numpy(boxes.conf).reshape(-1),
+                                               as_numpy(boxes.cls).reshape(-1).astype(np.intp))
+                        best_views[frame] = keyframe.image
+                    # Only frames that are still some track's best view are kept in memory.
+                    keep = tracker.best_frames()
+                    best_views = {frame: image for frame, image in best_views.items() if frame in keep}
+                if reader.frame_count:
+                    report_progress(job_id, 'running', 5 + int(60 * min(1.0, reader.position / reader.frame_count)))
+            sampled = reader.sampled
+    finally:
+        try:
+            os.remove(video_path)
+        except FileNotFoundError:
+            pass
+    report_progress(job_id, 'running', 70)
+
+    keyframe_count = len(tracker.frames)
+    output = {'damage_details': [], 'total_cost': 0, 'unpriced': [], 'detections': detections,
+              'image_filename': None, 'image_count': keyframe_count, 'frames': sampled, 'source': 'video',
+              'tiled_images': 0, 'phashes': [], 'duplicate_of': None}
+    with stage(timings, 'costing'):
+        confirmed = tracker.confirmed(settings['min_track_frames'], settings['confirm_confidence'])
+        class_ids = tracker.class_ids(confirmed)
+        if class_ids.size:
+            table = _state['price_book'].table(vehicle_type, brand, names)
+            output.update(damage_details=table.damage_details(class_ids),
+                          total_cost=float(table.costs[class_ids].sum()),
+                          unpriced=table.unpriced(class_ids))
+    if class_ids.size:
+        store = _state['store']
+        show_confidence = _state['settings']['annotate_confidence']
+        views = tracker.best_views(confirmed, settings['sheet_frames'])
+        # Hashed before annotation, which draws on the frames in place.
+        with stage(timings, 'phash'):
+            output['phashes'] = [phash(best_views[frame]) for frame, _, _, _ in views]
+        match, _ = find_duplicate(vehicle_type, brand, output['phashes'], timings)
+        output['duplicate_of'] = match['assessment_id'] if match else None
+        with stage(timings, 'annotation'):
+            annotated = [annotate(best_views[frame],
+                                  Result(names, Boxes(xyxy, conf, cls), best_views[frame].shape[:2]),
+                                  show_confidence)
+                         for frame, xyxy, conf, cls in views]
+            sheet = annotated[0] if len(annotated) == 1 else compose_contact_sheet(annotated)
+        with stage(timings, 'store'):
+            output['image_filename'] = store.save_image(store.new_key('.jpg'), sheet)
+    timings['total'] = time.perf_counter() - started
+    return dict(output, cached=False, reused=False, timings=timings)
+
+
+def summarize(vehicle_type, brand, images, results, save_image=True, timings=None):
+    timings = {} if timings is None else timings
+    detections = sum(len(result.boxes.cls) for result in results)
+    with stage(timings, 'costing'):
+        class_ids = consolidate_detections([result.boxes.cls for result in results])
+        if class_ids.size == 0:
+            return {'damage_details': [], 'total_cost': 0, 'unpriced': [], 'detections': detections,
+                    'image_filename': None, 'image_count': len(images)}
+        table = _state['price_book'].table(vehicle_type, brand, results[0].names)
+        damage_details = table.damage_details(class_ids)
+
+    image_filename = None
+    if save_image:
+        store = _state['store']
+        show_confidence = _state['settings']['annotate_confidence']
+        with stage(timings, 'annotation'):
+            annotated = [annotate(image, result, show_confidence) for image, result in zip(images, results)]
+            sheet = annotated[0] if len(annotated) == 1 else compose_contact_sheet(annotated)
+        with stage(timings, 'store'):
+            image_filename = store.save_image(store.new_key('.jpg'), sheet)
+    return {'damage_details': damage_details,
+            'total_cost': float(table.costs[class_ids].sum()),
+            'unpriced': table.unpriced(class_ids),
+            'detections': detections,
+            'image_filename': image_filename,
+            'image_count': len(images)}
+
+
+def assess_files(tasks, save_images=False):
+    # Offline batches: one photo per claim, read straight from disk, and one
+    # model call per vehicle type for the whole chunk. The result cache is
+    # skipped since backlogs are normally re-scored after a model update. Photos
+    # are hashed for later duplicate lookups but not checked themselves, as a
+    # re-scored backlog would only match its own earlier run.
+    max_side = _state['settings']['max_side']
+    outputs = [None] * len(tasks)
+    by_vehicle_type = {}
+    for i, (vehicle_type, brand, path) in enumerate(tasks):
+        try:
+            with open(path, 'rb') as f:
+                image_bytes = f.read()
+            image = decode_image(image_bytes, max_side)
+        except Exception as e:
+            outputs[i] = {'error': f'{type(e).__name__}: {e}'}
+            continue
+        by_vehicle_type.setdefault(vehicle_type, []).append((i, image_bytes, image))
+
+    for vehicle_type, decoded in by_vehicle_type.items():
+        try:
+            images = [image for _, _, image in decoded]
+            results = detect(vehicle_type, images)
+            results, _ = tile(vehicle_type, [image_bytes for _, image_bytes, _ in decoded], images, results, {})
+        except Exception as e:
+            for i, _, _ in decoded:
+                outputs[i] = {'error': f'{type(e).__name__}: {e}'}
+            continue
+        for (i, _, image), result in zip(decoded, results):
+            _, brand, _ = tasks[i]
+            try:
+                # Hashed first, since summarize annotates the image in place.
+                hashes = [phash(image)]
+                outputs[i] = summarize(vehicle_type, brand, [image], [result], save_image=save_images)
+                outputs[i]['phashes'] = hashes
+            except Exception as e:
+                outputs[i] = {'error': f'{type(e).__name__}: {e}'}
+    return outputs
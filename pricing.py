@@ -0,0 +1,164 @@
+"""Precompiled repair pricing.
+
+A CostTable maps a model's class ids straight to (part key, cost, description)
+for one vehicle type and brand, so costing a set of detections is an array
+lookup over result.boxes.cls. Tables are built the first time a model and brand
+are priced and rebuilt when the model or the price list changes. Prices come
+from PARTS_COST or, when a path is given, from a JSON file with the same
+layout that is reloaded whenever it changes on disk. A file that does not
+parse, for instance one caught halfway through being written, is logged and
+the last good prices stay in use.
+"""
+import json
+import logging
+import numbers
+import os
+import re
+import threading
+import time
+
+import numpy as np
+
+from inference import as_numpy
+
+logger = logging.getLogger(__name__)
+
+DAMAGE_DESCRIPTIONS_MAP = {
+    'scratch': "Surface abrasion detected. Requires sanding, primer application, and color-matched repainting.",
+    'dent': "Deformation of body panel. Requires stud welding/pulling and surface leveling.",
+    'broken': "Severe structural failure. Complete part replacement is recommended to ensure safety.",
+    'crack': "Visible fissure in material. Structural integrity compromised; replacement advised.",
+    'shattered': "Glass/Plastic shattered. Immediate replacement required.",
+    'default': "Damage detected by AI. Physical inspection recommended for final labor estimation."
+}
+
+PARTS_COST = {
+    "2wheeler": {
+        "Hero Splendor": {'broken': 50000, 'scratch': 1500, 'headlight': 2500, 'seat': 1500, 'tire': 800, 'mirror': 300},
+        "Honda Activa": {'broken': 48000, 'scratch': 1400, 'headlight': 2300, 'seat': 1400, 'tire': 700, 'mirror': 250},
+        "Honda Shine": {'broken': 49000, 'scratch': 1450, 'headlight': 2400, 'seat': 1450, 'tire': 750, 'mirror': 280},
+        "Bajaj Pulsar": {'broken': 48000, 'scratch': 1400, 'headlight': 2300, 'seat': 1400, 'tire': 700, 'mirror': 250},
+        "TVS Jupiter": {'broken': 49000, 'scratch': 1450, 'headlight': 2400, 'seat': 1450, 'tire': 750, 'mirror': 280}
+    },
+    "4wheeler": {
+        "Maruti Suzuki: Swift": {'bumper': 8000, 'fender': 6000, 'front-windshield': 7000, 'rear-windshield': 7000, 'side-mirror': 1500, 'side-screen': 2000, 'door': 13000, 'headlamp': 2900, 'hood': 4000},
+        "Tata Motors: Nexon": {'bumper': 8500, 'fender': 6200, 'front-windshield': 7100, 'rear-windshield': 7100, 'side-mirror': 1600, 'side-screen': 2100, 'door': 13500, 'headlamp': 3000, 'hood': 4200},
+        "Hyundai: Creta": {'bumper': 9000, 'fender': 6500, 'front-windshield': 7200, 'rear-windshield': 7200, 'side-mirror': 1700, 'side-screen': 2200, 'door': 14000, 'headlamp': 3100, 'hood': 4400},
+        "Mahindra: Scorpio": {'bumper': 9000, 'fender': 6500, 'front-windshield': 7200, 'rear-windshield': 7200, 'side-mirror': 1700, 'side-screen': 2200, 'door': 14000, 'headlamp': 3100, 'hood': 4400},
+        "Toyota: Innova Crysta": {'bumper': 9000, 'fender': 6500, 'front-windshield': 7200, 'rear-windshield': 7200, 'side-mirror': 1700, 'side-screen': 2200, 'door': 14000, 'headlamp': 3100, 'hood': 4400}
+    },
+    "6wheeler": {
+        "Bharat Benz 1923C Tipper": {'rear-lamp-l-damaged': 1000, 'rearlamp-r-damaged': 1000, 'sideboard-l-damaged': 1500, 'sideboard-r-damaged': 1500},
+        "Tata LPT 1916": {'rear-lamp-l-damaged': 1200, 'rearlamp-r-damaged': 1200, 'sideboard-l-damaged': 1700, 'sideboard-r-damaged': 1700},
+        "Tata Signa 1918.k": {'rear-lamp-l-damaged': 1100, 'rearlamp-r-damaged': 1100, 'sideboard-l-damaged': 1600, 'sideboard-r-damaged': 1600},
+        "Mahindra Furio 16 Truck": {'rear-lamp-l-damaged': 1200, 'rearlamp-r-damaged': 1200, 'sideboard-l-damaged': 1700, 'sideboard-r-damaged': 1700},
+        "Bharat Benz 1415RE Truck": {'rear-lamp-l-damaged': 1100, 'rearlamp-r-damaged': 1100, 'sideboard-l-damaged': 1600, 'sideboard-r-damaged': 1600}
+    }
+}
+
+
+def normalize_part(name):
+    return re.sub('-{2,}', '-', name.lower().replace(' ', ''))
+
+
+def check_prices(prices):
+    """Raise ValueError unless prices is {vehicle type: {brand: {part: cost}}}."""
+    if not isinstance(prices, dict):
+        raise ValueError('expected an object of vehicle types')
+    for vehicle_type, brands in prices.items():
+        if not isinstance(brands, dict):
+            raise ValueError(f'{vehicle_type}: expected an object of brands')
+        for brand, parts in brands.items():
+            if not isinstance(parts, dict):
+                raise ValueError(f'{vehicle_type} / {brand}: expected an object of parts')
+            for part, cost in parts.items():
+                if isinstance(cost, bool) or not isinstance(cost, numbers.Real):
+                    raise ValueError(f'{vehicle_type} / {brand} / {part}: cost is not a number')
+    return prices
+
+
+def get_damage_description(damage_name):
+    damage_name_lower = damage_name.lower()
+    for key, description in DAMAGE_DESCRIPTIONS_MAP.items():
+        if key in damage_name_lower:
+            return description
+    return DAMAGE_DESCRIPTIONS_MAP['default']
+
+
+class CostTable:
+    def __init__(self, class_names, prices):
+        size = max(class_names) + 1 if class_names else 0
+        self.class_names = class_names
+        self.names = [class_names.get(i, str(i)) for i in range(size)]
+        self.keys = [normalize_part(name) for name in self.names]
+        self.costs = np.array([prices.get(key, 0) for key in self.keys], dtype=np.float64)
+        self.known = np.array([key in prices for key in self.keys], dtype=bool)
+        self.descriptions = [get_damage_description(name) for name in self.names]
+
+    def damage_details(self, class_ids):
+        class_ids = as_numpy(class_ids).astype(np.intp)
+        costs = self.costs[class_ids].tolist()
+        known = self.known[class_ids].tolist()
+        return [{
+            'damage_type': self.names[class_id],
+            'cost': cost,
+            'description': self.descriptions[class_id],
+            'priced': priced,
+        } for class_id, cost, priced in zip(class_ids.tolist(), costs, known)]
+
+    def unpriced(self, class_ids):
+        class_ids = np.unique(as_numpy(class_ids).astype(np.intp))
+        return [self.names[class_id] for class_id in class_ids[~self.known[class_ids]]]
+
+
+class PriceBook:
+    def __init__(self, parts_cost=PARTS_COST, path=None, reload_interval=5.0):
+        self.path = path
+        self.reload_interval = reload_interval
+        self.version = 'builtin'
+        self._prices = parts_cost
+        self._mtime = None
+        self._failed_mtime = None
+        self._checked_at = 0.0
+        self._tables = {}
+        self._lock = threading.Lock()
+
+    def _refresh(self):
+        now = time.monotonic()
+        if not self.path or now - self._checked_at < self.reload_interval:
+            return
+        self._checked_at = now
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            return
+        if mtime == self._mtime:
+            return
+        try:
+            with open(self.path) as f:
+                prices = check_prices(json.load(f))
+        except (OSError, ValueError) as e:
+            # Tried again on the next check, but only logged once per version of the file.
+            if mtime != self._failed_mtime:
+                self._failed_mtime = mtime
+                logger.error('Keeping the previous prices; could not load %s: %s', self.path, e)
+            return
+        with self._lock:
+            self._prices = prices
+            self._mtime = mtime
+            self.version = f'{os.path.basename(self.path)}@{mtime}'
+            self._tables = {}
+
+    def table(self, vehicle_type, brand, class_names):
+        self._refresh()
+        key = (vehicle_type, brand)
+        table = self._tables.get(key)
+        if table is None or table.class_names != class_names:
+            table = CostTable(class_names, self._prices.get(vehicle_type, {}).get(brand, {}))
+            with self._lock:
+                self._tables[key] = table
+        return table
+
+    def invalidate(self, vehicle_type):
+        with self._lock:
+            self._tables = {key: table for key, table in self._tables.items() if key[0] != vehicle_type}
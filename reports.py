@@ -0,0 +1,35 @@
+"""PDF damage assessment reports.
+
+Reports are rendered on first download rather than during the upload, and
+cached in an artifact store under one key per assessment id. The rendering
+itself lives in pdf.py and is imported on the first build.
+"""
+import threading
+
+_build_locks = {}
+_build_locks_guard = threading.Lock()
+
+
+def report_key(store, assessment_id):
+    return store.key_for(f'Report_{assessment_id}.pdf')
+
+
+def ensure_report(store, assessment, customer_name, image_path):
+    key = report_key(store, assessment.id)
+    if store.exists(key):
+        return key
+
+    with _build_locks_guard:
+        lock = _build_locks.setdefault(assessment.id, threading.Lock())
+    with lock:
+        if not store.exists(key):
+            from pdf import generate_pdf
+            damage_details = [{'damage_type': item.detected_damage, 'cost': item.cost, 'description': item.description}
+                              for item in assessment.items]
+            with store.staging(key) as staging:
+                generate_pdf(staging, assessment.id, assessment.created_at, assessment.vehicle_type,
+                             assessment.vehicle_brand, damage_details, assessment.total_cost,
+                             image_path, customer_name)
+    with _build_locks_guard:
+        _build_locks.pop(assessment.id, None)
+    return key
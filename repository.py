@@ -0,0 +1,96 @@
+"""Bulk persistence for assessments.
+
+A finished assessment is written with one INSERT for the assessment rows and
+one executemany INSERT for all of their damage items, instead of building an
+ORM object per detection. Deleting users removes their items, jobs and
+assessments with set-based DELETEs without loading any rows, however many
+users go at once. The model classes are passed in so this module does not
+depend on the app.
+
+Records may also carry the perceptual hashes of their photos ('phashes') and
+the id of an earlier assessment they duplicate ('duplicate_of'); the hashes
+go into the image_hash table in the same executemany style.
+"""
+import sqlalchemy as sa
+
+from dedup import hash_rows
+
+
+class AssessmentRepository:
+    def __init__(self, session, user_model, assessment_model, item_model, job_model, hash_model):
+        self.session = session
+        self.User = user_model
+        self.Assessment = assessment_model
+        self.DamageItem = item_model
+        self.AssessmentJob = job_model
+        self.ImageHash = hash_model
+
+    def create(self, user_id, vehicle_type, vehicle_brand, total_cost, image_path, damage_details,
+               phashes=(), duplicate_of=None):
+        return self.create_many([{
+            'user_id': user_id,
+            'vehicle_type': vehicle_type,
+            'vehicle_brand': vehicle_brand,
+            'total_cost': total_cost,
+            'image_path': image_path,
+            'damage_details': damage_details,
+            'phashes': phashes,
+            'duplicate_of': duplicate_of,
+        }])[0]
+
+    def create_many(self, records):
+        """Insert assessments with their damage items; returns the new ids in order.
+
+        Nothing is committed, so callers can group several calls into one transaction.
+        """
+        if not records:
+            return []
+        columns = ('user_id', 'vehicle_type', 'vehicle_brand', 'total_cost', 'image_path')
+        ids = self.session.scalars(
+            sa.insert(self.Assessment).returning(self.Assessment.id, sort_by_parameter_order=True),
+            [dict({column: record[column] for column in columns}, duplicate_of=record.get('duplicate_of'))
+             for record in records],
+        ).all()
+        items = [{'assessment_id': assessment_id,
+                  'detected_damage': detail['damage_type'],
+                  'cost': detail['cost'],
+                  'description': detail.get('description')}
+                 for assessment_id, record in zip(ids, records)
+                 for detail in record['damage_details']]
+        if items:
+            self.session.execute(sa.insert(self.DamageItem), items)
+        hashes = [dict(row, assessment_id=assessment_id)
+                  for assessment_id, record in zip(ids, records)
+                  for row in hash_rows(record.get('phashes', ()))]
+        if hashes:
+            self.session.execute(sa.insert(self.ImageHash), hashes)
+        return ids
+
+    def delete_user(self, user_id):
+        """Delete a user and everything they own; returns False if there was no such user."""
+        return self.delete_users([user_id]) > 0
+
+    def delete_users(self, user_ids):
+        """Delete users and everything they own; returns how many users were deleted."""
+        assessment_ids = sa.select(self.Assessment.id).where(self.Assessment.user_id.in_(user_ids))
+        self.session.execute(sa.delete(self.DamageItem)
+                             .where(self.DamageItem.assessment_id.in_(assessment_ids))
+                             .execution_options(synchronize_session=False))
+        self.session.execute(sa.delete(self.ImageHash)
+                             .where(self.ImageHash.assessment_id.in_(assessment_ids))
+                             .execution_options(synchronize_session=False))
+        # Later copies of these assessments no longer have an original to point at.
+        self.session.execute(sa.update(self.Assessment)
+                             .where(self.Assessment.duplicate_of.in_(assessment_ids))
+                             .values(duplicate_of=None)
+                             .execution_options(synchronize_session=False))
+        self.session.execute(sa.delete(self.AssessmentJob)
+                             .where(self.AssessmentJob.user_id.in_(user_ids))
+                             .execution_options(synchronize_session=False))
+        self.session.execute(sa.delete(self.Assessment)
+                             .where(self.Assessment.user_id.in_(user_ids))
+                             .execution_options(synchronize_session=False))
+        deleted = self.session.execute(sa.delete(self.User)
+                                       .where(self.User.id.in_(user_ids))
+                                       .execution_options(synchronize_session=False))
+        return deleted.rowcount
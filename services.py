@@ -0,0 +1,210 @@
+"""Assessment services shared by the views and CLI commands.
+
+create_app builds one Services object per app and keeps it in
+app.extensions['vda']; code running in an app context reaches it through the
+``services`` proxy. Building it is cheap, since nothing here imports the
+model, image or PDF libraries: job workers import the pipeline when the first
+job is submitted, and a model registry is only kept in the web process when
+jobs run on threads there.
+"""
+import json
+import os
+
+from flask import current_app
+from werkzeug.local import LocalProxy
+
+from cache import TTLCache
+from extensions import db
+from jobs import JobManager
+from models import Assessment, AssessmentJob, DamageItem, ImageHash, User
+from repository import AssessmentRepository
+from storage import ArtifactStore
+from telemetry import Metrics
+
+# The PyTorch weights, which export-onnx and onnx-parity always start from.
+WEIGHT_PATHS = {
+    "2wheeler": r'2_best.pt',
+    "4wheeler": r'4_best.pt',
+    "6wheeler": r'6_best.pt'
+}
+# e.g. MODEL_PATH_4WHEELER=4_best.onnx serves that vehicle type through ONNX Runtime.
+MODEL_PATHS = {vehicle_type: os.environ.get(f'MODEL_PATH_{vehicle_type.upper()}', path)
+               for vehicle_type, path in WEIGHT_PATHS.items()}
+
+services = LocalProxy(lambda: current_app.extensions['vda'])
+
+
+class Services:
+    def __init__(self, app):
+        config = app.config
+        self.model_registry = None
+        self.inference_batcher = None
+        # Thread workers share models and a batcher kept in the web process;
+        # process workers share those of the inference process; see jobs.py.
+        if config['ASSESSMENT_EXECUTOR'] == 'thread':
+            from inference import InferenceBatcher, ModelRegistry
+            self.model_registry = ModelRegistry(MODEL_PATHS, reload_interval=config['MODEL_RELOAD_INTERVAL'])
+            if config['PRELOAD_MODELS']:
+                self.model_registry.preload(warmup=True)
+            self.inference_batcher = InferenceBatcher(self.model_registry,
+                                                      max_batch_size=config['INFERENCE_BATCH_SIZE'],
+                                                      max_wait_ms=config['INFERENCE_BATCH_WAIT_MS'])
+
+        self.artifact_store = ArtifactStore(config['ARTIFACT_DIR'])
+        self.report_store = ArtifactStore(config['REPORT_DIR'])
+        # Uploaded videos wait here until a worker has read them.
+        self.upload_store = ArtifactStore(config['UPLOAD_DIR'])
+        self.pipeline_metrics = Metrics()
+        self.repository = AssessmentRepository(db.session, User, Assessment, DamageItem, AssessmentJob, ImageHash)
+        # Detached snapshots of recently seen users, so authenticated requests do not
+        # query the user table every time. Each web process has its own copy; changes
+        # made elsewhere show up once the entry expires.
+        self.user_cache = TTLCache(config['USER_CACHE_SIZE'], config['USER_CACHE_TTL'])
+
+        with app.app_context():
+            # Flask-SQLAlchemy resolves a relative SQLite path against the instance folder.
+            database_uri = db.engine.url.render_as_string(hide_password=False)
+
+        self.worker_settings = {
+            'model_paths': MODEL_PATHS,
+            'reload_interval': config['MODEL_RELOAD_INTERVAL'],
+            # For the inference process, which loads and batches for process workers.
+            'preload': config['PRELOAD_MODELS'],
+            'inference_batch_size': config['INFERENCE_BATCH_SIZE'],
+            'inference_batch_wait_ms': config['INFERENCE_BATCH_WAIT_MS'],
+            'cache_size': config['RESULT_CACHE_SIZE'],
+            'parts_cost_file': config['PARTS_COST_FILE'],
+            'max_side': config['INGEST_MAX_SIDE'],
+            'annotate_confidence': config['ANNOTATE_CONFIDENCE'],
+            'artifact_dir': config['ARTIFACT_DIR'],
+            # Optional tiled second pass for large photos; see tiling.py.
+            'tiling': {
+                'vehicle_types': [name.strip() for name in config['TILE_VEHICLE_TYPES'].split(',') if name.strip()],
+                'max_side': config['TILE_MAX_SIDE'],
+                'min_side': config['TILE_MIN_SIDE'],
+                'size': config['TILE_SIZE'],
+                'overlap': config['TILE_OVERLAP'],
+                'confidence': config['TILE_CONFIDENCE'],
+                'merge_threshold': config['TILE_MERGE_THRESHOLD'],
+            },
+            # Workers look up near-duplicate photos themselves; see dedup.py.
+            'database_uri': database_uri,
+            'dedup': {
+                'max_distance': config['DEDUP_MAX_DISTANCE'],
+                'reuse': config['DEDUP_REUSE'],
+            },
+            # Walkaround videos; see video.py.
+            'video': {
+                'max_seconds': config['VIDEO_MAX_SECONDS'],
+                'sample_fps': config['VIDEO_SAMPLE_FPS'],
+                'min_sharpness': config['VIDEO_MIN_SHARPNESS'],
+                'min_change': config['VIDEO_MIN_CHANGE'],
+                'window': config['VIDEO_WINDOW'],
+                'max_keyframes': config['VIDEO_MAX_KEYFRAMES'],
+                'batch_size': config['INFERENCE_BATCH_SIZE'],
+                'track_iou': config['VIDEO_TRACK_IOU'],
+                'max_gap': config['VIDEO_MAX_GAP'],
+                'min_track_frames': config['VIDEO_MIN_TRACK_FRAMES'],
+                'confirm_confidence': config['VIDEO_CONFIRM_CONFIDENCE'],
+                'sheet_frames': config['VIDEO_SHEET_FRAMES'],
+            },
+        }
+        self.job_manager = JobManager(app, record_job_progress, complete_assessment, fail_assessment,
+                                      settings=self.worker_settings,
+                                      max_workers=config['ASSESSMENT_WORKERS'],
+                                      mode=config['ASSESSMENT_EXECUTOR'],
+                                      registry=self.model_registry,
+                                      batcher=self.inference_batcher)
+        if config['PRELOAD_MODELS'] and config['ASSESSMENT_EXECUTOR'] == 'process':
+            self.job_manager.start()
+
+
+# --- Assessment Jobs ---
+def record_job_progress(job_id, status, progress):
+    job = db.session.get(AssessmentJob, job_id)
+    if job and job.status in ('queued', 'running'):
+        job.status = status
+        job.progress = max(job.progress, progress)
+        db.session.commit()
+
+
+def record_pipeline_metrics(job, output):
+    pipeline_metrics = services.pipeline_metrics
+    vehicle_type = job.vehicle_type
+    for stage, seconds in output.get('timings', {}).items():
+        pipeline_metrics.observe(stage, vehicle_type, seconds)
+    pipeline_metrics.increment('detections_total', output.get('detections', 0), vehicle_type=vehicle_type)
+    pipeline_metrics.increment('images_total', output['image_count'], vehicle_type=vehicle_type)
+    pipeline_metrics.increment('tiled_images_total', output.get('tiled_images', 0), vehicle_type=vehicle_type)
+    pipeline_metrics.increment('cache_lookups_total', vehicle_type=vehicle_type,
+                               result='hit' if output['cached'] else 'miss')
+    if output.get('duplicate_of'):
+        pipeline_metrics.increment('duplicates_total', vehicle_type=vehicle_type,
+                                   result='reused' if output.get('reused') else 'flagged')
+    pipeline_metrics.completed(vehicle_type)
+    total = output.get('timings', {}).get('total', 0)
+    if total > current_app.config['SLOW_ASSESSMENT_SECONDS']:
+        current_app.logger.warning('Slow assessment job %s (%s, %d images): %.1fs %s', job.id, vehicle_type,
+                                   output['image_count'], total,
+                                   {stage: round(seconds, 3) for stage, seconds in output['timings'].items()})
+
+
+def complete_assessment(job_id, output):
+    job = db.session.get(AssessmentJob, job_id)
+    if job is None:
+        return
+
+    with services.pipeline_metrics.timer('db_commit', job.vehicle_type):
+        result = {'damage_details': [], 'repair_cost': 0, 'image_filename': None,
+                  'image_count': output['image_count'], 'unpriced': []}
+        if output['damage_details']:
+            damage_details = output['damage_details']
+            total_cost = output['total_cost']
+            image_filename = output['image_filename']
+            if output['unpriced']:
+                current_app.logger.warning('No price on file for %s / %s parts: %s',
+                                           job.vehicle_type, job.vehicle_brand, ', '.join(output['unpriced']))
+
+            job.assessment_id = services.repository.create(job.user_id, job.vehicle_type, job.vehicle_brand,
+                                                           total_cost, image_filename, damage_details,
+                                                           phashes=output.get('phashes', ()),
+                                                           duplicate_of=output.get('duplicate_of'))
+            result = {'damage_details': damage_details, 'repair_cost': total_cost,
+                      'image_filename': image_filename,
+                      'image_count': output['image_count'], 'unpriced': output['unpriced']}
+
+        result['cached'] = output['cached']
+        result['reused'] = output.get('reused', False)
+        if output.get('source') == 'video':
+            result['source'] = 'video'
+            result['frames'] = output['frames']
+        job.result = json.dumps(result)
+        job.status = 'done'
+        job.progress = 100
+        db.session.commit()
+    record_pipeline_metrics(job, output)
+
+
+def fail_assessment(job_id, error):
+    db.session.rollback()
+    job = db.session.get(AssessmentJob, job_id)
+    if job:
+        services.pipeline_metrics.increment('errors_total', vehicle_type=job.vehicle_type,
+                                            stage=getattr(error, 'stage', 'job'))
+        services.pipeline_metrics.increment('assessments_total', vehicle_type=job.vehicle_type, status='failed')
+        job.status = 'failed'
+        job.error = str(error)[:255]
+        db.session.commit()
+
+
+# --- Artifacts ---
+def artifact_file(key):
+    if services.artifact_store.exists(key):
+        return services.artifact_store.path(key)
+    # Assessments stored before sharding point at flat files in static/, named
+    # either bare or as 'static/<name>'.
+    if key and key.startswith('static/'):
+        key = key[len('static/'):]
+    if key and '/' not in key and os.path.isfile(os.path.join(current_app.static_folder, key)):
+        return os.path.join(current_app.static_folder, key)
+    return None
@@ -0,0 +1,103 @@
+"""Sharded on-disk storage for generated artifacts.
+
+Annotated images and PDF reports used to be written under timestamped names
+in one flat directory, so two uploads in the same second overwrote each other.
+Artifacts are now stored under keys of the form ``ab/cd/<name>``, where the two
+directory levels come from a hash of the name, which keeps every directory
+small. New images get uuid names; reports are keyed on the assessment id.
+Writes go to a temporary file in the target directory and are renamed into
+place, so readers never see a partially written file.
+"""
+import hashlib
+import os
+import re
+import tempfile
+import time
+import uuid
+from contextlib import contextmanager
+
+_SHARD = re.compile(r'^[0-9a-f]{2}$')
+
+
+class ArtifactStore:
+    def __init__(self, root):
+        self.root = os.path.abspath(root)
+
+    def key_for(self, name):
+        digest = hashlib.sha1(name.encode()).hexdigest()
+        return f'{digest[:2]}/{digest[2:4]}/{name}'
+
+    def new_key(self, suffix):
+        return self.key_for(uuid.uuid4().hex + suffix)
+
+    def path(self, key):
+        path = os.path.abspath(os.path.join(self.root, key))
+        if not path.startswith(self.root + os.sep):
+            raise ValueError(f'Invalid artifact key: {key}')
+        return path
+
+    def exists(self, key):
+        try:
+            return os.path.isfile(self.path(key))
+        except ValueError:
+            return False
+
+    @contextmanager
+    def staging(self, key):
+        # Yields a temporary path next to the final one; it is renamed into
+        # place only if the block finishes without raising.
+        path = self.path(key)
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        fd, staging = tempfile.mkstemp(dir=directory, prefix='.', suffix='.tmp')
+        os.close(fd)
+        try:
+            yield staging
+            os.replace(staging, path)
+        except BaseException:
+            if os.path.exists(staging):
+                os.remove(staging)
+            raise
+
+    def write_bytes(self, key, data):
+        with self.staging(key) as staging:
+            with open(staging, 'wb') as f:
+                f.write(data)
+        return key
+
+    def save_image(self, key, image, quality=90):
+        import cv2
+        ok, encoded = cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, quality])
+        if not ok:
+            raise RuntimeError('Could not encode annotated image')
+        return self.write_bytes(key, encoded.tobytes())
+
+    def sweep(self, max_age, keep=()):
+        """Delete artifacts older than max_age seconds whose key is not in keep."""
+        keep = set(keep)
+        cutoff = time.time() - max_age
+        removed = 0
+        for outer in _shard_dirs(self.root):
+            for inner in _shard_dirs(os.path.join(self.root, outer)):
+                directory = os.path.join(self.root, outer, inner)
+                for entry in os.scandir(directory):
+                    if not entry.is_file() or f'{outer}/{inner}/{entry.name}' in keep:
+                        continue
+                    try:
+                        if entry.stat().st_mtime < cutoff:
+                            os.remove(entry.path)
+                            removed += 1
+                    except FileNotFoundError:
+                        pass
+                try:
+                    os.rmdir(directory)
+                except OSError:
+                    pass
+        return removed
+
+
+def _shard_dirs(directory):
+    try:
+        return [entry.name for entry in os.scandir(directory) if entry.is_dir() and _SHARD.match(entry.name)]
+    except FileNotFoundError:
+        return []
@@ -0,0 +1,155 @@
+"""In-process metrics for the assessment pipeline.
+
+Workers time each stage of a job and return the timings with the result; the
+web process records them here, together with its own database and PDF work,
+as latency histograms and counters labelled by stage and vehicle type. The
+same data is rendered in the Prometheus text format for scraping and as a
+JSON snapshot for the admin metrics page. Every web process keeps its own
+numbers, so with several processes each one has to be scraped.
+"""
+import bisect
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class Histogram:
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q):
+        # Upper bound of the bucket holding the q-th observation.
+        if not self.count:
+            return None
+        target = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= target:
+                return bound
+        return float('inf')
+
+
+class Metrics:
+    def __init__(self, window=300):
+        self.started_at = time.time()
+        self.window = window
+        self._histograms = {}
+        self._counters = {}
+        self._completed = deque(maxlen=100000)
+        self._lock = threading.Lock()
+
+    def observe(self, stage, vehicle_type, seconds):
+        with self._lock:
+            histogram = self._histograms.get((stage, vehicle_type))
+            if histogram is None:
+                histogram = self._histograms[(stage, vehicle_type)] = Histogram()
+            histogram.observe(seconds)
+
+    def increment(self, name, amount=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def completed(self, vehicle_type):
+        self.increment('assessments_total', vehicle_type=vehicle_type, status='done')
+        with self._lock:
+            self._completed.append(time.monotonic())
+
+    @contextmanager
+    def timer(self, stage, vehicle_type):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, vehicle_type, time.perf_counter() - start)
+
+    def throughput(self):
+        """Completed assessments per minute over the last window."""
+        cutoff = time.monotonic() - self.window
+        with self._lock:
+            recent = len(self._completed) - bisect.bisect_left(self._completed, cutoff)
+        return recent * 60.0 / self.window
+
+    def counter(self, name, **labels):
+        with self._lock:
+            return sum(value for (counter, counter_labels), value in self._counters.items()
+                       if counter == name and all(item in counter_labels for item in labels.items()))
+
+    def snapshot(self):
+        with self._lock:
+            stages = [{
+                'stage': stage,
+                'vehicle_type': vehicle_type,
+                'count': histogram.count,
+                'mean_ms': round(histogram.sum / histogram.count * 1000, 1) if histogram.count else None,
+                'p50_ms': _ms(histogram.quantile(0.5)),
+                'p95_ms': _ms(histogram.quantile(0.95)),
+            } for (stage, vehicle_type), histogram in sorted(self._histograms.items())]
+            counters = [{'name': name, 'labels': dict(labels), 'value': value}
+                        for (name, labels), value in sorted(self._counters.items())]
+        return {
+            'uptime_seconds': round(time.time() - self.started_at),
+            'throughput_per_minute': round(self.throughput(), 2),
+            'stages': stages,
+            'counters': counters,
+        }
+
+    def render_prometheus(self, prefix='vda'):
+        lines = [f'# TYPE {prefix}_stage_seconds histogram']
+        with self._lock:
+            for (stage, vehicle_type), histogram in sorted(self._histograms.items()):
+                labels = f'stage="{stage}",vehicle_type="{vehicle_type}"'
+                cumulative = 0
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    cumulative += count
+                    lines.append(f'{prefix}_stage_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+                lines.append(f'{prefix}_stage_seconds_bucket{{{labels},le="+Inf"}} {histogram.count}')
+                lines.append(f'{prefix}_stage_seconds_sum{{{labels}}} {histogram.sum:.6f}')
+                lines.append(f'{prefix}_stage_seconds_count{{{labels}}} {histogram.count}')
+            names = sorted({name for name, _ in self._counters})
+            for name in names:
+                lines.append(f'# TYPE {prefix}_{name} counter')
+                for (counter, labels), value in sorted(self._counters.items()):
+                    if counter == name:
+                        label_text = ','.join(f'{key}="{val}"' for key, val in labels)
+                        lines.append(f'{prefix}_{name}{{{label_text}}} {value}')
+        lines.append(f'# TYPE {prefix}_throughput_per_minute gauge')
+        lines.append(f'{prefix}_throughput_per_minute {self.throughput():.4f}')
+        lines.append(f'# TYPE {prefix}_uptime_seconds gauge')
+        lines.append(f'{prefix}_uptime_seconds {time.time() - self.started_at:.0f}')
+        return '\n'.join(lines) + '\n'
+
+
+def _ms(seconds):
+    if seconds is None:
+        return None
+    return None if seconds == float('inf') else round(seconds * 1000, 1)
+
+
+@contextmanager
+def stage(timings, name):
+    """Time a block into a plain dict; used by workers that cannot share Metrics.
+
+    An exception escaping the block is tagged with the stage it came from.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception as e:
+        if not hasattr(e, 'stage'):
+            e.stage = name
+        raise
+    finally:
+        timings[name] = timings.get(name, 0.0) + time.perf_counter() - start
@@ -0,0 +1,117 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+VEHICLE_TYPE = '4wheeler'
+BRAND = 'Hyundai: Creta'
+# 'dent' has no price for this brand, so results carry both priced and unpriced items.
+NAMES = {0: 'bumper', 1: 'door', 2: 'Front - Windshield', 3: 'dent'}
+
+
+class FakeModel:
+    """Stands in for a YOLO model: returns the same boxes, scaled to each image."""
+
+    def __init__(self, names=NAMES, class_ids=(0, 1, 3)):
+        self.names = names
+        self.class_ids = class_ids
+        self.calls = []
+
+    def __call__(self, source, **kwargs):
+        from onnx_backend import Boxes, Result
+
+        images = source if isinstance(source, list) else [source]
+        self.calls.append(len(images))
+        results = []
+        for image in images:
+            xyxy, class_ids = self.detections(image)
+            conf = np.full(len(class_ids), 0.9, dtype=np.float32)
+            results.append(Result(self.names, Boxes(np.asarray(xyxy, dtype=np.float32).reshape(-1, 4), conf,
+                                                    np.array(class_ids, dtype=np.float32)), image.shape[:2]))
+        return results
+
+    def detections(self, image):
+        h, w = image.shape[:2]
+        return ([[w * (0.1 + 0.25 * i), h * 0.2, w * (0.3 + 0.25 * i), h * 0.6] for i in range(len(self.class_ids))],
+                self.class_ids)
+
+
+def claim_photo(seed=1, width=960, height=720):
+    import cv2
+
+    rng = np.random.RandomState(seed)
+    image = np.zeros((height, width, 3), np.uint8)
+    for _ in range(25):
+        cv2.rectangle(image, tuple(int(v) for v in rng.randint(0, width, 2)),
+                      tuple(int(v) for v in rng.randint(0, height, 2)),
+                      tuple(int(c) for c in rng.randint(0, 255, 3)), -1)
+    return image
+
+
+def jpeg(image, quality=95):
+    import cv2
+
+    return cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, quality])[1].tobytes()
+
+
+def login(app, user, password='secret'):
+    client = app.test_client()
+    client.post('/login', data={'email': user.email, 'password': password})
+    return client
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    # create_app makes static/ in the working directory.
+    monkeypatch.chdir(tmp_path)
+    from app import create_app
+    from extensions import db
+
+    app = create_app({
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{tmp_path / "test.db"}',
+        'ASSESSMENT_EXECUTOR': 'thread',
+        'ARTIFACT_DIR': str(tmp_path / 'artifacts'),
+        'REPORT_DIR': str(tmp_path / 'reports'),
+        'UPLOAD_DIR': str(tmp_path / 'uploads'),
+    })
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.engine.dispose()
+
+
+@pytest.fixture
+def make_user(app):
+    from extensions import bcrypt, db
+    from models import User
+
+    def make_user(username, status='approved', password='secret'):
+        user = User(username=username, email=f'{username}@example.com',
+                    password=bcrypt.generate_password_hash(password).decode('utf-8'),
+                    age=30, gender='M', mobile='9999999999', user_status=status)
+        db.session.add(user)
+        db.session.commit()
+        return user
+    return make_user
+
+
+@pytest.fixture
+def worker(app, tmp_path):
+    """The job pipeline set up in this process with a FakeModel for VEHICLE_TYPE."""
+    import pipeline
+    from inference import ModelRegistry
+    from services import services
+
+    weights = tmp_path / 'weights.pt'
+    weights.write_bytes(b'fake weights')
+    model = FakeModel()
+    registry = ModelRegistry({VEHICLE_TYPE: str(weights)}, loader=lambda path: model)
+    pipeline.init_worker(services.worker_settings, registry=registry)
+    yield model
+    if pipeline._state['duplicates'] is not None:
+        pipeline._state['duplicates'].engine.dispose()
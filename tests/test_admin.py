@@ -0,0 +1,176 @@
+import pytest
+
+from conftest import BRAND, VEHICLE_TYPE
+
+
+@pytest.fixture
+def users(app):
+    """Users by name, inserted without bcrypt so a page's worth is quick to make."""
+    from extensions import db
+    from models import User
+
+    def add(*specs):
+        rows = [User(username=username, email=email, password='x', age=30, gender=gender, mobile='1',
+                     user_status=status)
+                for username, email, status, gender in specs]
+        db.session.add_all(rows)
+        db.session.commit()
+        return {row.username: row.id for row in rows}
+    return add
+
+
+def usernames(rows):
+    return [row.username for row in rows]
+
+
+def test_search_matches_usernames_and_emails_case_insensitively(app, users):
+    from views import user_page
+
+    ids = users(('Alice', 'Alice@X.com', 'approved', 'F'),
+                ('alfred', 'fred@example.com', 'Pending', 'M'),
+                ('bob', 'ALbert@example.com', 'approved', 'M'),
+                ('2024', 'year@example.com', 'approved', 'M'),
+                ('carol', 'carol@example.com', 'approved', 'F'))
+
+    assert usernames(user_page(search='ali')[0]) == ['Alice']
+    assert usernames(user_page(search='AL')[0]) == ['bob', 'alfred', 'Alice']
+    assert usernames(user_page(search='alice@x')[0]) == ['Alice']
+    assert usernames(user_page(search='Alice@X')[0]) == ['Alice']
+    assert usernames(user_page(search='2024')[0]) == ['2024']
+    assert usernames(user_page(search=str(ids['carol']))[0]) == ['carol']
+    assert user_page(search='zed')[0] == []
+    assert user_page(search='9' * 30)[0] == []
+
+
+def test_status_filters_and_counts(app, users):
+    from views import user_counts, user_page
+
+    users(('a', 'a@x', 'approved', 'M'), ('b', 'b@x', 'Pending', 'F'), ('c', 'c@x', 'Pending', 'M'))
+
+    assert usernames(user_page('approved')[0]) == ['a']
+    assert usernames(user_page('pending')[0]) == ['c', 'b']
+    assert usernames(user_page('pending', search='B')[0]) == ['b']
+    assert usernames(user_page()[0]) == ['c', 'b', 'a']
+    assert user_counts() == {'total': 3, 'approved': 1, 'pending': 2, 'male': 2}
+
+
+def test_user_pages_follow_the_id_cursor(app, users):
+    from views import user_page
+
+    app.config['ADMIN_PAGE_SIZE'] = 2
+    users(*[(f'user{i}', f'user{i}@x', 'Pending', 'M') for i in range(5)])
+
+    seen, before = [], None
+    while True:
+        rows, before = user_page('pending', before=before)
+        seen.append(usernames(rows))
+        if before is None:
+            break
+    assert seen == [['user4', 'user3'], ['user2', 'user1'], ['user0']]
+
+    client = app.test_client()
+    html = client.get('/view?q=user').get_data(as_text=True)
+    assert 'user4' in html and 'user2' not in html
+    cursor = user_page(search='user')[1]
+    assert f'before={cursor}' in html
+    html = client.get(f'/view?q=user&before={cursor}').get_data(as_text=True)
+    assert 'user2' in html and 'user4' not in html
+
+
+def statuses():
+    from models import User
+
+    return {user.username: user.user_status for user in User.query.order_by(User.id)}
+
+
+def test_bulk_approve_selected_and_all_pending(app, users):
+    ids = users(('a', 'a@x', 'Pending', 'M'), ('b', 'b@x', 'Pending', 'F'), ('c', 'c@x', 'Pending', 'M'))
+    client = app.test_client()
+
+    response = client.post('/users/bulk', data={'action': 'approve', 'ids': [ids['a'], ids['c']],
+                                                'next': '/view_requests'})
+    assert response.status_code == 302 and response.location.endswith('/view_requests')
+    assert statuses() == {'a': 'approved', 'b': 'Pending', 'c': 'approved'}
+
+    client.post('/users/bulk', data={'action': 'approve_pending'})
+    assert statuses() == {'a': 'approved', 'b': 'approved', 'c': 'approved'}
+
+
+def test_bulk_delete_removes_only_the_selected_users_and_their_data(app, users):
+    from extensions import db
+    from models import Assessment
+    from services import services
+
+    ids = users(('a', 'a@x', 'approved', 'M'), ('b', 'b@x', 'approved', 'F'), ('c', 'c@x', 'Pending', 'M'))
+    for user_id in ids.values():
+        services.repository.create(user_id, VEHICLE_TYPE, BRAND, 100.0, 'a.jpg',
+                                   [{'damage_type': 'bumper', 'cost': 100.0}], phashes=[user_id])
+    db.session.commit()
+
+    client = app.test_client()
+    client.post('/users/bulk', data={'action': 'delete', 'ids': [ids['a'], ids['c']]})
+    assert statuses() == {'b': 'approved'}
+    assert [assessment.user_id for assessment in Assessment.query.all()] == [ids['b']]
+
+    # Without a selection nothing happens.
+    client.post('/users/bulk', data={'action': 'delete'})
+    client.post('/users/bulk', data={'action': 'approve'})
+    assert statuses() == {'b': 'approved'}
+
+
+def test_update_status_and_delete_routes(app, users):
+    ids = users(('a', 'a@x', 'Pending', 'M'), ('b', 'b@x', 'Pending', 'F'))
+    client = app.test_client()
+
+    assert client.get(f'/update_status/{ids["a"]}/').status_code == 405
+    client.post(f'/update_status/{ids["a"]}/')
+    assert statuses() == {'a': 'approved', 'b': 'Pending'}
+
+    response = client.post(f'/delete/{ids["b"]}/', data={'next': 'https://example.com/'})
+    assert response.location.endswith('/view')
+    assert statuses() == {'a': 'approved'}
+
+
+def home_status(app, client):
+    # Requests reuse the fixture's app context, and with it the user flask_login
+    # kept in g; a fresh context makes every request go through load_user.
+    with app.app_context():
+        return client.get('/home').status_code
+
+
+def test_admin_changes_drop_the_cached_login(app, make_user):
+    from conftest import login
+    from services import services
+
+    alice, bob, carol = make_user('alice'), make_user('bob'), make_user('carol')
+    ids = {user.username: user.id for user in (alice, bob, carol)}
+    clients = {user.username: login(app, user) for user in (alice, bob, carol)}
+    for name, client in clients.items():
+        assert home_status(app, client) == 200
+        assert services.user_cache.get(ids[name]) is not None
+
+    admin = app.test_client()
+    admin.post(f'/update_status/{ids["alice"]}/')
+    assert services.user_cache.get(ids['alice']) is None
+    assert home_status(app, clients['alice']) == 200
+
+    # A deleted user must not stay logged in on a cached copy.
+    admin.post(f'/delete/{ids["bob"]}/')
+    assert services.user_cache.get(ids['bob']) is None
+    assert home_status(app, clients['bob']) == 302
+
+    admin.post('/users/bulk', data={'action': 'delete', 'ids': [ids['carol']]})
+    assert services.user_cache.get(ids['carol']) is None
+    assert home_status(app, clients['carol']) == 302
+
+
+def test_bulk_approve_drops_the_cached_logins(app, make_user):
+    from conftest import login
+    from services import services
+
+    alice = make_user('alice')
+    home_status(app, login(app, alice))
+    assert services.user_cache.get(alice.id) is not None
+
+    app.test_client().post('/users/bulk', data={'action': 'approve', 'ids': [alice.id]})
+    assert services.user_cache.get(alice.id) is None
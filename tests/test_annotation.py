@@ -0,0 +1,66 @@
+import numpy as np
+
+from conftest import NAMES
+
+
+def blank(height=300, width=400):
+    return np.zeros((height, width, 3), dtype=np.uint8)
+
+
+def test_boxes_are_drawn_in_place_in_the_class_colour():
+    from annotation import BOX_THICKNESS, PALETTE, draw_detections
+
+    image = blank()
+    drawn = draw_detections(image, np.array([[100, 150, 200, 250], [250.4, 150, 350, 249.6]]), np.array([0., 21.]),
+                            {0: 'bumper', 21: 'hood'})
+
+    assert drawn is image
+    assert tuple(image[200, 100]) == PALETTE[0] and tuple(image[250, 150]) == PALETTE[0]
+    # Class ids past the palette wrap around; coordinates are rounded.
+    assert tuple(image[200, 250]) == PALETTE[21 % len(PALETTE)] and tuple(image[250, 300]) == PALETTE[1]
+    assert not image[200, 100 + BOX_THICKNESS + 1:200 - BOX_THICKNESS].any()
+
+
+def test_labels_sit_above_the_box_unless_it_touches_the_top():
+    from annotation import LABEL_PADDING, PALETTE, draw_detections, label_metrics
+
+    width, height, baseline = label_metrics('door')
+    label_height = height + baseline + LABEL_PADDING
+    right = 50 + width + 2 * LABEL_PADDING - 1
+    image = draw_detections(blank(), np.array([[50, 120, 300, 200], [50, 2, 300, 80]]), np.array([1, 3]), NAMES)
+
+    # The first box has room above it; the second label goes inside its top edge.
+    assert tuple(image[120 - label_height + 1, right]) == PALETTE[1]
+    assert not image[120 - label_height - 2, 50:right].any()
+    assert tuple(image[2 + label_height - 1, right]) == PALETTE[3]
+    assert not image[2 + label_height + 2, 52:right].any()
+
+
+def test_confidence_labels_have_a_fixed_width():
+    from annotation import draw_detections
+
+    def label_row(conf):
+        image = draw_detections(blank(), np.array([[50, 100, 300, 200]]), np.array([0]), NAMES, np.array([conf]))
+        return np.flatnonzero(image[90].any(axis=1))
+
+    low, high = label_row(0.07), label_row(0.98)
+    assert low.min() == high.min() == 50 and low.max() == high.max()
+    assert label_row(0.5).max() > np.flatnonzero(
+        draw_detections(blank(), np.array([[50, 100, 300, 200]]), np.array([0]), NAMES)[90].any(axis=1)).max()
+
+
+def test_annotate_reads_the_result_and_measures_each_label_once():
+    from annotation import annotate, draw_detections, label_metrics
+    from onnx_backend import Boxes, Result
+
+    result = Result(NAMES, Boxes(np.array([[10, 40, 100, 120], [150, 40, 250, 120]], dtype=np.float32),
+                                 np.array([0.9, 0.4], dtype=np.float32), np.array([3, 3], dtype=np.float32)),
+                    (300, 400))
+    label_metrics.cache_clear()
+    annotated = annotate(blank(), result)
+
+    assert label_metrics.cache_info().misses == 1 and label_metrics.cache_info().hits == 1
+    expected = draw_detections(blank(), result.boxes.xyxy, result.boxes.cls, NAMES, result.boxes.conf)
+    assert np.array_equal(annotated, expected)
+    assert not np.array_equal(annotate(blank(), result, show_confidence=False), expected)
+    assert not annotate(blank(), Result(NAMES, Boxes(np.zeros((0, 4)), np.zeros(0), np.zeros(0)), (300, 400))).any()
@@ -0,0 +1,135 @@
+import asyncio
+
+import pytest
+
+
+def bridge(wsgi_app, max_threads=1, spool_bytes=1024, max_body_bytes=None):
+    from asgi import WSGIBridge
+
+    return WSGIBridge(wsgi_app, max_threads=max_threads, spool_bytes=spool_bytes, max_body_bytes=max_body_bytes)
+
+
+@pytest.fixture
+def asgi_module(monkeypatch):
+    # asgi builds its own app on import; keep it off the real database.
+    monkeypatch.setenv('DATABASE_URL', 'sqlite://')
+    import asgi
+    return asgi
+
+
+def scope(method='POST', path='/', headers=()):
+    return {'type': 'http', 'method': method, 'path': path, 'query_string': b'', 'headers': list(headers)}
+
+
+async def request(application, request_scope, messages, events=None):
+    """Run one request; messages are body chunks, awaitables, or 'disconnect'."""
+    messages = list(messages)
+    sent = []
+
+    async def receive():
+        message = messages.pop(0)
+        if message == 'disconnect':
+            return {'type': 'http.disconnect'}
+        if not isinstance(message, bytes):
+            await message
+            return await receive()
+        if events is not None:
+            events.append('chunk')
+        return {'type': 'http.request', 'body': message, 'more_body': bool(messages)}
+
+    async def send(message):
+        sent.append(message)
+
+    await application(request_scope, receive, send)
+    if not sent:
+        return None, {}, b''
+    return (sent[0]['status'], dict(sent[0]['headers']),
+            b''.join(message.get('body', b'') for message in sent[1:]))
+
+
+def recording_app(events, body=b'ok'):
+    def wsgi_app(environ, start_response):
+        data = environ['wsgi.input'].read()
+        events.append(('app', data, environ['CONTENT_LENGTH'], getattr(environ['wsgi.input'], '_rolled', None)))
+        start_response('200 OK', [('Content-Type', 'text/plain')])
+        return [body]
+    return wsgi_app
+
+
+def test_the_app_runs_only_after_the_whole_upload_arrived(asgi_module):
+    events = []
+    application = bridge(recording_app(events), spool_bytes=10)
+    status, headers, body = asyncio.run(request(application, scope(), [b'a' * 8, asyncio.sleep(0.01), b'b' * 8],
+                                                events))
+
+    assert status == 200 and body == b'ok' and headers[b'content-type'] == b'text/plain'
+    # Past spool_bytes the body was moved to a temporary file.
+    assert events == ['chunk', 'chunk', ('app', b'a' * 8 + b'b' * 8, '16', True)]
+
+    events.clear()
+    asyncio.run(request(application, scope(), [b'small'], events))
+    assert events == ['chunk', ('app', b'small', '5', False)]
+
+
+def test_oversized_and_abandoned_uploads_never_reach_the_app(asgi_module):
+    events = []
+    application = bridge(recording_app(events), max_body_bytes=10)
+
+    declared = scope(headers=[(b'content-length', b'11')])
+    assert asyncio.run(request(application, declared, [b'x' * 11]))[0] == 413
+    assert asyncio.run(request(application, scope(), [b'x' * 6, b'x' * 6]))[0] == 413
+    assert asyncio.run(request(application, scope(), [b'x' * 6, 'disconnect'])) == (None, {}, b'')
+    assert not [event for event in events if event != 'chunk']
+
+
+def test_slow_uploads_do_not_hold_the_threads(asgi_module):
+    events = []
+    application = bridge(recording_app(events), max_threads=1)
+
+    async def main():
+        release = asyncio.Event()
+        slow = asyncio.create_task(request(application, scope(), [b'first', release.wait(), b' half']))
+        await asyncio.sleep(0.01)
+        # The only thread is free while the slow upload is still arriving.
+        quick = await asyncio.wait_for(request(application, scope('GET'), [b'']), timeout=5)
+        release.set()
+        return quick, await slow
+
+    quick, slow = asyncio.run(main())
+    assert quick[0] == slow[0] == 200
+    assert [event[1] for event in events] == [b'', b'first half']
+
+
+def test_responses_are_sent_in_joined_blocks(asgi_module):
+    def wsgi_app(environ, start_response):
+        start_response('200 OK', [('Content-Type', 'application/octet-stream')])
+        return (b'x' * 1000 for _ in range(200))
+
+    sent = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message):
+        sent.append(message)
+
+    application = bridge(wsgi_app)
+    asyncio.run(application(scope('GET'), receive, send))
+    blocks = [len(message['body']) for message in sent[1:]]
+    assert sum(blocks) == 200_000 and len(blocks) <= 5
+    assert all(size >= asgi_module.RESPONSE_CHUNK_BYTES for size in blocks[:-2])
+
+    sent.clear()
+    asyncio.run(application(scope('HEAD'), receive, send))
+    assert [message.get('body', b'') for message in sent[1:]] == [b'']
+
+
+def test_flask_routes_work_through_the_bridge(app, make_user, asgi_module):
+    make_user('alice')
+    application = bridge(app, max_threads=2)
+    form = [(b'content-type', b'application/x-www-form-urlencoded')]
+
+    status, headers, _ = asyncio.run(request(application, scope('POST', '/login', form),
+                                             [b'email=alice%40example.com', b'&password=secret']))
+    assert status == 302 and headers[b'location'].endswith(b'/home')
+    assert b'session=' in headers[b'set-cookie']
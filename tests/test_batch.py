@@ -0,0 +1,68 @@
+from conftest import BRAND, VEHICLE_TYPE, claim_photo, jpeg
+
+
+def write_photos(directory, names):
+    directory.mkdir(parents=True, exist_ok=True)
+    for seed, name in enumerate(names, start=1):
+        (directory / name).write_bytes(jpeg(claim_photo(seed, 320, 240)))
+
+
+def test_directories_and_manifests_list_photos_in_order(tmp_path):
+    from batch import iter_directory, iter_manifest
+
+    write_photos(tmp_path / 'claims', ['b.jpg', 'a.PNG'])
+    write_photos(tmp_path / 'claims' / 'sub', ['c.jpeg'])
+    (tmp_path / 'claims' / 'notes.txt').write_text('not a photo')
+
+    items = list(iter_directory(str(tmp_path / 'claims'), VEHICLE_TYPE, BRAND, 'alice'))
+    assert [path[len(str(tmp_path)) + 1:] for path, _, _, _ in items] == [
+        'claims/a.PNG', 'claims/b.jpg', 'claims/sub/c.jpeg']
+    assert {item[1:] for item in items} == {(VEHICLE_TYPE, BRAND, 'alice')}
+
+    manifest = tmp_path / 'claims' / 'manifest.csv'
+    manifest.write_text(f'path,vehicle_type,brand,user\nsub/c.jpeg,{VEHICLE_TYPE},{BRAND},bob\n')
+    assert list(iter_manifest(str(manifest))) == [
+        (str(tmp_path / 'claims' / 'sub' / 'c.jpeg'), VEHICLE_TYPE, BRAND, 'bob')]
+
+
+def test_assess_files_makes_one_model_call_per_vehicle_type(worker, tmp_path):
+    import pipeline
+
+    write_photos(tmp_path, ['a.jpg', 'b.jpg', 'c.jpg'])
+    tasks = [(VEHICLE_TYPE, BRAND, str(tmp_path / name)) for name in ('a.jpg', 'missing.jpg', 'b.jpg', 'c.jpg')]
+    tasks.append(('9wheeler', BRAND, str(tmp_path / 'a.jpg')))
+    outputs = pipeline.assess_files(tasks)
+
+    assert worker.calls == [3]
+    assert 'FileNotFoundError' in outputs[1]['error'] and 'error' in outputs[4]
+    for output in outputs[:1] + outputs[2:4]:
+        assert [item['damage_type'] for item in output['damage_details']] == ['bumper', 'door', 'dent']
+        assert len(output['phashes']) == 1 and output['image_filename'] is None
+
+
+def test_assess_batch_writes_assessments_in_commit_sized_groups(app, make_user, worker, tmp_path, monkeypatch):
+    import batch
+    import pipeline
+    from models import Assessment, User
+
+    # Run the chunks in this process, where the worker fixture set up the pipeline.
+    monkeypatch.setattr(batch, 'run_batch', lambda items, settings, workers, chunk_size, save_images: (
+        (chunk, pipeline.assess_files([(vt, brand, path) for path, vt, brand, _ in chunk], save_images))
+        for chunk in batch._chunks(items, chunk_size)))
+    alice_id = make_user('alice').id
+    write_photos(tmp_path / 'claims', [f'{i}.jpg' for i in range(5)])
+    manifest = tmp_path / 'claims' / 'manifest.csv'
+    manifest.write_text('path,vehicle_type,brand,user\n' + ''.join(
+        f'{i}.jpg,{VEHICLE_TYPE},{BRAND},{"nobody" if i == 4 else "alice@example.com"}\n' for i in range(5)))
+
+    result = app.test_cli_runner().invoke(args=['assess-batch', str(manifest), '--chunk-size', '1',
+                                                '--commit-every', '3'])
+
+    assert result.exit_code == 0, result.output
+    assert 'unknown user nobody' in result.output
+    progress = [line for line in result.output.splitlines() if line.endswith('photos/s)')]
+    assert [line.split(',')[1].strip() for line in progress] == ['3 assessments', '4 assessments']
+    assessments = Assessment.query.order_by(Assessment.id).all()
+    assert len(assessments) == 4 and {assessment.user_id for assessment in assessments} == {alice_id}
+    assert [item.detected_damage for item in assessments[0].items] == ['bumper', 'door', 'dent']
+    assert User.query.count() == 1
@@ -0,0 +1,78 @@
+import os
+
+import numpy as np
+
+from conftest import BRAND, VEHICLE_TYPE, claim_photo, jpeg
+
+
+def test_keys_depend_on_pixels_order_and_model():
+    from cache import image_digest, make_key
+
+    a, b = np.zeros((4, 4, 3), dtype=np.uint8), np.ones((4, 4, 3), dtype=np.uint8)
+    digests = [image_digest(a), image_digest(b)]
+
+    assert image_digest(a.copy()) == digests[0]
+    assert image_digest(a.reshape(8, 2, 3)) != digests[0]
+    key = make_key(digests, VEHICLE_TYPE, BRAND, 'v1')
+    assert make_key(list(digests), VEHICLE_TYPE, BRAND, 'v1') == key
+    assert make_key(digests[::-1], VEHICLE_TYPE, BRAND, 'v1') != key
+    assert make_key(digests, VEHICLE_TYPE, BRAND, 'v2') != key
+    assert make_key(digests, VEHICLE_TYPE, 'Tata Motors: Nexon', 'v1') != key
+
+
+def test_result_cache_evicts_least_recently_used_and_drops_a_vehicle_type():
+    from cache import ResultCache
+
+    cache = ResultCache(max_entries=2)
+    cache.put('a', '4wheeler', 1)
+    cache.put('b', '2wheeler', 2)
+    assert cache.get('a') == 1
+    cache.put('c', '4wheeler', 3)
+    assert cache.get('b') is None and len(cache) == 2
+
+    cache.invalidate('4wheeler')
+    assert len(cache) == 0
+
+    disabled = ResultCache(max_entries=0)
+    disabled.put('a', '4wheeler', 1)
+    assert disabled.get('a') is None
+
+
+def test_ttl_cache_entries_expire(monkeypatch):
+    import cache as cache_module
+
+    now = [100.0]
+    monkeypatch.setattr(cache_module.time, 'monotonic', lambda: now[0])
+    cache = cache_module.TTLCache(max_entries=2, ttl=60)
+    cache.put(1, 'alice')
+    now[0] += 59
+    assert cache.get(1) == 'alice'
+    now[0] += 2
+    assert cache.get(1) is None and len(cache) == 0
+
+
+def test_resubmitted_photos_skip_inference_until_the_model_changes(worker, tmp_path):
+    import pipeline
+
+    photos = [jpeg(claim_photo())]
+    first = pipeline.run_assessment('a', VEHICLE_TYPE, BRAND, photos)
+    second = pipeline.run_assessment('b', VEHICLE_TYPE, BRAND, list(photos))
+
+    assert not first['cached'] and second['cached']
+    assert worker.calls == [1]
+    assert second['damage_details'] == first['damage_details']
+    assert second['total_cost'] == first['total_cost']
+
+    pipeline.run_assessment('c', VEHICLE_TYPE, 'Tata Motors: Nexon', photos)
+    assert worker.calls == [1, 1]
+
+    # New weights drop the vehicle type's entries before the next lookup.
+    registry = pipeline._state['registry']
+    registry.reload_interval = 0
+    mtime = registry.get(VEHICLE_TYPE).mtime + 10
+    (tmp_path / 'weights.pt').write_bytes(b'new weights')
+    os.utime(tmp_path / 'weights.pt', (mtime, mtime))
+    assert registry.get(VEHICLE_TYPE).mtime == mtime
+    assert len(pipeline._state['cache']) == 0
+    assert not pipeline.run_assessment('d', VEHICLE_TYPE, BRAND, photos)['cached']
+    assert worker.calls == [1, 1, 1]
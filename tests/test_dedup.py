@@ -0,0 +1,66 @@
+from conftest import BRAND, VEHICLE_TYPE, claim_photo, jpeg, login
+
+
+def assess(user, job_id, images_bytes):
+    import pipeline
+    from extensions import db
+    from models import AssessmentJob
+    from services import complete_assessment
+
+    db.session.add(AssessmentJob(id=job_id, user_id=user.id, vehicle_type=VEHICLE_TYPE, vehicle_brand=BRAND))
+    db.session.commit()
+    output = pipeline.run_assessment(job_id, VEHICLE_TYPE, BRAND, images_bytes)
+    complete_assessment(job_id, output)
+    return output
+
+
+def test_phash_survives_recompression():
+    import cv2
+    import numpy as np
+    from dedup import hamming, phash
+
+    photo = claim_photo()
+    smaller = cv2.imdecode(np.frombuffer(jpeg(cv2.resize(photo, None, fx=0.5, fy=0.5), 40), np.uint8),
+                           cv2.IMREAD_COLOR)
+    assert hamming(phash(photo), phash(smaller)) <= 3
+    assert hamming(phash(photo), phash(claim_photo(seed=2))) > 3
+
+
+def test_reused_job_is_priced_like_a_fresh_run(app, make_user, worker):
+    first = assess(make_user('alice'), 'first', [jpeg(claim_photo())])
+    bob = make_user('bob')
+    second = assess(bob, 'second', [jpeg(claim_photo(), quality=60)])
+
+    assert not first['reused'] and second['reused']
+    assert worker.calls == [1]
+    assert second['damage_details'] == first['damage_details']
+    assert second['unpriced'] == first['unpriced'] == ['dent']
+    assert second['total_cost'] == first['total_cost'] == 9000 + 14000
+
+    html = login(app, bob).get('/assessment/second').get_data(as_text=True)
+    assert '₹9000.0' in html and '₹14000.0' in html
+    assert html.count('No price on file') == 1
+
+
+def test_near_duplicate_of_other_brand_is_assessed_again(app, make_user, worker):
+    assess(make_user('alice'), 'first', [jpeg(claim_photo())])
+    import pipeline
+    from models import Assessment
+
+    output = pipeline.run_assessment('second', VEHICLE_TYPE, 'Maruti Suzuki: Swift', [jpeg(claim_photo(), 60)])
+    assert not output['reused']
+    assert output['duplicate_of'] == Assessment.query.one().id
+    assert worker.calls == [1, 1]
+
+
+def test_batch_hashes_the_photo_before_annotation(worker, tmp_path):
+    import pipeline
+    from dedup import phash
+    from ingest import decode_image
+
+    path = tmp_path / 'claim.jpg'
+    path.write_bytes(jpeg(claim_photo()))
+    output, = pipeline.assess_files([(VEHICLE_TYPE, BRAND, str(path))], save_images=True)
+
+    assert output['image_filename'] is not None
+    assert output['phashes'] == [phash(decode_image(path.read_bytes(), pipeline._state['settings']['max_side']))]
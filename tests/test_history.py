@@ -0,0 +1,68 @@
+from datetime import datetime, timedelta
+
+from conftest import BRAND, VEHICLE_TYPE, login
+
+
+def add_assessments(user, costs, vehicle_type=VEHICLE_TYPE, created_at=None):
+    from extensions import db
+    from models import Assessment, DamageItem
+
+    assessments = [Assessment(user_id=user.id, vehicle_type=vehicle_type, vehicle_brand=BRAND, total_cost=cost,
+                              image_path='a.jpg', created_at=created_at or datetime.utcnow(),
+                              items=[DamageItem(detected_damage='bumper', cost=cost)])
+                   for cost in costs]
+    db.session.add_all(assessments)
+    db.session.commit()
+    return [assessment.id for assessment in assessments]
+
+
+def pages(client, limit):
+    ids, before = [], None
+    while True:
+        url = f'/api/assessment?limit={limit}' + (f'&before={before}' if before else '')
+        data = client.get(url).get_json()
+        ids.append([result['id'] for result in data['results']])
+        before = data['next_cursor']
+        if before is None:
+            return ids
+
+
+def test_history_pages_newest_first_with_a_keyset_cursor(app, make_user):
+    alice = make_user('alice')
+    now = datetime.utcnow()
+    older = add_assessments(alice, [100, 200], created_at=now - timedelta(days=1))
+    # Same timestamp: the id breaks the tie, so nothing is skipped or repeated.
+    same = add_assessments(alice, [300, 400, 500], created_at=now)
+    add_assessments(make_user('bob'), [999])
+
+    client = login(app, alice)
+    assert pages(client, 2) == [same[::-1][:2], [same[0], older[1]], [older[0]]]
+    assert pages(client, 10) == [same[::-1] + older[::-1]]
+
+    data = client.get(f'/api/assessment?before={same[1]}').get_json()
+    assert [result['id'] for result in data['results']] == [same[0]] + older[::-1]
+    assert data['results'][0]['damages'] == [{'detected_damage': 'bumper', 'cost': 300.0}]
+
+
+def test_history_limit_is_clamped(app, make_user):
+    alice = make_user('alice')
+    add_assessments(alice, range(1, 5))
+    client = login(app, alice)
+
+    for limit, size in ((-1, 1), (0, 4), (3, 3), (1000, 4)):
+        data = client.get(f'/api/assessment?limit={limit}').get_json()
+        assert len(data['results']) == size
+
+
+def test_history_stats_aggregate_in_sql(app, make_user):
+    alice = make_user('alice')
+    add_assessments(alice, [1000, 2000])
+    add_assessments(alice, [6000], vehicle_type='2wheeler', created_at=datetime.utcnow() - timedelta(days=40))
+    add_assessments(make_user('bob'), [50000])
+
+    stats = login(app, alice).get('/api/assessment').get_json()['stats']
+    assert stats == {'count': 3, 'total_cost': 9000.0, 'average_cost': 3000.0, 'this_month': 2,
+                     'by_vehicle_type': {VEHICLE_TYPE: 2, '2wheeler': 1}}
+
+    empty = login(app, make_user('carol')).get('/api/assessment').get_json()
+    assert empty['stats']['count'] == 0 and empty['results'] == [] and empty['next_cursor'] is None
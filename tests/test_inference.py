@@ -0,0 +1,178 @@
+import os
+
+import pytest
+
+from conftest import VEHICLE_TYPE, FakeModel
+
+
+def registry_for(tmp_path, reload_interval=0):
+    from inference import ModelRegistry
+
+    weights = tmp_path / 'weights.pt'
+    weights.write_bytes(b'version 1')
+    loaded = []
+
+    def loader(path):
+        loaded.append(FakeModel())
+        return loaded[-1]
+    return ModelRegistry({VEHICLE_TYPE: str(weights)}, loader=loader, reload_interval=reload_interval), weights, loaded
+
+
+def test_registry_loads_each_model_once(tmp_path):
+    registry, _, loaded = registry_for(tmp_path)
+
+    first = registry.get(VEHICLE_TYPE)
+    assert registry.get(VEHICLE_TYPE) is first
+    assert len(loaded) == 1 and first.model is loaded[0]
+    assert registry.get('9wheeler') is None
+
+
+def test_registry_reloads_changed_weights_and_tells_listeners(tmp_path):
+    registry, weights, loaded = registry_for(tmp_path)
+    reloaded = []
+    registry.add_reload_listener(reloaded.append)
+    first = registry.get(VEHICLE_TYPE)
+
+    weights.write_bytes(b'version 2')
+    os.utime(weights, (first.mtime + 10, first.mtime + 10))
+    second = registry.get(VEHICLE_TYPE)
+
+    assert second is not first and second.model is loaded[1]
+    assert second.checksum != first.checksum
+    assert reloaded == [VEHICLE_TYPE]
+
+
+def test_registry_keeps_serving_when_weights_disappear(tmp_path):
+    registry, weights, loaded = registry_for(tmp_path)
+    first = registry.get(VEHICLE_TYPE)
+
+    weights.unlink()
+    assert registry.get(VEHICLE_TYPE) is first
+    assert len(loaded) == 1
+
+
+def test_registry_checks_the_file_at_most_once_per_interval(tmp_path):
+    registry, weights, loaded = registry_for(tmp_path, reload_interval=3600)
+    first = registry.get(VEHICLE_TYPE)
+
+    os.utime(weights, (first.mtime + 10, first.mtime + 10))
+    assert registry.get(VEHICLE_TYPE) is first
+
+
+def test_preload_loads_and_warms_up_every_model(tmp_path):
+    registry, _, loaded = registry_for(tmp_path)
+
+    registry.preload(warmup=True)
+    assert len(loaded) == 1 and loaded[0].calls == [1]
+
+
+class EchoModel:
+    """Tags each result with the image's first pixel and the size of its batch."""
+
+    names = {0: 'bumper'}
+
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.calls = []
+
+    def __call__(self, images, **kwargs):
+        import numpy as np
+        from onnx_backend import Boxes, Result
+
+        self.calls.append(len(images))
+        if self.fail:
+            raise ValueError('bad batch')
+        return [Result(self.names, Boxes(np.array([[image[0, 0, 0], 0, 1, 1]], dtype=np.float32),
+                                         np.array([len(images)], dtype=np.float32), np.zeros(1, dtype=np.float32)),
+                       image.shape[:2])
+                for image in images]
+
+
+def echo_loader(path):
+    return EchoModel()
+
+
+def tagged(value):
+    import numpy as np
+
+    return np.full((8, 8, 3), value, dtype=np.uint8)
+
+
+def batcher_for(tmp_path, model, **kwargs):
+    from inference import InferenceBatcher, ModelRegistry
+
+    weights = tmp_path / 'weights.pt'
+    weights.write_bytes(b'weights')
+    registry = ModelRegistry({VEHICLE_TYPE: str(weights)}, loader=lambda path: model)
+    return InferenceBatcher(registry, **kwargs)
+
+
+def test_batcher_groups_concurrent_images_up_to_the_batch_size(tmp_path):
+    model = EchoModel()
+    batcher = batcher_for(tmp_path, model, max_batch_size=4, max_wait_ms=200)
+
+    futures = [batcher.submit(VEHICLE_TYPE, tagged(value)) for value in range(6)]
+    results = [future.result(timeout=5) for future in futures]
+
+    assert model.calls == [4, 2]
+    # Every caller gets the result for its own image.
+    assert [int(result.boxes.xyxy[0, 0]) for result in results] == list(range(6))
+
+
+def test_batcher_does_not_wait_past_the_deadline(tmp_path):
+    import time
+
+    model = EchoModel()
+    batcher = batcher_for(tmp_path, model, max_batch_size=8, max_wait_ms=20)
+
+    started = time.monotonic()
+    batcher.submit(VEHICLE_TYPE, tagged(1)).result(timeout=5)
+    assert time.monotonic() - started < 1
+    assert model.calls == [1]
+
+
+def test_batcher_fails_every_waiter_of_a_failed_batch(tmp_path):
+    batcher = batcher_for(tmp_path, EchoModel(fail=True), max_batch_size=4, max_wait_ms=200)
+    futures = [batcher.submit(VEHICLE_TYPE, tagged(value)) for value in range(3)]
+    for future in futures:
+        with pytest.raises(ValueError, match='bad batch'):
+            future.result(timeout=5)
+
+    unknown = batcher.submit('9wheeler', tagged(0))
+    with pytest.raises(RuntimeError, match='No model available'):
+        unknown.result(timeout=5)
+
+
+def test_inference_process_batches_images_from_several_workers(tmp_path):
+    import multiprocessing
+
+    from inference import InferenceClient, serve
+
+    weights = tmp_path / 'weights.pt'
+    weights.write_bytes(b'weights')
+    settings = {'model_paths': {VEHICLE_TYPE: str(weights)}, 'reload_interval': 60,
+                'inference_batch_size': 8, 'inference_batch_wait_ms': 300}
+    context = multiprocessing.get_context('spawn')
+    authkey = os.urandom(16)
+    receiver, sender = context.Pipe(duplex=False)
+    process = context.Process(target=serve, args=(settings, authkey, sender, echo_loader), daemon=True)
+    process.start()
+    try:
+        assert receiver.poll(60)
+        address = receiver.recv()
+        workers = [InferenceClient(address, authkey) for _ in range(3)]
+
+        model = workers[0].get(VEHICLE_TYPE)
+        assert model.names == EchoModel.names and model.checksum
+        assert workers[0].get('9wheeler') is None
+
+        futures = [worker.submit(VEHICLE_TYPE, tagged(value)) for value, worker in enumerate(workers)]
+        results = [future.result(timeout=10) for future in futures]
+        assert [int(result.boxes.xyxy[0, 0]) for result in results] == [0, 1, 2]
+        assert [float(result.boxes.conf[0]) for result in results] == [3, 3, 3]
+
+        with pytest.raises(RuntimeError, match='No model available'):
+            workers[1].submit('9wheeler', tagged(0)).result(timeout=10)
+    finally:
+        process.kill()
+        process.join()
@@ -0,0 +1,80 @@
+import io
+import os
+
+import numpy as np
+import pytest
+
+from conftest import jpeg
+
+
+def two_colour_photo(width, height):
+    # Left half red, right half blue, in OpenCV's BGR order.
+    image = np.zeros((height, width, 3), dtype=np.uint8)
+    image[:, :width // 2] = (0, 0, 255)
+    image[:, width // 2:] = (255, 0, 0)
+    return image
+
+
+def test_large_jpegs_decode_shrunk_into_one_bgr_array():
+    from ingest import decode_image, image_size
+
+    photo = jpeg(two_colour_photo(4000, 3000))
+    assert image_size(photo) == (4000, 3000)
+    image = decode_image(photo, max_side=1280)
+
+    assert image.shape == (960, 1280, 3) and image.dtype == np.uint8
+    assert image.flags['C_CONTIGUOUS']
+    assert np.abs(image[480, 100].astype(int) - (0, 0, 255)).max() < 10
+    assert np.abs(image[480, 1180].astype(int) - (255, 0, 0)).max() < 10
+
+    small = decode_image(jpeg(two_colour_photo(640, 480)), max_side=1280)
+    assert small.shape == (480, 640, 3)
+
+
+def test_exif_orientation_is_applied():
+    from PIL import Image
+
+    from ingest import decode_image
+
+    exif = Image.Exif()
+    exif[0x0112] = 6  # rotate 90 degrees clockwise to display
+    buffer = io.BytesIO()
+    Image.new('RGB', (400, 200), (255, 0, 0)).save(buffer, 'JPEG', exif=exif)
+
+    assert decode_image(buffer.getvalue(), max_side=1280).shape == (400, 200, 3)
+
+
+@pytest.mark.parametrize('mode', ['L', 'RGBA', 'P'])
+def test_other_formats_and_modes_become_three_channel_bgr(mode):
+    from PIL import Image
+
+    from ingest import decode_image
+
+    buffer = io.BytesIO()
+    Image.new('RGB', (300, 150), (255, 0, 0)).convert(mode).save(buffer, 'PNG')
+    image = decode_image(buffer.getvalue(), max_side=100)
+
+    assert image.shape == (50, 100, 3)
+    if mode != 'L':
+        assert image[25, 50].tolist() == [0, 0, 255]
+
+
+def test_uploads_over_the_limit_are_refused():
+    from ingest import ImageTooLarge, read_upload
+
+    assert read_upload(io.BytesIO(b'x' * 100), max_bytes=100, chunk_size=7) == b'x' * 100
+    with pytest.raises(ImageTooLarge):
+        read_upload(io.BytesIO(b'x' * 101), max_bytes=100, chunk_size=7)
+
+
+def test_videos_are_streamed_into_the_store(tmp_path):
+    from ingest import VideoTooLarge, save_upload
+    from storage import ArtifactStore
+
+    store = ArtifactStore(str(tmp_path))
+    key = save_upload(io.BytesIO(b'v' * 100), store, '.mp4', max_bytes=100, chunk_size=7)
+    assert key.endswith('.mp4') and open(store.path(key), 'rb').read() == b'v' * 100
+
+    with pytest.raises(VideoTooLarge):
+        save_upload(io.BytesIO(b'v' * 101), store, '.mp4', max_bytes=100, chunk_size=7)
+    assert sum(len(files) for _, _, files in os.walk(tmp_path)) == 1
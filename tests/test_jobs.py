@@ -0,0 +1,20 @@
+from conftest import VEHICLE_TYPE, FakeModel
+
+
+def test_process_worker_loads_and_warms_up_models_when_preloading(app, tmp_path, monkeypatch):
+    import inference
+    import pipeline
+    from services import services
+
+    weights = tmp_path / 'weights.pt'
+    weights.write_bytes(b'fake weights')
+    loaded = []
+    monkeypatch.setattr(inference, '_load_yolo', lambda path: loaded.append(FakeModel()) or loaded[-1])
+    settings = dict(services.worker_settings, model_paths={VEHICLE_TYPE: str(weights)})
+
+    pipeline.init_worker(dict(settings, preload=False))
+    assert loaded == []
+
+    pipeline.init_worker(dict(settings, preload=True))
+    assert len(loaded) == 1 and loaded[0].calls == [1]
+    assert pipeline._state['registry'].get(VEHICLE_TYPE).model is loaded[0]
@@ -0,0 +1,77 @@
+import numpy as np
+import pytest
+
+
+def test_letterbox_scales_to_fit_and_centres_the_padding():
+    from onnx_backend import letterbox
+
+    image = np.full((100, 200, 3), 7, dtype=np.uint8)
+    canvas, scale, (left, top) = letterbox(image, 64)
+
+    assert canvas.shape == (64, 64, 3) and scale == pytest.approx(0.32)
+    assert (left, top) == (0, 16)
+    assert (canvas[:16] == 114).all() and (canvas[48:] == 114).all()
+    assert (canvas[16:48] == 7).all()
+
+    tall = letterbox(np.zeros((50, 25, 3), dtype=np.uint8), 64)
+    assert tall[1] == pytest.approx(1.28) and tall[2] == (16, 0)
+
+
+def test_nms_keeps_the_best_of_each_overlapping_group():
+    from onnx_backend import box_iou, nms
+
+    boxes = np.array([[0, 0, 10, 10], [1, 0, 11, 10], [20, 20, 30, 30], [0, 0, 10, 20]], dtype=np.float32)
+    scores = np.array([0.6, 0.9, 0.5, 0.4], dtype=np.float32)
+
+    assert box_iou(boxes[1], boxes[[0, 2, 3]]).tolist() == pytest.approx([9 / 11, 0, 90 / 210])
+    # The last box only competes with kept boxes, so the first one no longer counts.
+    assert nms(boxes, scores, 0.4).tolist() == [1, 2]
+    assert nms(boxes, scores, 0.45).tolist() == [1, 2, 3]
+    assert nms(boxes[:0], scores[:0], 0.5).tolist() == []
+
+
+def yolo_head():
+    """A (4 + 3 classes, 5 anchors) head with centre-size boxes."""
+    anchors = [
+        ((50, 50, 20, 20), 0, 0.9),
+        ((52, 50, 20, 20), 0, 0.8),   # overlaps the first, same class: suppressed
+        ((50, 50, 20, 20), 1, 0.7),   # same box, other class: kept
+        ((10, 10, 4, 4), 2, 0.1),     # below the confidence threshold
+        ((150, 150, 10, 10), 0, 0.6),
+    ]
+    prediction = np.zeros((7, len(anchors)), dtype=np.float32)
+    for i, (box, class_id, conf) in enumerate(anchors):
+        prediction[:4, i] = box
+        prediction[4 + class_id, i] = conf
+    return prediction
+
+
+@pytest.mark.parametrize('transpose', [False, True])
+def test_postprocess_decodes_filters_and_suppresses_per_class(transpose):
+    from onnx_backend import postprocess
+
+    prediction = yolo_head()
+    xyxy, conf, class_ids = postprocess(prediction.T if transpose else prediction, num_classes=3)
+
+    assert xyxy.tolist() == [[40, 40, 60, 60], [40, 40, 60, 60], [145, 145, 155, 155]]
+    assert conf.tolist() == pytest.approx([0.9, 0.7, 0.6])
+    assert class_ids.tolist() == [0, 1, 0]
+
+    assert len(postprocess(prediction, 3, conf_threshold=0.95)[0]) == 0
+    assert postprocess(prediction, 3, max_det=2)[2].tolist() == [0, 1]
+
+
+def test_compare_detections_matches_boxes_by_class_and_iou():
+    from onnx_backend import Boxes, Result, compare_detections
+
+    def result(xyxy, conf, cls):
+        return Result({}, Boxes(np.array(xyxy, dtype=np.float32), np.array(conf, dtype=np.float32),
+                                np.array(cls, dtype=np.float32)), (100, 100))
+
+    reference = [result([[0, 0, 10, 10], [20, 20, 40, 40]], [0.9, 0.8], [0, 1])]
+    candidate = [result([[1, 0, 11, 10], [20, 20, 40, 40]], [0.85, 0.8], [0, 2])]
+    stats = compare_detections(reference, candidate, 0.5)
+
+    assert stats['matched'] == 1 and stats['class_mismatch_images'] == 1
+    assert stats['recall'] == 0.5 and stats['precision'] == 0.5
+    assert stats['conf_delta'] == pytest.approx(0.05)
@@ -0,0 +1,93 @@
+import json
+import logging
+import os
+
+import numpy as np
+
+from conftest import BRAND, NAMES, VEHICLE_TYPE
+
+
+def test_cost_table_prices_class_ids_with_array_lookups():
+    from pricing import PARTS_COST, CostTable
+
+    table = CostTable(NAMES, PARTS_COST[VEHICLE_TYPE][BRAND])
+    class_ids = np.array([2, 0, 3, 0], dtype=np.float32)
+
+    # 'Front - Windshield' is normalised to the 'front-windshield' price key.
+    assert table.costs[class_ids.astype(np.intp)].tolist() == [7200, 9000, 0, 9000]
+    details = table.damage_details(class_ids)
+    assert [(d['damage_type'], d['cost'], d['priced']) for d in details] == [
+        ('Front - Windshield', 7200, True), ('bumper', 9000, True), ('dent', 0, False), ('bumper', 9000, True)]
+    assert details[2]['description'].startswith('Deformation of body panel')
+    assert table.unpriced(class_ids) == ['dent']
+    assert table.unpriced(np.array([0, 1])) == []
+
+
+def test_cost_table_names_missing_classes_by_id():
+    from pricing import CostTable
+
+    table = CostTable({0: 'bumper', 2: 'door'}, {'bumper': 100})
+    assert table.names == ['bumper', '1', 'door']
+    assert table.unpriced([1, 2, 1]) == ['1', 'door']
+
+
+def test_price_book_reuses_tables_until_the_model_classes_change():
+    from pricing import PriceBook
+
+    book = PriceBook()
+    table = book.table(VEHICLE_TYPE, BRAND, NAMES)
+    assert book.table(VEHICLE_TYPE, BRAND, dict(NAMES)) is table
+    assert book.table(VEHICLE_TYPE, BRAND, {0: 'bumper'}) is not table
+    book.invalidate(VEHICLE_TYPE)
+    assert book.table(VEHICLE_TYPE, BRAND, {0: 'bumper'}) is not table
+
+
+def write_prices(path, prices, mtime):
+    path.write_text(prices if isinstance(prices, str) else json.dumps(prices))
+    os.utime(path, (mtime, mtime))
+
+
+def test_price_book_hot_reloads_the_price_file(tmp_path):
+    from pricing import PriceBook
+
+    path = tmp_path / 'prices.json'
+    write_prices(path, {VEHICLE_TYPE: {BRAND: {'bumper': 100}}}, 1_000_000)
+    book = PriceBook(path=str(path), reload_interval=0)
+    assert book.table(VEHICLE_TYPE, BRAND, NAMES).costs[0] == 100
+    version = book.version
+
+    write_prices(path, {VEHICLE_TYPE: {BRAND: {'bumper': 250, 'dent': 80}}}, 1_000_100)
+    table = book.table(VEHICLE_TYPE, BRAND, NAMES)
+    assert table.costs[[0, 3]].tolist() == [250, 80]
+    assert book.version != version
+
+
+def test_price_book_keeps_the_last_good_prices_when_a_file_does_not_load(tmp_path, caplog):
+    from pricing import PriceBook
+
+    path = tmp_path / 'prices.json'
+    write_prices(path, {VEHICLE_TYPE: {BRAND: {'bumper': 100}}}, 1_000_000)
+    book = PriceBook(path=str(path), reload_interval=0)
+    table = book.table(VEHICLE_TYPE, BRAND, NAMES)
+    version = book.version
+
+    with caplog.at_level(logging.ERROR, logger='pricing'):
+        for mtime, broken in enumerate(['{"4wheeler": {"Hyundai: Cre', {VEHICLE_TYPE: [1, 2]},
+                                        {VEHICLE_TYPE: {BRAND: {'bumper': 'a lot'}}}], start=1_000_100):
+            write_prices(path, broken, mtime)
+            for _ in range(3):
+                assert book.table(VEHICLE_TYPE, BRAND, NAMES) is table
+            assert book.version == version
+    assert len(caplog.records) == 3
+
+    write_prices(path, {VEHICLE_TYPE: {BRAND: {'bumper': 300}}}, 1_000_200)
+    assert book.table(VEHICLE_TYPE, BRAND, NAMES).costs[0] == 300
+
+
+def test_price_book_starts_from_the_built_in_prices_if_the_file_is_bad(tmp_path):
+    from pricing import PARTS_COST, PriceBook
+
+    path = tmp_path / 'prices.json'
+    write_prices(path, 'not json', 1_000_000)
+    table = PriceBook(path=str(path), reload_interval=0).table(VEHICLE_TYPE, BRAND, NAMES)
+    assert table.costs[0] == PARTS_COST[VEHICLE_TYPE][BRAND]['bumper']
@@ -0,0 +1,96 @@
+import threading
+
+from conftest import BRAND, VEHICLE_TYPE, login
+
+
+def add_assessment(user):
+    from extensions import db
+    from models import Assessment, DamageItem
+
+    assessment = Assessment(user_id=user.id, vehicle_type=VEHICLE_TYPE, vehicle_brand=BRAND, total_cost=9000,
+                            image_path='missing.jpg',
+                            items=[DamageItem(detected_damage='bumper', cost=9000, description='Replace.')])
+    db.session.add(assessment)
+    db.session.commit()
+    return assessment.id
+
+
+def count_builds(monkeypatch):
+    import pdf
+
+    builds = []
+    generate_pdf = pdf.generate_pdf
+
+    def counting(path, *args):
+        builds.append(args[0])
+        return generate_pdf(path, *args)
+    monkeypatch.setattr(pdf, 'generate_pdf', counting)
+    return builds
+
+
+def test_report_is_rendered_on_first_download_and_then_served_from_the_store(app, make_user, monkeypatch):
+    from extensions import db
+    from models import Assessment
+    from reports import report_key
+    from services import services
+
+    builds = count_builds(monkeypatch)
+    alice = make_user('alice')
+    assessment_id = add_assessment(alice)
+    store = services.report_store
+    assert not store.exists(report_key(store, assessment_id))
+
+    client = login(app, alice)
+    for _ in range(2):
+        response = client.get(f'/assessment/{assessment_id}/report')
+        assert response.status_code == 200 and response.mimetype == 'application/pdf'
+        assert response.get_data().startswith(b'%PDF')
+        assert f'Report_{assessment_id}.pdf' in response.headers['Content-Disposition']
+    assert builds == [assessment_id]
+    assert db.session.get(Assessment, assessment_id).pdf_path == report_key(store, assessment_id)
+
+    assert login(app, make_user('bob')).get(f'/assessment/{assessment_id}/report').status_code == 404
+
+
+def test_concurrent_downloads_render_the_report_once(app, make_user, monkeypatch):
+    from extensions import db
+    from models import Assessment
+    from reports import ensure_report
+    from services import services
+
+    builds = count_builds(monkeypatch)
+    assessment = db.session.get(Assessment, add_assessment(make_user('alice')))
+    assessment.items  # loaded here, not from the threads
+    store = services.report_store
+    start = threading.Barrier(4)
+    keys = []
+
+    def download():
+        start.wait()
+        keys.append(ensure_report(store, assessment, 'alice', None))
+
+    threads = [threading.Thread(target=download) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert builds == [assessment.id]
+    assert len(keys) == 4 and len(set(keys)) == 1 and store.exists(keys[0])
+
+
+def test_completed_jobs_do_not_render_a_report(app, make_user, worker, monkeypatch):
+    import pipeline
+    from conftest import claim_photo, jpeg
+    from extensions import db
+    from models import Assessment, AssessmentJob
+    from services import complete_assessment
+
+    builds = count_builds(monkeypatch)
+    alice = make_user('alice')
+    db.session.add(AssessmentJob(id='job', user_id=alice.id, vehicle_type=VEHICLE_TYPE, vehicle_brand=BRAND))
+    db.session.commit()
+    complete_assessment('job', pipeline.run_assessment('job', VEHICLE_TYPE, BRAND, [jpeg(claim_photo())]))
+
+    assert Assessment.query.one().pdf_path is None
+    assert builds == []
@@ -0,0 +1,107 @@
+import sqlalchemy as sa
+
+from conftest import BRAND, VEHICLE_TYPE
+
+DETAILS = [{'damage_type': 'bumper', 'cost': 9000.0, 'description': 'Replace.'},
+           {'damage_type': 'door', 'cost': 14000.0, 'description': 'Repair.', 'priced': True}]
+
+
+def record(user_id, **overrides):
+    return dict({'user_id': user_id, 'vehicle_type': VEHICLE_TYPE, 'vehicle_brand': BRAND, 'total_cost': 23000.0,
+                 'image_path': f'{user_id}.jpg', 'damage_details': DETAILS}, **overrides)
+
+
+def counts():
+    from extensions import db
+    from models import Assessment, AssessmentJob, DamageItem, ImageHash, User
+
+    return {model.__name__: db.session.scalar(sa.select(sa.func.count()).select_from(model))
+            for model in (User, Assessment, DamageItem, ImageHash, AssessmentJob)}
+
+
+def add_job(user_id, assessment_id, job_id):
+    from extensions import db
+    from models import AssessmentJob
+
+    db.session.add(AssessmentJob(id=job_id, user_id=user_id, vehicle_type=VEHICLE_TYPE, vehicle_brand=BRAND,
+                                 status='done', assessment_id=assessment_id))
+
+
+def test_create_many_returns_ids_in_order_and_writes_children(make_user):
+    from dedup import to_unsigned
+    from extensions import db
+    from models import Assessment, ImageHash
+    from services import services
+
+    user = make_user('alice')
+    hashes = [0x0123456789abcdef, 0xfedcba9876543210]
+    ids = services.repository.create_many([
+        record(user.id, image_path='a.jpg'),
+        record(user.id, image_path='b.jpg', damage_details=DETAILS[:1], phashes=hashes),
+        record(user.id, image_path='c.jpg', damage_details=[]),
+    ])
+    db.session.commit()
+
+    assert [db.session.get(Assessment, i).image_path for i in ids] == ['a.jpg', 'b.jpg', 'c.jpg']
+    assert [[(item.detected_damage, item.cost) for item in db.session.get(Assessment, i).items] for i in ids] == [
+        [('bumper', 9000.0), ('door', 14000.0)], [('bumper', 9000.0)], []]
+    rows = ImageHash.query.order_by(ImageHash.position).all()
+    assert [(row.assessment_id, row.position, to_unsigned(row.hash)) for row in rows] == [
+        (ids[1], 0, hashes[0]), (ids[1], 1, hashes[1])]
+    assert services.repository.create_many([]) == []
+
+
+def test_create_records_the_original_of_a_duplicate(make_user):
+    from extensions import db
+    from models import Assessment
+    from services import services
+
+    user = make_user('alice')
+    original = services.repository.create(user.id, VEHICLE_TYPE, BRAND, 23000.0, 'a.jpg', DETAILS, phashes=[1])
+    copy = services.repository.create(user.id, VEHICLE_TYPE, BRAND, 23000.0, 'a.jpg', DETAILS, phashes=[1],
+                                      duplicate_of=original)
+    db.session.commit()
+
+    assert db.session.get(Assessment, copy).duplicate_of == original
+    assert db.session.get(Assessment, original).duplicate_of is None
+
+
+def test_delete_user_removes_everything_they_own(make_user):
+    from extensions import db
+    from models import Assessment
+    from services import services
+
+    alice, bob = make_user('alice'), make_user('bob')
+    original, = services.repository.create_many([record(alice.id, phashes=[1, 2])])
+    copy, = services.repository.create_many([record(bob.id, phashes=[1, 2], duplicate_of=original)])
+    add_job(alice.id, original, 'alice-job')
+    add_job(bob.id, copy, 'bob-job')
+    db.session.commit()
+    alice_id = alice.id
+
+    assert services.repository.delete_user(alice_id)
+    db.session.commit()
+
+    assert counts() == {'User': 1, 'Assessment': 1, 'DamageItem': 2, 'ImageHash': 2, 'AssessmentJob': 1}
+    assert db.session.get(Assessment, copy).duplicate_of is None
+    assert not services.repository.delete_user(alice_id)
+
+
+def test_delete_users_removes_several_users_at_once(make_user):
+    from extensions import db
+    from models import User
+    from services import services
+
+    users = [make_user(name) for name in ('alice', 'bob', 'carol')]
+    ids = services.repository.create_many([record(user.id, phashes=[user.id]) for user in users for _ in range(2)])
+    for user, assessment_id in zip(users, ids[::2]):
+        add_job(user.id, assessment_id, f'{user.username}-job')
+    db.session.commit()
+    user_ids = [user.id for user in users]
+
+    assert services.repository.delete_users([user_ids[0], user_ids[2], 999]) == 2
+    db.session.commit()
+
+    assert [user.username for user in User.query.all()] == ['bob']
+    assert counts() == {'User': 1, 'Assessment': 2, 'DamageItem': 4, 'ImageHash': 2, 'AssessmentJob': 1}
+    assert services.repository.delete_users([]) == 0
@@ -0,0 +1,28 @@
+import json
+import os
+import subprocess
+import sys
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Import and build the app in a fresh interpreter; override on slow CI machines.
+STARTUP_BUDGET_MS = float(os.environ.get('STARTUP_BUDGET_MS', '2000'))
+
+SCRIPT = '''
+import json, sys, time
+started = time.perf_counter()
+from app import HEAVY_MODULES, create_app
+create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite://'})
+print(json.dumps({'ms': (time.perf_counter() - started) * 1000,
+                  'heavy': [name for name in HEAVY_MODULES if name in sys.modules]}))
+'''
+
+
+def test_create_app_skips_heavy_libraries_and_stays_in_budget(tmp_path):
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [REPO, os.environ.get('PYTHONPATH')])))
+    env.pop('PRELOAD_MODELS', None)
+    output = subprocess.run([sys.executable, '-c', SCRIPT], capture_output=True, text=True, check=True,
+                            cwd=tmp_path, env=env).stdout
+    startup = json.loads(output.strip().splitlines()[-1])
+
+    assert startup['heavy'] == []
+    assert startup['ms'] < STARTUP_BUDGET_MS
@@ -0,0 +1,92 @@
+import hashlib
+import os
+import time
+
+import pytest
+
+
+def store_for(tmp_path):
+    from storage import ArtifactStore
+
+    return ArtifactStore(str(tmp_path / 'artifacts'))
+
+
+def test_keys_are_sharded_by_a_hash_of_the_name(tmp_path):
+    store = store_for(tmp_path)
+
+    digest = hashlib.sha1(b'report_7.pdf').hexdigest()
+    assert store.key_for('report_7.pdf') == f'{digest[:2]}/{digest[2:4]}/report_7.pdf'
+    assert store.path(store.key_for('report_7.pdf')) == os.path.join(store.root, digest[:2], digest[2:4],
+                                                                     'report_7.pdf')
+    first, second = store.new_key('.jpg'), store.new_key('.jpg')
+    assert first != second and first.endswith('.jpg')
+    assert first.count('/') == 2
+
+
+@pytest.mark.parametrize('key', ['../outside.jpg', 'ab/../../outside.jpg', '/etc/passwd', '..', ''])
+def test_keys_cannot_leave_the_root(tmp_path, key):
+    store = store_for(tmp_path)
+    (tmp_path / 'outside.jpg').write_bytes(b'secret')
+
+    with pytest.raises(ValueError):
+        store.path(key)
+    assert not store.exists(key)
+
+
+def test_staging_renames_into_place_only_on_success(tmp_path):
+    store = store_for(tmp_path)
+    key = store.key_for('a.jpg')
+    path = store.path(key)
+
+    with store.staging(key) as staging:
+        assert os.path.dirname(staging) == os.path.dirname(path)
+        with open(staging, 'wb') as f:
+            f.write(b'first')
+        assert not os.path.exists(path)
+    assert open(path, 'rb').read() == b'first'
+
+    with pytest.raises(RuntimeError):
+        with store.staging(key) as staging:
+            with open(staging, 'wb') as f:
+                f.write(b'half')
+            raise RuntimeError('encoder failed')
+    # The failed write leaves the previous file and no temporary behind.
+    assert open(path, 'rb').read() == b'first'
+    assert os.listdir(os.path.dirname(path)) == ['a.jpg']
+
+
+def test_sweep_removes_old_artifacts_unless_kept(tmp_path):
+    store = store_for(tmp_path)
+    now = time.time()
+    ages = {'old.jpg': 7200, 'kept.pdf': 7200, 'new.jpg': 60}
+    keys = {}
+    for name, age in ages.items():
+        keys[name] = store.write_bytes(store.key_for(name), b'x')
+        os.utime(store.path(keys[name]), (now - age, now - age))
+    stray = tmp_path / 'artifacts' / 'not-a-shard'
+    stray.mkdir()
+    (stray / 'old.txt').write_bytes(b'x')
+    os.utime(stray / 'old.txt', (now - 7200, now - 7200))
+
+    assert store.sweep(3600, keep=[keys['kept.pdf']]) == 1
+    assert [name for name, key in keys.items() if store.exists(key)] == ['kept.pdf', 'new.jpg']
+    assert not os.path.exists(os.path.dirname(store.path(keys['old.jpg'])))
+    assert (stray / 'old.txt').exists()
+
+    assert store.sweep(0) == 2
+    assert store.sweep(0) == 0
+
+
+def test_artifact_file_finds_stored_and_legacy_static_files(app, tmp_path):
+    from services import artifact_file, services
+
+    app.static_folder = str(tmp_path / 'static')
+    os.makedirs(app.static_folder, exist_ok=True)
+    (tmp_path / 'static' / 'output_1.jpg').write_bytes(b'legacy')
+    key = services.artifact_store.write_bytes(services.artifact_store.key_for('b.jpg'), b'new')
+
+    assert artifact_file(key) == services.artifact_store.path(key)
+    assert artifact_file('output_1.jpg') == os.path.join(app.static_folder, 'output_1.jpg')
+    assert artifact_file('static/output_1.jpg') == os.path.join(app.static_folder, 'output_1.jpg')
+    for missing in ('output_2.jpg', 'static/../app.py', '../static/output_1.jpg'):
+        assert artifact_file(missing) is None
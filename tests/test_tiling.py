@@ -0,0 +1,82 @@
+import numpy as np
+import pytest
+
+from conftest import NAMES, claim_photo, jpeg
+
+SETTINGS = {'max_side': 2400, 'min_side': 2000, 'size': 1024, 'overlap': 0.2, 'confidence': 0.5,
+            'merge_threshold': 0.6}
+
+
+def result(xyxy, conf, cls, shape=(100, 100)):
+    from onnx_backend import Boxes, Result
+
+    return Result(NAMES, Boxes(np.array(xyxy, dtype=np.float32).reshape(-1, 4), np.array(conf, dtype=np.float32),
+                               np.array(cls, dtype=np.float32)), shape)
+
+
+@pytest.mark.parametrize('length', [1024, 1025, 2000, 2400, 3071])
+def test_tiles_cover_the_whole_side_with_overlap(length):
+    from tiling import tile_origins
+
+    origins = tile_origins(length, 1024, 0.2)
+    assert origins[0] == 0 and origins[-1] + 1024 == max(length, 1024)
+    assert origins == sorted(set(origins))
+    # Consecutive tiles overlap, so no pixel falls between two of them.
+    assert all(later - earlier <= 1024 * 0.8 for earlier, later in zip(origins, origins[1:]))
+
+
+def test_small_sides_get_one_tile():
+    from tiling import tile_origins, tiles
+
+    assert tile_origins(800, 1024, 0.2) == [0]
+    crops = tiles(np.zeros((1500, 800, 3), dtype=np.uint8), 1024, 0.2)
+    assert [(x, y, crop.shape[:2]) for x, y, crop in crops] == [(0, 0, (1024, 800)), (0, 476, (1024, 800))]
+
+
+def test_only_large_uncertain_photos_are_tiled():
+    from tiling import should_tile
+
+    large, small = jpeg(claim_photo(width=2400, height=1600)), jpeg(claim_photo(width=1600, height=1200))
+
+    assert should_tile(large, result([], [], []), SETTINGS)
+    assert should_tile(large, result([[0, 0, 10, 10], [5, 5, 20, 20]], [0.9, 0.3], [0, 1]), SETTINGS)
+    assert not should_tile(large, result([[0, 0, 10, 10]], [0.5], [0]), SETTINGS)
+    assert not should_tile(small, result([], [], []), SETTINGS)
+
+
+def test_merge_keeps_one_box_per_part_but_keeps_nested_damage():
+    from tiling import merge_boxes
+
+    xyxy = np.array([[0, 0, 100, 100],     # first pass
+                     [0, 0, 100, 60],      # the same part cut by a tile edge
+                     [40, 40, 60, 60],     # a small damage inside the first box
+                     [0, 0, 100, 100],     # same box, other class
+                     [300, 300, 400, 400]], dtype=np.float32)
+    conf = np.array([0.6, 0.8, 0.7, 0.5, 0.9], dtype=np.float32)
+    cls = np.array([0, 0, 0, 1, 0], dtype=np.float32)
+
+    assert merge_boxes(xyxy, conf, cls, 0.6).tolist() == [4, 1, 2, 3]
+
+
+def test_refine_maps_tile_boxes_back_and_merges_them():
+    from tiling import refine
+
+    photos = [jpeg(claim_photo(width=2400, height=1600)), jpeg(claim_photo(width=1600, height=1200))]
+    images = [np.zeros((800, 1200, 3), dtype=np.uint8), np.zeros((1200, 1600, 3), dtype=np.uint8)]
+    first = [result([[600, 400, 700, 500]], [0.3], [1], (800, 1200)), result([], [], [], (1200, 1600))]
+    batches = []
+
+    def detect(vehicle_type, crops):
+        batches.append([crop.shape[:2] for crop in crops])
+        # Only the top-left tile sees something.
+        return [result([[10, 10, 110, 110]] if i == 0 else [], [0.8] if i == 0 else [], [0] if i == 0 else [])
+                for i in range(len(crops))]
+
+    refined, tiled = refine(detect, '6wheeler', photos, images, first, SETTINGS)
+
+    assert tiled == 1 and len(batches) == 1
+    assert batches[0] == [(1024, 1024)] * 6
+    boxes = refined[0].boxes
+    assert boxes.xyxy.tolist() == [[5, 5, 55, 55], [600, 400, 700, 500]]
+    assert boxes.conf.tolist() == pytest.approx([0.8, 0.3]) and boxes.cls.tolist() == [0, 1]
+    assert refined[1] is first[1]
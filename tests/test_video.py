@@ -0,0 +1,38 @@
+import numpy as np
+
+from conftest import BRAND, VEHICLE_TYPE, claim_photo
+
+
+def walkaround(path, scenes, frames_per_scene=8, fps=5):
+    import cv2
+
+    height, width = scenes[0].shape[:2]
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*'mp4v'), fps, (width, height))
+    for scene in scenes:
+        for _ in range(frames_per_scene):
+            writer.write(scene)
+    writer.release()
+
+
+def test_same_class_damages_on_different_tracks_are_costed_separately(worker, tmp_path):
+    import pipeline
+
+    front, rear = claim_photo(seed=1, width=640, height=480), claim_photo(seed=2, width=640, height=480)
+    path = tmp_path / 'walkaround.mp4'
+    walkaround(path, [front, rear])
+
+    # One bumper in each half of the video, in a different place on screen.
+    def detections(image):
+        if np.abs(image.astype(np.int16) - front).mean() < np.abs(image.astype(np.int16) - rear).mean():
+            return [[40, 40, 200, 160]], [0]
+        return [[380, 260, 600, 440]], [0]
+    worker.detections = detections
+    settings = pipeline._state['settings']
+    pipeline._state['settings'] = dict(settings, video=dict(settings['video'], sample_fps=5, min_change=0, window=1))
+
+    output = pipeline.run_video_assessment('walkaround', VEHICLE_TYPE, BRAND, str(path))
+
+    assert output['image_count'] == 16
+    assert [detail['damage_type'] for detail in output['damage_details']] == ['bumper', 'bumper']
+    assert output['total_cost'] == 2 * 9000
+    assert not path.exists()
@@ -0,0 +1,116 @@
+"""Tiled inference for large photos.
+
+When a truck is photographed whole, a part such as a rear lamp is only a few
+pixels wide once the photo is shrunk to the model's input size. For the
+vehicle types listed in TILE_VEHICLE_TYPES, a photo gets a second, tiled
+pass only when the original is large enough and the normal pass looks
+unsure (no detections, or a box under the confidence threshold). Only those
+photos are decoded again at a higher resolution and cut into overlapping
+tiles. The tiles of every such photo go through the model as one batch, and
+the tile boxes are mapped back onto the working image and merged with the
+first pass.
+
+Boxes are merged per class by greedy suppression on intersection over the
+smaller box, between boxes of comparable size only. A part found by both the
+first pass and a tile, or cut in two by a tile edge, is therefore kept once,
+as its most confident box, while a small damage lying inside a larger one of
+the same class is kept as well.
+"""
+import numpy as np
+
+from inference import as_numpy
+from ingest import decode_image, image_size
+from onnx_backend import Boxes, Result
+
+# The smaller of two boxes must cover at least this share of the larger one's
+# area for them to be merged.
+MIN_AREA_RATIO = 0.5
+
+
+def tile_origins(length, tile_size, overlap):
+    if length <= tile_size:
+        return [0]
+    stride = max(1, int(tile_size * (1 - overlap)))
+    origins = list(range(0, length - tile_size, stride))
+    return origins + [length - tile_size]
+
+
+def tiles(image, tile_size, overlap):
+    h, w = image.shape[:2]
+    return [(x, y, image[y:y + tile_size, x:x + tile_size])
+            for y in tile_origins(h, tile_size, overlap)
+            for x in tile_origins(w, tile_size, overlap)]
+
+
+def should_tile(image_bytes, result, settings):
+    conf = as_numpy(result.boxes.conf)
+    if conf.size and float(conf.min()) >= settings['confidence']:
+        return False
+    return max(image_size(image_bytes)) >= settings['min_side']
+
+
+def intersection_over_smaller(box, boxes):
+    x1 = np.maximum(box[0], boxes[:, 0])
+    y1 = np.maximum(box[1], boxes[:, 1])
+    x2 = np.minimum(box[2], boxes[:, 2])
+    y2 = np.minimum(box[3], boxes[:, 3])
+    intersection = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area = (box[2] - box[0]) * (box[3] - box[1])
+    areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+    return intersection / np.maximum(np.minimum(area, areas), 1e-9)
+
+
+def duplicates(box, boxes, threshold):
+    area = (box[2] - box[0]) * (box[3] - box[1])
+    areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+    comparable = np.minimum(area, areas) >= MIN_AREA_RATIO * np.maximum(area, areas)
+    return comparable & (intersection_over_smaller(box, boxes) > threshold)
+
+
+def merge_boxes(xyxy, conf, cls, threshold):
+    """Indices of the boxes to keep, most confident first."""
+    keep = []
+    for class_id in np.unique(cls):
+        order = np.flatnonzero(cls == class_id)
+        order = order[np.argsort(-conf[order], kind='stable')]
+        while order.size:
+            best = order[0]
+            keep.append(best)
+            order = order[1:][~duplicates(xyxy[best], xyxy[order[1:]], threshold)]
+    keep = np.asarray(keep, dtype=np.intp)
+    return keep[np.argsort(-conf[keep], kind='stable')]
+
+
+def refine(detect, vehicle_type, images_bytes, images, results, settings):
+    """Re-run uncertain photos as tiles; returns the new results and how many photos were tiled."""
+    chosen = [i for i, (image_bytes, result) in enumerate(zip(images_bytes, results))
+              if should_tile(image_bytes, result, settings)]
+    if not chosen:
+        return results, 0
+
+    crops = []
+    scales = {}
+    for i in chosen:
+        source = decode_image(images_bytes[i], settings['max_side'])
+        scales[i] = (images[i].shape[1] / source.shape[1], images[i].shape[0] / source.shape[0])
+        crops.extend((i, x, y, crop) for x, y, crop in tiles(source, settings['size'], settings['overlap']))
+    tile_results = detect(vehicle_type, [crop for _, _, _, crop in crops])
+
+    found = {i: ([], [], []) for i in chosen}
+    for (i, x, y, _), tile_result in zip(crops, tile_results):
+        sx, sy = scales[i]
+        boxes, confs, classes = found[i]
+        boxes.append((as_numpy(tile_result.boxes.xyxy).reshape(-1, 4) + [x, y, x, y]) * [sx, sy, sx, sy])
+        confs.append(as_numpy(tile_result.boxes.conf).reshape(-1))
+        classes.append(as_numpy(tile_result.boxes.cls).reshape(-1))
+
+    results = list(results)
+    for i in chosen:
+        boxes, confs, classes = found[i]
+        first = results[i].boxes
+        xyxy = np.concatenate([as_numpy(first.xyxy).reshape(-1, 4)] + boxes).astype(np.float32)
+        conf = np.concatenate([as_numpy(first.conf).reshape(-1)] + confs).astype(np.float32)
+        cls = np.concatenate([as_numpy(first.cls).reshape(-1)] + classes).astype(np.float32)
+        keep = merge_boxes(xyxy, conf, cls, settings['merge_threshold'])
+        results[i] = Result(results[i].names, Boxes(xyxy[keep], conf[keep], cls[keep]), images[i].shape[:2])
+    return results, len(chosen)
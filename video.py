@@ -0,0 +1,260 @@
+"""Walkaround video ingest: streaming keyframe selection and damage tracking.
+
+Videos are read with OpenCV one frame at a time. Only a few frames per second
+are decoded; the rest are grabbed and skipped. A sampled frame is a keyframe
+candidate when it is sharp enough (variance of the Laplacian) and has moved
+far enough from the previous keyframe (mean absolute difference of small
+grayscale copies). Of the candidates in each short window, the sharpest is
+kept. The caller runs keyframes through the model in batches as they are
+found, so memory is bounded by the batch size, not by the video's length.
+
+The same damage usually shows up in several keyframes. The Tracker links
+detections into tracks. It moves the previous keyframe's boxes by the camera
+motion estimated between the two frames, then matches them by IoU within
+each class. A track counts once it has been seen in min_track_frames
+keyframes, or once with high confidence; this drops one-frame false
+positives. Every confirmed track is costed as one damage item, so two dents
+on different panels count twice. Each track remembers the keyframe where it
+was most confident, and those frames make up the annotated contact sheet.
+"""
+import numpy as np
+import cv2
+
+PROBE_SIDE = 480
+THUMB_WIDTH = 64
+
+
+class Keyframe:
+    __slots__ = ('index', 'image', 'probe', 'scale', 'sharpness')
+
+    def __init__(self, index, image, probe, scale, sharpness):
+        self.index = index
+        self.image = image
+        self.probe = probe
+        self.scale = scale
+        self.sharpness = sharpness
+
+
+class VideoReader:
+    def __init__(self, path, sample_fps, max_side, max_seconds):
+        self.capture = cv2.VideoCapture(path)
+        if not self.capture.isOpened():
+            raise ValueError('Could not read the video.')
+        self.fps = self.capture.get(cv2.CAP_PROP_FPS) or 30.0
+        self.step = max(1, round(self.fps / sample_fps))
+        self.max_side = max_side
+        self.frame_count = int(min(self.capture.get(cv2.CAP_PROP_FRAME_COUNT) or 0, max_seconds * self.fps))
+        self.max_frames = int(max_seconds * self.fps)
+        self.position = 0
+        self.sampled = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.capture.release()
+
+    def __iter__(self):
+        # grab() only demuxes; frames between samples are never converted to pixels.
+        while self.position < self.max_frames and self.capture.grab():
+            index = self.position
+            self.position += 1
+            if index % self.step:
+                continue
+            ok, frame = self.capture.retrieve()
+            if not ok:
+                continue
+            self.sampled += 1
+            h, w = frame.shape[:2]
+            if max(h, w) > self.max_side:
+                scale = self.max_side / max(h, w)
+                frame = cv2.resize(frame, (round(w * scale), round(h * scale)), interpolation=cv2.INTER_AREA)
+            yield index, frame
+
+
+def probe_of(image):
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    scale = min(1.0, PROBE_SIDE / max(gray.shape))
+    if scale < 1.0:
+        gray = cv2.resize(gray, (round(gray.shape[1] * scale), round(gray.shape[0] * scale)),
+                          interpolation=cv2.INTER_AREA)
+    return gray, scale
+
+
+def sharpness(gray):
+    return float(cv2.Laplacian(gray, cv2.CV_32F).var())
+
+
+def thumbnail(gray):
+    height = max(1, round(gray.shape[0] * THUMB_WIDTH / gray.shape[1]))
+    return cv2.resize(gray, (THUMB_WIDTH, height), interpolation=cv2.INTER_AREA).astype(np.int16)
+
+
+def keyframes(frames, settings):
+    """Yield sharp, non-redundant Keyframes from (index, image) pairs.
+
+    If no frame is sharp enough, the sharpest one seen is yielded so a shaky
+    video still gets assessed.
+    """
+    last = None
+    best = None
+    window_left = 0
+    fallback = None
+    emitted = 0
+    for index, image in frames:
+        probe, scale = probe_of(image)
+        score = sharpness(probe)
+        if score < settings['min_sharpness']:
+            if not emitted and (fallback is None or score > fallback.sharpness):
+                fallback = Keyframe(index, image, probe, scale, score)
+            continue
+        if best is None:
+            thumb = thumbnail(probe)
+            if last is not None and np.abs(thumb - last).mean() < settings['min_change']:
+                continue
+            best = Keyframe(index, image, probe, scale, score)
+            window_left = settings['window']
+        elif score > best.sharpness:
+            best = Keyframe(index, image, probe, scale, score)
+        window_left -= 1
+        if window_left <= 0:
+            yield best
+            last = thumbnail(best.probe)
+            best = None
+            fallback = None
+            emitted += 1
+            if emitted >= settings['max_keyframes']:
+                return
+    if best is not None:
+        yield best
+    elif not emitted and fallback is not None:
+        yield fallback
+
+
+def estimate_motion(previous, current, scale):
+    """2x3 similarity transform taking full-size points in previous to current."""
+    orb = cv2.ORB_create(500)
+    kp1, des1 = orb.detectAndCompute(previous, None)
+    kp2, des2 = orb.detectAndCompute(current, None)
+    if des1 is None or des2 is None or len(kp1) < 6 or len(kp2) < 6:
+        return None
+    matches = cv2.BFMatcher(cv2.NORM_HAMMING, crossCheck=True).match(des1, des2)
+    if len(matches) < 6:
+        return None
+    src = np.float32([kp1[m.queryIdx].pt for m in matches])
+    dst = np.float32([kp2[m.trainIdx].pt for m in matches])
+    motion, _ = cv2.estimateAffinePartial2D(src, dst, method=cv2.RANSAC, ransacReprojThreshold=3.0)
+    if motion is None:
+        return None
+    # Estimated on the probes; the rotation and zoom part is the same at full size.
+    motion[:, 2] /= scale
+    return motion
+
+
+def warp_box(box, motion):
+    x1, y1, x2, y2 = box
+    corners = np.float32([[x1, y1, 1], [x2, y1, 1], [x1, y2, 1], [x2, y2, 1]]) @ motion.T
+    return np.concatenate([corners.min(axis=0), corners.max(axis=0)])
+
+
+def iou(box, boxes):
+    x1 = np.maximum(box[0], boxes[:, 0])
+    y1 = np.maximum(box[1], boxes[:, 1])
+    x2 = np.minimum(box[2], boxes[:, 2])
+    y2 = np.minimum(box[3], boxes[:, 3])
+    intersection = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area = (box[2] - box[0]) * (box[3] - box[1])
+    areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+    return intersection / np.maximum(area + areas - intersection, 1e-9)
+
+
+class Track:
+    __slots__ = ('cls', 'box', 'hits', 'best_conf', 'best_frame', 'last_seen')
+
+    def __init__(self, cls, box, conf, frame):
+        self.cls = cls
+        self.box = box
+        self.hits = 1
+        self.best_conf = conf
+        self.best_frame = frame
+        self.last_seen = frame
+
+
+class Tracker:
+    def __init__(self, iou_threshold, max_gap):
+        self.iou_threshold = iou_threshold
+        self.max_gap = max_gap
+        self.tracks = []
+        # Per keyframe: (track index, box, confidence) of every detection.
+        self.frames = []
+        self._previous = None
+
+    def update(self, keyframe, xyxy, conf, cls):
+        """Link one keyframe's detections into tracks; returns the keyframe's number."""
+        frame = len(self.frames)
+        active = [t for t, track in enumerate(self.tracks) if frame - track.last_seen <= self.max_gap]
+        if self._previous is not None and active:
+            motion = estimate_motion(self._previous.probe, keyframe.probe, self._previous.scale)
+            if motion is not None and keyframe.scale == self._previous.scale:
+                for t in active:
+                    self.tracks[t].box = warp_box(self.tracks[t].box, motion)
+        self._previous = keyframe
+
+        pairs = []
+        if active and len(cls):
+            boxes = np.array([self.tracks[t].box for t in active], dtype=np.float32)
+            classes = np.array([self.tracks[t].cls for t in active])
+            for d in range(len(cls)):
+                overlaps = np.where(classes == cls[d], iou(xyxy[d], boxes), 0.0)
+                pairs.extend((overlap, d, active[a]) for a, overlap in enumerate(overlaps)
+                             if overlap >= self.iou_threshold)
+        matched = {}
+        used = set()
+        for _, d, t in sorted(pairs, reverse=True):
+            if d not in matched and t not in used:
+                matched[d] = t
+                used.add(t)
+
+        seen = []
+        for d in range(len(cls)):
+            box = xyxy[d].astype(np.float32)
+            if d in matched:
+                track = self.tracks[matched[d]]
+                track.box = box
+                track.hits += 1
+                track.last_seen = frame
+                if conf[d] > track.best_conf:
+                    track.best_conf = float(conf[d])
+                    track.best_frame = frame
+                seen.append((matched[d], box, float(conf[d])))
+            else:
+                self.tracks.append(Track(int(cls[d]), box, float(conf[d]), frame))
+                seen.append((len(self.tracks) - 1, box, float(conf[d])))
+        self.frames.append(seen)
+        return frame
+
+    def best_frames(self):
+        return {track.best_frame for track in self.tracks}
+
+    def confirmed(self, min_frames, confidence):
+        min_frames = min(min_frames, len(self.frames))
+        return {t for t, track in enumerate(self.tracks) if track.hits >= min_frames or track.best_conf >= confidence}
+
+    def class_ids(self, confirmed):
+        """One class id per confirmed track, in the order the tracks were first seen."""
+        return np.array([self.tracks[t].cls for t in sorted(confirmed)], dtype=np.intp)
+
+    def best_views(self, confirmed, limit):
+        """Up to limit keyframes that show the most confirmed tracks at their best, in video order."""
+        counts = {}
+        for t in confirmed:
+            counts[self.tracks[t].best_frame] = counts.get(self.tracks[t].best_frame, 0) + 1
+        chosen = sorted(sorted(counts, key=lambda frame: (-counts[frame], frame))[:limit])
+        views = []
+        for frame in chosen:
+            seen = [(self.tracks[t].cls, box, conf) for t, box, conf in self.frames[frame] if t in confirmed]
+            views.append((frame,
+                          np.array([box for _, box, _ in seen], dtype=np.float32).reshape(-1, 4),
+                          np.array([conf for _, _, conf in seen], dtype=np.float32),
+                          np.array([cls for cls, _, _ in seen], dtype=np.float32)))
+        return views
@@ -0,0 +1,535 @@
+"""Web routes, registered on the 'main' blueprint by create_app."""
+from datetime import datetime, timedelta
+import os
+import uuid
+
+from flask import (Blueprint, current_app, render_template, redirect, url_for, flash, request, session, send_file,
+                   jsonify, abort, Response)
+from flask_login import login_user, login_required, current_user, logout_user
+from sqlalchemy.orm import make_transient_to_detached
+
+from extensions import bcrypt, db, login_manager
+from ingest import VIDEO_EXTENSIONS, ImageTooLarge, VideoTooLarge, read_upload, save_upload
+from models import Assessment, AssessmentJob, User
+from reports import ensure_report, report_key
+from services import MODEL_PATHS, artifact_file, fail_assessment, services
+
+bp = Blueprint('main', __name__)
+
+
+# --- Users ---
+def cache_user(user):
+    snapshot = User(**{column.key: getattr(user, column.key) for column in User.__table__.columns})
+    make_transient_to_detached(snapshot)
+    services.user_cache.put(user.id, snapshot)
+
+
+@login_manager.user_loader
+def load_user(user_id):
+    # The admin routes discard a changed or deleted user's entry in this process
+    # only. With several web workers, the others keep serving their copy until it
+    # expires, so a deleted user may stay logged in there for up to USER_CACHE_TTL
+    # seconds (60 by default).
+    snapshot = services.user_cache.get(int(user_id))
+    if snapshot is not None:
+        return db.session.merge(snapshot, load=False)
+    user = db.session.get(User, int(user_id))
+    if user is not None:
+        cache_user(user)
+    return user
+
+
+# --- Assessment Jobs ---
+def queue_assessment(vehicle_type, brand, images_bytes=None, video_key=None):
+    job = AssessmentJob(id=uuid.uuid4().hex, user_id=current_user.id,
+                        vehicle_type=vehicle_type, vehicle_brand=brand)
+    db.session.add(job)
+    db.session.commit()
+
+    try:
+        if video_key is not None:
+            services.job_manager.submit(job.id, vehicle_type, brand, services.upload_store.path(video_key),
+                                        task='run_video_assessment')
+        else:
+            services.job_manager.submit(job.id, vehicle_type, brand, images_bytes)
+    except Exception as e:
+        current_app.logger.exception('Could not queue assessment job %s', job.id)
+        fail_assessment(job.id, e)
+        if video_key is not None:
+            os.remove(services.upload_store.path(video_key))
+        return None
+    return job
+
+
+def read_claim_files():
+    """(images_bytes, video_key) from the upload form; raises ValueError with a message for the user."""
+    uploaded_files = [f for f in request.files.getlist('image_file') if f and f.filename]
+    video = request.files.get('video_file')
+    if video is not None and not video.filename:
+        video = None
+    if video is not None:
+        if uploaded_files:
+            raise ValueError('Upload either photos or one video, not both.')
+        suffix = os.path.splitext(video.filename)[1].lower()
+        if suffix not in VIDEO_EXTENSIONS:
+            raise ValueError('Unsupported video format.')
+        return None, save_upload(video.stream, services.upload_store, suffix, current_app.config['MAX_VIDEO_BYTES'])
+    if len(uploaded_files) > current_app.config['MAX_IMAGES_PER_CLAIM']:
+        raise ValueError(f"Upload at most {current_app.config['MAX_IMAGES_PER_CLAIM']} images per claim.")
+    return [read_upload(f.stream, current_app.config['MAX_IMAGE_BYTES']) for f in uploaded_files], None
+
+
+# --- Assessment History ---
+def assessment_stats(user_id):
+    count, total, average = (db.session.query(db.func.count(Assessment.id),
+                                              db.func.coalesce(db.func.sum(Assessment.total_cost), 0),
+                                              db.func.coalesce(db.func.avg(Assessment.total_cost), 0))
+                             .filter(Assessment.user_id == user_id)
+                             .one())
+    month_start = datetime.utcnow().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    this_month = (db.session.query(db.func.count(Assessment.id))
+                  .filter(Assessment.user_id == user_id, Assessment.created_at >= month_start)
+                  .scalar())
+    by_vehicle_type = dict(db.session.query(Assessment.vehicle_type, db.func.count(Assessment.id))
+                           .filter(Assessment.user_id == user_id)
+                           .group_by(Assessment.vehicle_type)
+                           .all())
+    return {'count': count, 'total_cost': float(total), 'average_cost': float(average),
+            'this_month': this_month, 'by_vehicle_type': by_vehicle_type}
+
+
+def assessment_page(user_id, before=None, limit=None):
+    limit = max(1, min(limit or current_app.config['HISTORY_PAGE_SIZE'], 100))
+    query = Assessment.query.filter(Assessment.user_id == user_id)
+    if before is not None:
+        cursor = db.session.query(Assessment.created_at, Assessment.id).filter_by(id=before, user_id=user_id).first()
+        if cursor is not None:
+            query = query.filter(db.or_(Assessment.created_at < cursor.created_at,
+                                        db.and_(Assessment.created_at == cursor.created_at,
+                                                Assessment.id < cursor.id)))
+    results = (query.order_by(Assessment.created_at.desc(), Assessment.id.desc())
+               .options(db.selectinload(Assessment.items))
+               .limit(limit + 1)
+               .all())
+    next_cursor = results[limit - 1].id if len(results) > limit else None
+    return results[:limit], next_cursor
+
+
+# --- User Administration ---
+def pending_filter():
+    return User.user_status == 'Pending'
+
+
+def prefix_filter(column, text):
+    # A range instead of LIKE, so the lower() indexes on username and email are used.
+    return db.and_(column >= text, column < text[:-1] + chr(ord(text[-1]) + 1))
+
+
+def search_filter(search):
+    # Usernames and emails match case-insensitively by prefix; a number can also be an id.
+    text = search.lower()
+    matches = [prefix_filter(db.func.lower(User.username), text), prefix_filter(db.func.lower(User.email), text)]
+    if search.isdecimal() and len(search) < 19:
+        matches.append(User.id == int(search))
+    return db.or_(*matches)
+
+
+def user_counts():
+    total, approved, pending, male = db.session.query(
+        db.func.count(User.id),
+        db.func.coalesce(db.func.sum(db.case((User.user_status == 'approved', 1), else_=0)), 0),
+        db.func.coalesce(db.func.sum(db.case((pending_filter(), 1), else_=0)), 0),
+        db.func.coalesce(db.func.sum(db.case((User.gender == 'M', 1), else_=0)), 0),
+    ).one()
+    return {'total': total, 'approved': approved, 'pending': pending, 'male': male}
+
+
+def user_page(status=None, search=None, before=None):
+    limit = current_app.config['ADMIN_PAGE_SIZE']
+    query = User.query
+    if status == 'approved':
+        query = query.filter(User.user_status == 'approved')
+    elif status == 'pending':
+        query = query.filter(pending_filter())
+    if search:
+        query = query.filter(search_filter(search))
+    if before is not None:
+        query = query.filter(User.id < before)
+    results = query.order_by(User.id.desc()).limit(limit + 1).all()
+    next_cursor = results[limit - 1].id if len(results) > limit else None
+    return results[:limit], next_cursor
+
+
+def admin_redirect(default):
+    next_url = request.form.get('next') or ''
+    # Only local paths, so the form cannot be used to redirect elsewhere.
+    if not next_url.startswith('/') or next_url.startswith('//'):
+        next_url = url_for(default)
+    return redirect(next_url)
+
+
+# --- Routes ---
+@bp.app_context_processor
+def inject_env():
+    return {
+        'GMAP_API_URL': os.environ.get('GMAP_API_KEY')
+    }
+
+
+@bp.route('/')
+def index():
+    
+    return render_template('index.html')
+
+
+@bp.route('/about')
+def about():
+    return render_template('about.html')
+
+
+@bp.route('/contact')
+def contact():
+    return render_template('contact.html')
+
+
+@bp.route('/login', methods=['GET', 'POST'])
+def login():
+    if request.method == 'POST':
+        email = request.form.get('email')
+        password = request.form.get('password')
+        if email == 'admin@gmail.com' and password == 'admin':
+            return redirect(url_for('.admin'))
+        user = User.query.filter_by(email=email, user_status='approved').first()
+        if user and bcrypt.check_password_hash(user.password, password):
+            login_user(user)
+            session['user_id'] = user.id
+            flash('Login successful!', 'success')
+            return redirect(url_for('.home'))
+        else:
+            flash('Invalid email or password.', 'danger')
+    return render_template('auth.html')
+
+
+@bp.route('/register', methods=['GET', 'POST'])
+def register():
+    if request.method == 'POST':
+        username = request.form.get('username')
+        email = request.form.get('email')
+        password = request.form.get('password')
+        confirm_password = request.form.get('confirm_password')
+        age = request.form.get('age')
+        gender = request.form.get('gender')
+        mobile = request.form.get('mobile')
+        
+        if password != confirm_password:
+            flash('Passwords do not match.', 'danger')
+            return render_template('auth.html')
+            
+        hashed_password = bcrypt.generate_password_hash(password).decode('utf-8')
+        new_user = User(username=username, email=email, password=hashed_password, age=int(age), gender=gender, mobile=mobile)
+        try:
+            db.session.add(new_user)
+            db.session.commit()
+            flash('Registration successful! Wait for approval.', 'success')
+            return redirect(url_for('.login'))
+        except:
+            db.session.rollback()
+            current_app.logger.exception('Registration failed for %s', email)
+            flash('Registration failed.', 'danger')
+    return render_template('auth.html')
+
+
+@bp.route('/home')
+@login_required
+def home():
+    return render_template('home.html', stats=assessment_stats(current_user.id))
+
+
+@bp.route('/upload', methods=['GET', 'POST'])
+@login_required
+def upload():
+    if request.method == 'POST':
+        vehicle_type = request.form.get('vehicle_type')
+        brand = request.form.get('vehicle_brand')
+        has_files = any(f and f.filename for f in request.files.values())
+
+        if not has_files or vehicle_type not in MODEL_PATHS or not brand:
+            flash('Missing data.', 'danger')
+            return render_template('upload.html')
+
+        model_path = MODEL_PATHS.get(vehicle_type)
+        if not os.path.exists(model_path):
+            flash('Model not found.', 'danger')
+            return render_template('upload.html')
+
+        try:
+            images_bytes, video_key = read_claim_files()
+        except ValueError as e:
+            flash(str(e), 'danger')
+            return render_template('upload.html')
+
+        job = queue_assessment(vehicle_type, brand, images_bytes, video_key)
+        if job is None:
+            flash('Error processing image.', 'danger')
+            return render_template('upload.html')
+
+        flash('Assessment queued.', 'info')
+        return redirect(url_for('.assessment_job', job_id=job.id))
+
+    return render_template('upload.html')
+
+
+@bp.route('/api/upload', methods=['POST'])
+@login_required
+def api_upload():
+    vehicle_type = request.form.get('vehicle_type')
+    brand = request.form.get('vehicle_brand')
+    has_files = any(f and f.filename for f in request.files.values())
+
+    if not has_files or vehicle_type not in MODEL_PATHS or not brand:
+        return jsonify({'error': 'Missing data.'}), 400
+    if not os.path.exists(MODEL_PATHS[vehicle_type]):
+        return jsonify({'error': 'Model not found.'}), 503
+
+    try:
+        images_bytes, video_key = read_claim_files()
+    except (ImageTooLarge, VideoTooLarge) as e:
+        return jsonify({'error': str(e)}), 413
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    job = queue_assessment(vehicle_type, brand, images_bytes, video_key)
+    if job is None:
+        return jsonify({'error': 'Error processing image.'}), 500
+    response = jsonify(job.to_dict())
+    response.headers['Location'] = url_for('.assessment_job_status', job_id=job.id)
+    return response, 202
+
+
+@bp.route('/assessment')
+@login_required
+def assessment():
+    results, next_cursor = assessment_page(current_user.id, before=request.args.get('before', type=int))
+    return render_template('assessment.html', results=results, next_cursor=next_cursor,
+                           stats=assessment_stats(current_user.id))
+
+
+@bp.route('/api/assessment')
+@login_required
+def assessment_history():
+    results, next_cursor = assessment_page(current_user.id, before=request.args.get('before', type=int),
+                                           limit=request.args.get('limit', type=int))
+    return jsonify({
+        'stats': assessment_stats(current_user.id),
+        'results': [result.to_dict() for result in results],
+        'next_cursor': next_cursor,
+    })
+
+
+@bp.route('/assessment/<job_id>')
+@login_required
+def assessment_job(job_id):
+    job = AssessmentJob.query.filter_by(id=job_id, user_id=current_user.id).first_or_404()
+    return render_template('assessment_job.html', job=job.to_dict())
+
+
+@bp.route('/api/assessment/<job_id>')
+@login_required
+def assessment_job_status(job_id):
+    job = AssessmentJob.query.filter_by(id=job_id, user_id=current_user.id).first_or_404()
+    data = job.to_dict()
+    if job.assessment_id:
+        data['report_url'] = url_for('.assessment_report', assessment_id=job.assessment_id)
+    return jsonify(data)
+
+
+@bp.route('/assessment/<int:assessment_id>/report')
+@login_required
+def assessment_report(assessment_id):
+    assessment = Assessment.query.filter_by(id=assessment_id, user_id=current_user.id).first_or_404()
+    store = services.report_store
+    if store.exists(report_key(store, assessment.id)):
+        key = report_key(store, assessment.id)
+    else:
+        with services.pipeline_metrics.timer('pdf', assessment.vehicle_type):
+            key = ensure_report(store, assessment, current_user.username, artifact_file(assessment.image_path))
+    if assessment.pdf_path != key:
+        assessment.pdf_path = key
+        db.session.commit()
+    return send_file(store.path(key), mimetype='application/pdf', as_attachment=True,
+                     download_name=f'Report_{assessment.id}.pdf')
+
+
+@bp.route('/files/<path:key>')
+def artifact(key):
+    path = artifact_file(key)
+    if path is None:
+        abort(404)
+    # Keys are never reused for different content, so clients may cache forever.
+    response = send_file(path, max_age=365 * 24 * 3600)
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
+
+@bp.route('/logout')
+@login_required
+def logout():
+    logout_user()
+    session.clear()
+    return redirect(url_for('.login'))
+
+
+@bp.route('/admin')
+def admin(): return render_template('admin.html')
+
+
+@bp.route('/view')
+def view():
+    status = request.args.get('status')
+    status = status if status in ('approved', 'pending') else None
+    search = request.args.get('q', '').strip()
+    data, next_cursor = user_page(status, search, before=request.args.get('before', type=int))
+    return render_template('view.html', data=data, next_cursor=next_cursor, counts=user_counts(),
+                           status=status, search=search)
+
+
+@bp.route('/delete/<int:id>/', methods=['POST'])
+def delete_user(id):
+    if services.repository.delete_user(id):
+        db.session.commit()
+    services.user_cache.discard(id)
+    return admin_redirect('.view')
+
+
+@bp.route('/view_requests')
+def view_requests():
+    search = request.args.get('q', '').strip()
+    data, next_cursor = user_page('pending', search, before=request.args.get('before', type=int))
+    return render_template('view_requests.html', data=data, next_cursor=next_cursor,
+                           pending=user_counts()['pending'], search=search)
+
+
+@bp.route('/update_status/<int:id>/', methods=['POST'])
+def update_status(id):
+    User.query.filter_by(id=id).update({'user_status': 'approved'})
+    db.session.commit()
+    services.user_cache.discard(id)
+    return admin_redirect('.view_requests')
+
+
+@bp.route('/users/bulk', methods=['POST'])
+def bulk_users():
+    # Every action is one set-based statement (or one repository call) and one commit.
+    action = request.form.get('action')
+    ids = request.form.getlist('ids', type=int)
+    if action == 'approve_pending':
+        ids = db.session.scalars(db.update(User).where(pending_filter())
+                                 .values(user_status='approved')
+                                 .returning(User.id)
+                                 .execution_options(synchronize_session=False)).all()
+        count = len(ids)
+    elif action == 'approve' and ids:
+        count = (User.query.filter(User.id.in_(ids))
+                 .update({'user_status': 'approved'}, synchronize_session=False))
+    elif action == 'delete' and ids:
+        count = services.repository.delete_users(ids)
+    else:
+        flash('No users selected.', 'info')
+        return admin_redirect('.view')
+    db.session.commit()
+    for user_id in ids:
+        services.user_cache.discard(user_id)
+    flash(f"{count} user{'s' if count != 1 else ''} {'deleted' if action == 'delete' else 'approved'}.", 'success')
+    return admin_redirect('.view')
+
+
+@bp.route('/duplicates')
+def duplicates():
+    # Newest first, one page at a time; ?before=<id> continues after that assessment.
+    limit = current_app.config['HISTORY_PAGE_SIZE']
+    query = Assessment.query.filter(Assessment.duplicate_of.isnot(None))
+    before = request.args.get('before', type=int)
+    if before is not None:
+        query = query.filter(Assessment.id < before)
+    results = (query.order_by(Assessment.id.desc())
+               .options(db.joinedload(Assessment.user),
+                        db.joinedload(Assessment.original).joinedload(Assessment.user))
+               .limit(limit + 1)
+               .all())
+    next_cursor = results[limit - 1].id if len(results) > limit else None
+    return render_template('duplicates.html', data=results[:limit], next_cursor=next_cursor,
+                           total=db.session.query(db.func.count(Assessment.id))
+                           .filter(Assessment.duplicate_of.isnot(None)).scalar())
+
+
+def metrics_dashboard():
+    week_start = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=6)
+    # SQLite returns date() as text and PostgreSQL as a date, so key on the ISO string.
+    per_day = {str(day)[:10]: count
+               for day, count in (db.session.query(db.func.date(Assessment.created_at), db.func.count(Assessment.id))
+                                  .filter(Assessment.created_at >= week_start)
+                                  .group_by(db.func.date(Assessment.created_at))
+                                  .all())}
+    days = [week_start + timedelta(days=i) for i in range(7)]
+    by_vehicle_type = dict(db.session.query(Assessment.vehicle_type, db.func.count(Assessment.id))
+                           .group_by(Assessment.vehicle_type)
+                           .all())
+    recent_jobs = (AssessmentJob.query.options(db.joinedload(AssessmentJob.user))
+                   .order_by(AssessmentJob.created_at.desc())
+                   .limit(5)
+                   .all())
+    return {
+        'users': db.session.query(db.func.count(User.id)).scalar(),
+        'pending_users': db.session.query(db.func.count(User.id)).filter(User.user_status == 'Pending').scalar(),
+        'assessments': db.session.query(db.func.count(Assessment.id)).scalar(),
+        'daily_labels': [day.strftime('%a') for day in days],
+        'daily_counts': [per_day.get(day.strftime('%Y-%m-%d'), 0) for day in days],
+        'vehicle_types': list(MODEL_PATHS),
+        'vehicle_counts': [by_vehicle_type.get(vehicle_type, 0) for vehicle_type in MODEL_PATHS],
+        'recent_jobs': recent_jobs,
+    }
+
+
+def pipeline_summary():
+    pipeline_metrics = services.pipeline_metrics
+    snapshot = pipeline_metrics.snapshot()
+    totals = {row['vehicle_type']: row for row in snapshot['stages'] if row['stage'] == 'total'}
+    inference = {row['vehicle_type']: row for row in snapshot['stages'] if row['stage'] == 'inference'}
+    hits = pipeline_metrics.counter('cache_lookups_total', result='hit')
+    lookups = pipeline_metrics.counter('cache_lookups_total')
+    done = pipeline_metrics.counter('assessments_total', status='done')
+    failed = pipeline_metrics.counter('assessments_total', status='failed')
+    all_totals = [row for row in totals.values() if row['count']]
+    snapshot.update({
+        'completed': done,
+        'failed': failed,
+        'error_rate': round(failed / (done + failed) * 100, 1) if done + failed else 0.0,
+        'cache_hit_rate': round(hits / lookups * 100, 1) if lookups else 0.0,
+        'mean_total_ms': round(sum(row['mean_ms'] * row['count'] for row in all_totals) /
+                               sum(row['count'] for row in all_totals), 1) if all_totals else None,
+        'models': [{
+            'vehicle_type': vehicle_type,
+            'assessments': pipeline_metrics.counter('assessments_total', vehicle_type=vehicle_type, status='done'),
+            'errors': pipeline_metrics.counter('errors_total', vehicle_type=vehicle_type),
+            'detections': pipeline_metrics.counter('detections_total', vehicle_type=vehicle_type),
+            'inference_p95_ms': inference.get(vehicle_type, {}).get('p95_ms'),
+            'total_p95_ms': totals.get(vehicle_type, {}).get('p95_ms'),
+        } for vehicle_type in MODEL_PATHS],
+    })
+    return snapshot
+
+
+@bp.route('/metrics')
+def metrics():
+    return render_template('metrics.html', dashboard=metrics_dashboard(), pipeline=pipeline_summary())
+
+
+@bp.route('/api/metrics')
+def metrics_data():
+    return jsonify(pipeline_summary())
+
+
+@bp.route('/metrics/prometheus')
+def metrics_prometheus():
+    return Response(services.pipeline_metrics.render_prometheus(), mimetype='text/plain; version=0.0.4')